@@ -0,0 +1,19 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+
+class ArchiveWorker(QThread):
+    """Worker thread moving old conversations to the cold archive"""
+    archived = pyqtSignal(int)  # Number of conversations moved
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, db, older_than_days):
+        super().__init__()
+        self.db = db
+        self.older_than_days = older_than_days
+
+    def run(self):
+        try:
+            count = self.db.archive_conversations(self.older_than_days,
+                                                  cancelled=self.isInterruptionRequested)
+            self.archived.emit(count)
+        except Exception as e:
+            self.error_occurred.emit(f"Error archiving conversations: {str(e)}")
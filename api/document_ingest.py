@@ -0,0 +1,136 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api.scheduler import Priority, RequestPreempted, get_scheduler
+from database.document_store import iter_chunks
+
+
+class DocumentIngestor:
+    """
+    Chunks attached documents and embeds them into the conversation index.
+
+    Files are read as a stream, chunks are committed to SQLite in batches
+    together with the byte offset to resume from, and embeddings are
+    requested in batches with a bounded number of concurrent /api/embed
+    calls. Re-running ingest() on a partially ingested document continues
+    from where it stopped.
+    """
+
+    def __init__(self, store, client, embedding_model, chunk_bytes=2048, overlap_bytes=256,
+                 batch_size=32, concurrency=2):
+        """
+        Args:
+            store: DocumentStore holding documents, chunks and indexes
+            client: OllamaClient used for /api/embed
+            embedding_model: Name of the embedding model
+            chunk_bytes: Target chunk size in bytes
+            overlap_bytes: Bytes shared between neighbouring chunks
+            batch_size: Chunks per embedding request
+            concurrency: Embedding requests in flight at once
+        """
+        self.store = store
+        self.client = client
+        self.embedding_model = embedding_model
+        self.chunk_bytes = chunk_bytes
+        self.overlap_bytes = overlap_bytes
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+
+        # Let the scheduler admit our parallel embedding requests
+        scheduler = getattr(client, "scheduler", None) or get_scheduler()
+        scheduler.set_model_limit(embedding_model, concurrency)
+
+    def ingest(self, document_id, progress=None, cancelled=None):
+        """
+        Ingest (or resume ingesting) one document
+
+        Args:
+            document_id: Document to ingest
+            progress: Optional callable(bytes_done, bytes_total)
+            cancelled: Optional callable returning True to stop early
+
+        Returns:
+            finished: True if the document is fully ingested
+        """
+        document = self.store.get_document(document_id)
+        if document is None:
+            return False
+        if self.store.source_changed(document):
+            self.store.set_status(document_id, 'changed')
+            raise ValueError(f"{document['name']} changed on disk since it was attached")
+
+        conversation_id = document['conversation_id']
+        flush_size = self.batch_size * self.concurrency * 4
+        pending = []
+        resume_offset = document['bytes_ingested']
+
+        for offset, length, text, next_offset in iter_chunks(
+                document['path'], document['bytes_ingested'], self.chunk_bytes, self.overlap_bytes):
+            pending.append((offset, length, text))
+            resume_offset = next_offset
+
+            if len(pending) >= flush_size:
+                self.store.add_chunks(document_id, conversation_id, pending, resume_offset)
+                pending = []
+                self.embed_pending(conversation_id, cancelled)
+                if progress:
+                    progress(resume_offset, document['size_bytes'])
+                if cancelled and cancelled():
+                    return False
+
+        if pending:
+            self.store.add_chunks(document_id, conversation_id, pending, resume_offset)
+        self.embed_pending(conversation_id, cancelled)
+        if cancelled and cancelled():
+            return False
+
+        self.store.set_status(document_id, 'ready')
+        if progress:
+            progress(document['size_bytes'], document['size_bytes'])
+        return True
+
+    def _embed_batch(self, texts):
+        """Embed one batch, waiting out preemption by interactive requests"""
+        while True:
+            try:
+                return self.client.embed(self.embedding_model, texts, Priority.BACKGROUND)
+            except RequestPreempted:
+                time.sleep(0.5)
+
+    def embed_pending(self, conversation_id, cancelled=None):
+        """Embed every stored chunk of a conversation that has no vector yet"""
+        index = self.store.index_for(conversation_id)
+        window = self.batch_size * self.concurrency
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            while not (cancelled and cancelled()):
+                rows = self.store.chunks_to_embed(conversation_id, limit=window)
+                if not rows:
+                    return
+                batches = [rows[i:i + self.batch_size] for i in range(0, len(rows), self.batch_size)]
+                texts = [[text for _, text in batch] for batch in batches]
+
+                # map() keeps batch order, so the index stays sorted by chunk id
+                for batch, vectors in zip(batches, pool.map(self._embed_batch, texts)):
+                    index.add([chunk_id for chunk_id, _ in batch], vectors)
+
+
+def retrieval_context(store, client, embedding_model, conversation_id, prompt, k=4,
+                      priority=Priority.INTERACTIVE):
+    """
+    Build a system message with the document chunks most relevant to a prompt
+
+    Returns:
+        content: Text for a system message, or None if nothing is attached
+    """
+    if conversation_id is None or not store.has_documents(conversation_id):
+        return None
+
+    embedding = client.embed(embedding_model, prompt, priority)[0]
+    chunks = store.search(conversation_id, embedding, k)
+    if not chunks:
+        return None
+
+    excerpts = [f"[{chunk['name']} @ byte {chunk['byte_offset']}]\n{chunk['text']}" for chunk in chunks]
+    return ("Use the following excerpts from the documents attached to this conversation "
+            "when they are relevant:\n\n" + "\n\n".join(excerpts))
@@ -0,0 +1,63 @@
+import threading
+from collections import deque
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+class DocumentIngestWorker(QThread):
+    """Worker thread for chunking and embedding attached documents"""
+    progress_update = pyqtSignal(int)  # Percent of the current document
+    document_ready = pyqtSignal(int)  # Document ID
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, ingestor, document_ids):
+        super().__init__()
+        self.ingestor = ingestor
+        # Shared with the GUI thread, which queues documents attached meanwhile
+        self._pending = deque(document_ids)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def add(self, document_ids):
+        """
+        Queue more documents from another thread
+
+        Returns:
+            queued: False once the worker has stopped taking documents;
+            start a new worker after this one finishes instead
+        """
+        with self._lock:
+            if self._closed:
+                return False
+            self._pending.extend(document_ids)
+            return True
+
+    def _next_document(self):
+        with self._lock:
+            if not self._pending or self.isInterruptionRequested():
+                self._closed = True
+                return None
+            return self._pending.popleft()
+
+    def report_progress(self, done, total):
+        self.progress_update.emit(min(100, int(done * 100 / total)) if total else 100)
+
+    def run(self):
+        while True:
+            document_id = self._next_document()
+            if document_id is None:
+                return
+            try:
+                finished = self.ingestor.ingest(
+                    document_id,
+                    progress=self.report_progress,
+                    cancelled=self.isInterruptionRequested
+                )
+                if finished:
+                    self.document_ready.emit(document_id)
+                else:
+                    # Interrupted; ingestion resumes next time
+                    with self._lock:
+                        self._closed = True
+                    return
+            except Exception as e:
+                self.error_occurred.emit(f"Error ingesting document: {str(e)}")
@@ -0,0 +1,144 @@
+import logging
+import threading
+import time
+
+from api.scheduler import Priority, RequestPreempted
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryIndexer(threading.Thread):
+    """
+    Background thread that embeds saved messages into a MappedVectorIndex.
+
+    It wakes up whenever notify() is called (after a save) or periodically,
+    embeds every message newer than the index high-water mark in batches at
+    background priority, and yields to interactive requests through the
+    scheduler. The high-water mark relies on message ids never being
+    reused (see migrations.track_high_water). Vectors of deleted or archived
+    messages are dropped by compact(), which runs after request_compact()
+    and when search() finds them piling up.
+    """
+
+    def __init__(self, db, index, client, embedding_model, batch_size=32,
+                 max_chars=4000, poll_interval=60.0, retry_delay=30.0):
+        """
+        Args:
+            db: DatabaseManager to read messages from
+            index: MappedVectorIndex receiving the embeddings
+            client: OllamaClient used for /api/embed
+            embedding_model: Name of the embedding model
+            batch_size: Messages embedded per request
+            max_chars: Messages are truncated to this many characters before embedding
+            poll_interval: Seconds between wake-ups when nothing calls notify()
+            retry_delay: Seconds to wait after a failed embedding request
+        """
+        super().__init__(name="HistoryIndexer", daemon=True)
+        self.db = db
+        self.index = index
+        self.client = client
+        self.embedding_model = embedding_model
+        self.batch_size = batch_size
+        self.max_chars = max_chars
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.last_error = None
+        self._compact_requested = False
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+
+    def notify(self):
+        """Signal that new messages may have been saved"""
+        self._wake.set()
+
+    def request_compact(self):
+        """Drop the vectors of deleted messages on the next wake-up"""
+        self._compact_requested = True
+        self._wake.set()
+
+    def stop(self):
+        """Ask the thread to exit after the current batch"""
+        self._stopped.set()
+        self._wake.set()
+
+    def run(self):
+        self._wake.set()  # Catch up on anything saved since the last run
+        try:
+            # Ids freed before the database was upgraded must not be handed out again
+            self.db.reserve_message_ids(self.index.last_id)
+        except Exception as e:
+            logger.warning("Could not reserve indexed message ids: %s", e)
+        while not self._stopped.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+
+            try:
+                self.index_pending()
+                if self._compact_requested:
+                    self._compact_requested = False
+                    self.compact()
+                self.last_error = None
+            except RequestPreempted:
+                # Interactive work arrived - pick up where we left off shortly
+                time.sleep(1.0)
+                self._wake.set()
+            except Exception as e:
+                # Server down or embedding model missing; retry later
+                self.last_error = str(e)
+                logger.warning("History indexing failed, retrying in %ss: %s", self.retry_delay, e)
+                self._stopped.wait(self.retry_delay)
+
+    def index_pending(self):
+        """Embed every message newer than the index high-water mark"""
+        while not self._stopped.is_set():
+            rows = self.db.get_messages_after(self.index.last_id, self.batch_size)
+            if not rows:
+                return
+
+            rows_with_text = [row for row in rows if row['content']]
+            if rows_with_text:
+                texts = [row['content'][:self.max_chars] for row in rows_with_text]
+                vectors = self.client.embed(self.embedding_model, texts, Priority.BACKGROUND)
+                self.index.add([row['id'] for row in rows_with_text], vectors,
+                               last_id=rows[-1]['id'])
+            else:
+                self.index.mark_indexed(rows[-1]['id'])
+
+    def search(self, query, k=20):
+        """
+        Find the stored messages most similar to a query
+
+        Args:
+            query: Free-text search query
+            k: Maximum number of results
+
+        Returns:
+            results: List of message dictionaries (see
+                     DatabaseManager.get_messages_by_ids) with a 'score' key,
+                     best match first
+        """
+        embedding = self.client.embed(self.embedding_model, query, Priority.INTERACTIVE)[0]
+
+        # Over-fetch because some ids may belong to deleted messages
+        ids, scores = self.index.search(embedding, k * 4)
+        ids, scores = ids[0].tolist(), scores[0].tolist()
+        rows = self.db.get_messages_by_ids(ids)
+
+        results = []
+        for message_id, score in zip(ids, scores):
+            row = rows.get(message_id)
+            if row is not None:
+                results.append(dict(row, score=score))
+            if len(results) >= k:
+                break
+
+        # Compact in the background once stale rows dominate the candidates
+        if ids and len(rows) < len(ids) / 2:
+            self.request_compact()
+        return results
+
+    def compact(self):
+        """Drop vectors whose messages no longer exist"""
+        return self.index.compact(self.db.get_message_ids())
@@ -0,0 +1,16 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+
+class MaintenanceWorker(QThread):
+    """Worker thread running idle-time database maintenance"""
+    maintenance_finished = pyqtSignal(dict)  # Step name -> {"ms", "result"}
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, maintenance):
+        super().__init__()
+        self.maintenance = maintenance
+
+    def run(self):
+        try:
+            self.maintenance_finished.emit(self.maintenance.run())
+        except Exception as e:
+            self.error_occurred.emit(f"Database maintenance failed: {str(e)}")
@@ -0,0 +1,23 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+
+class MigrationWorker(QThread):
+    """Worker thread running schema migration backfills"""
+    progress_update = pyqtSignal(str, int)  # Migration description, percent
+    migrations_finished = pyqtSignal()
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, migrator):
+        super().__init__()
+        self.migrator = migrator
+
+    def report_progress(self, migration, done, total):
+        self.progress_update.emit(migration.description, min(100, int(done * 100 / total)) if total else 100)
+
+    def run(self):
+        try:
+            if self.migrator.run_backfills(progress=self.report_progress,
+                                           cancelled=self.isInterruptionRequested):
+                self.migrations_finished.emit()
+            # Otherwise interrupted; the backfill resumes next launch
+        except Exception as e:
+            self.error_occurred.emit(f"Error upgrading database: {str(e)}")
@@ -0,0 +1,21 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from api.ollama_client import OllamaError
+
+class ModelListWorker(QThread):
+    """Worker thread fetching the installed models, so a slow server never blocks the window"""
+    models_loaded = pyqtSignal(list)
+    error_occurred = pyqtSignal(str)  # The server answered with an error
+    connection_failed = pyqtSignal(str)  # The server could not be reached
+
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
+
+    def run(self):
+        try:
+            self.models_loaded.emit(self.client.model_names())
+        except OllamaError as e:
+            self.error_occurred.emit(f"Failed to get models: {str(e)}")
+        except Exception as e:
+            self.connection_failed.emit(str(e))
@@ -0,0 +1,199 @@
+import json
+import requests
+
+from api.scheduler import Priority, get_scheduler
+from database.models import messages_json
+from tracing import get_tracer
+
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Seconds to wait for a connection or for the next bytes of a response
+DEFAULT_TIMEOUT = 60
+
+
+class OllamaError(Exception):
+    """Raised when the Ollama server returns an error response"""
+
+
+class OllamaClient:
+    """
+    Thin client for the Ollama HTTP API.
+
+    Every call goes through the shared RequestScheduler so foreground chat,
+    background jobs and batch runs never compete for the server unchecked.
+    This module must stay free of Qt imports.
+    """
+
+    def __init__(self, base_url="http://localhost:11434", scheduler=None, timeout=DEFAULT_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.scheduler = scheduler or get_scheduler()
+        self.timeout = timeout
+        self.session = requests.Session()
+        self._digests = {}
+
+    def _url(self, path):
+        return f"{self.base_url}{path}"
+
+    def _check(self, response):
+        if response.status_code != 200:
+            raise OllamaError(f"Error: {response.status_code} - {response.text}")
+
+    def list_models(self, priority=Priority.INTERACTIVE):
+        """Return the raw model entries from /api/tags"""
+        with self.scheduler.slot(None, priority):
+            response = self.session.get(self._url("/api/tags"), timeout=self.timeout)
+        self._check(response)
+        return response.json().get("models", [])
+
+    def model_names(self, priority=Priority.INTERACTIVE):
+        """Return the names of all locally available models"""
+        return [model["name"] for model in self.list_models(priority)]
+
+    def model_digest(self, model, priority=Priority.INTERACTIVE):
+        """Return the digest of a model's weights, falling back to its name"""
+        if model not in self._digests:
+            try:
+                for entry in self.list_models(priority):
+                    self._digests[entry["name"]] = entry.get("digest") or entry["name"]
+            except (OllamaError, requests.RequestException):
+                return model
+        return self._digests.get(model, model)
+
+    def show(self, model, priority=Priority.INTERACTIVE):
+        """Return model details from /api/show"""
+        with self.scheduler.slot(None, priority):
+            response = self.session.post(self._url("/api/show"),
+                                         json={"model": model}, timeout=self.timeout)
+        self._check(response)
+        return response.json()
+
+    def chat_stream(self, model, messages, params=None, priority=Priority.INTERACTIVE):
+        """
+        Stream a chat completion
+
+        Args:
+            model: Model name
+            messages: List of API-format message dicts
+            params: Extra payload fields (temperature, top_p, ...)
+            priority: Scheduler priority class
+
+        Yields:
+            chunk: Each parsed NDJSON chunk from the server
+
+        Like chat_lines, close() the generator when not reading it to the end.
+        """
+        lines = self.chat_lines(model, messages, params, priority)
+        try:
+            for chunk in iter_chunks(lines):
+                yield chunk
+                if chunk.get("done", False):
+                    break
+        finally:
+            lines.close()
+
+    def chat_lines(self, model, messages, params=None, priority=Priority.INTERACTIVE):
+        """
+        Stream a chat completion as raw NDJSON lines (bytes), unparsed
+
+        Used by chat_stream and by the session recorder, which stores the
+        exact bytes the server sent. The scheduler slot is held until the
+        generator is exhausted or closed, so callers that stop early must
+        close() it (contextlib.closing) instead of leaving that to the
+        garbage collector.
+        """
+        body = encode_chat_payload(model, messages, params, stream=True)
+        tracer = get_tracer()
+
+        ticket = self.scheduler.acquire(model, priority)
+        try:
+            tracer.mark("request_sent", model=model)
+            with self.session.post(self._url("/api/chat"), data=body, headers=JSON_HEADERS,
+                                   stream=True, timeout=self.timeout) as response:
+                tracer.mark("first_byte", status=response.status_code)
+                self._check(response)
+                for line in response.iter_lines():
+                    if priority >= Priority.BACKGROUND:
+                        ticket.check_preempted()
+                    yield line
+        finally:
+            self.scheduler.release(ticket)
+
+    def chat(self, model, messages, params=None, priority=Priority.INTERACTIVE):
+        """Run a non-streaming chat completion and return the response dict"""
+        body = encode_chat_payload(model, messages, params, stream=False)
+
+        with self.scheduler.slot(model, priority):
+            response = self.session.post(self._url("/api/chat"), data=body, headers=JSON_HEADERS,
+                                         timeout=self.timeout)
+        self._check(response)
+        return response.json()
+
+    def embed(self, model, inputs, priority=Priority.BACKGROUND):
+        """
+        Embed one or more strings with /api/embed
+
+        Returns:
+            embeddings: List of float lists, one per input
+        """
+        if isinstance(inputs, str):
+            inputs = [inputs]
+
+        with self.scheduler.slot(model, priority) as ticket:
+            if priority >= Priority.BACKGROUND:
+                ticket.check_preempted()
+            response = self.session.post(self._url("/api/embed"),
+                                         json={"model": model, "input": inputs},
+                                         timeout=self.timeout)
+        self._check(response)
+        return response.json().get("embeddings", [])
+
+
+def build_chat_payload(model, messages, params=None, stream=True):
+    """Build the /api/chat request body the same way the app always has"""
+    payload = {
+        "model": model,
+        "messages": messages,
+        "stream": stream
+    }
+
+    # Add optional parameters if provided
+    for param, value in (params or {}).items():
+        payload[param] = value
+
+    return payload
+
+
+def encode_chat_payload(model, messages, params=None, stream=True):
+    """
+    build_chat_payload as JSON bytes
+
+    Messages may be Message objects or API-format dicts; a Message's
+    cached JSON fragment is spliced in instead of serializing it again.
+    """
+    payload = build_chat_payload(model, None, params, stream)
+    del payload["messages"]
+    fields = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return b'{"messages":' + messages_json(messages) + b',' + fields[1:]
+
+
+def iter_chunks(lines):
+    """Parse an iterable of NDJSON byte lines, skipping blanks and bad JSON"""
+    for line in lines:
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            continue
+
+
+def chunk_token(chunk):
+    """Extract the text token from a chat or generate chunk, or None"""
+    message = chunk.get("message")
+    if message and "content" in message:
+        return message["content"]
+    # Alternative format - direct "response" field
+    if "response" in chunk:
+        return chunk["response"]
+    return None
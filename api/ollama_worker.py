@@ -1,15 +1,29 @@
-import json
-import requests
+import logging
+from contextlib import closing
+
 from PyQt6.QtCore import QThread, pyqtSignal
 
+from api.ollama_client import OllamaClient, chunk_token
+from api.scheduler import Priority
+from database.models import Message, as_message
+from database.response_cache import is_deterministic
+from tracing import get_tracer
+
+logger = logging.getLogger(__name__)
+
 class OllamaWorker(QThread):
     """Worker thread for handling Ollama API requests"""
     token_received = pyqtSignal(str)
     response_complete = pyqtSignal(str)
     error_occurred = pyqtSignal(str)
     progress_update = pyqtSignal(int)  # For progress updates
-    
-    def __init__(self, model, prompt, conversation, params=None, image_data=None, base_url="http://localhost:11434"):
+    cache_hit = pyqtSignal(str)  # Emitted when a response is replayed from a cache
+    semantic_match = pyqtSignal(str, float)  # Answer to a similar prompt, offered instead of a reply
+
+    def __init__(self, model, prompt, conversation, params=None, image_data=None,
+                 base_url="http://localhost:11434", priority=Priority.INTERACTIVE, client=None,
+                 response_cache=None, semantic_cache=None, embedding_model=None, system_prompt=None,
+                 retriever=None, trace_id=None, journal=None, journal_stream=None, refresh_cache=False):
         super().__init__()
         self.model = model
         self.prompt = prompt
@@ -19,82 +33,166 @@ class OllamaWorker(QThread):
         self.params = params or {}
         self.token_count = 0
         self.base_url = base_url
+        self.priority = priority
+        self.client = client or OllamaClient(base_url)
+        # Only set when the caller opted in to exact-match response caching
+        self.response_cache = response_cache
+        # Semantic cache lookups need the embedding model and the system prompt
+        self.semantic_cache = semantic_cache
+        self.embedding_model = embedding_model
+        self.system_prompt = system_prompt
+        # Regenerate asks for a new answer: skip cache lookups, but store the reply
+        self.refresh_cache = refresh_cache
+        # Callable returning document excerpts relevant to the prompt (or None)
+        self.retriever = retriever
+        self.retrieved_context = None
+        # Request id from the tracer (None while tracing is off)
+        self.trace_id = trace_id
+        # Crash-safe copy of the streamed tokens (StreamJournal and stream id)
+        self.journal = journal
+        self.journal_stream = journal_stream
+
+    def build_messages(self):
+        """Build the message list sent to the server (Messages, serialized by the client)"""
+        # Prepare the current message, with the image if available
+        current_message = Message("user", self.prompt, images=[self.image_data] if self.image_data else None)
+
+        # Add to conversation history; earlier messages reuse their cached payloads
+        messages = [as_message(msg) for msg in self.conversation]
         
+        # Only the top-k relevant document chunks are sent, never whole documents
+        if self.retrieved_context:
+            messages.append(Message("system", self.retrieved_context))
+            
+        messages.append(current_message)
+        return messages
+
+    def replay_tokens(self, tokens):
+        """Emit cached tokens through the same signals as a live stream"""
+        max_tokens = self.params.get("max_tokens", 2048)
+        for token in tokens:
+            self.full_response += token
+            self.token_count += 1
+            self.token_received.emit(token)
+            self.progress_update.emit(min(100, int((self.token_count / max_tokens) * 100)))
+
+        self.response_complete.emit(self.full_response)
+        self.progress_update.emit(100)
+
+    def semantic_lookup(self):
+        """
+        Embed the prompt and look for a near-duplicate answered before
+
+        Returns:
+            (namespace, embedding, hit): hit is (response, similarity) or None;
+            namespace is None when the semantic cache does not apply
+        """
+        if self.semantic_cache is None or not self.embedding_model or self.image_data:
+            return None, None, None
+
+        # An answer grounded in attached documents depends on them, not only on the prompt
+        if self.retrieved_context:
+            return None, None, None
+
+        # Follow-up turns depend on earlier context, so only standalone prompts qualify
+        if any(as_message(msg).role == "user" for msg in self.conversation):
+            return None, None, None
+
+        try:
+            embedding = self.client.embed(self.embedding_model, self.prompt, self.priority)[0]
+        except Exception as e:
+            # No embedding model available - just generate normally
+            logger.debug("Semantic cache lookup skipped: %s", e)
+            return None, None, None
+
+        namespace = self.semantic_cache.namespace(self.model, self.system_prompt, self.embedding_model)
+        if self.refresh_cache:
+            return namespace, embedding, None
+        return namespace, embedding, self.semantic_cache.lookup(namespace, embedding)
+
     def run(self):
+        tracer = get_tracer()
+        profiler = tracer.take_profiler()
+        if profiler is not None:
+            profiler.enable()
         try:
-            # Prepare the current message
-            current_message = {"role": "user", "content": self.prompt}
-            
-            # Add image if available
-            if self.image_data:
-                current_message["images"] = [self.image_data]
-                
-            # Add to conversation history
-            conversation_copy = self.conversation.copy()
-            conversation_copy.append(current_message)
-            
-            # Create the payload with parameters
-            payload = {
-                "model": self.model,
-                "messages": conversation_copy,
-                "stream": True  # Enable streaming responses
-            }
-            
-            # Add optional parameters if provided
-            for param, value in self.params.items():
-                payload[param] = value
-                
-            # Configure API endpoint
-            api_endpoint = f"{self.base_url}/api/chat"
-            
-            # Make the API call with streaming
-            with requests.post(api_endpoint, json=payload, stream=True) as response:
-                if response.status_code == 200:
-                    # Process the streaming response
-                    for line in response.iter_lines():
-                        if line:
-                            try:
-                                # Parse JSON from the line
-                                chunk = json.loads(line.decode('utf-8'))
-                                
-                                # Check if we received a token/response piece
-                                if "message" in chunk and "content" in chunk["message"]:
-                                    token = chunk["message"]["content"]
-                                    self.full_response += token
-                                    self.token_count += 1
-                                    self.token_received.emit(token)
-                                    
-                                # Alternative format - direct "response" field
-                                elif "response" in chunk:
-                                    token = chunk["response"]
-                                    self.full_response += token
-                                    self.token_count += 1
-                                    self.token_received.emit(token)
-                                    
-                                # Update progress (assuming max_tokens parameter is used)
-                                max_tokens = self.params.get("max_tokens", 2048)
-                                progress = min(100, int((self.token_count / max_tokens) * 100))
-                                self.progress_update.emit(progress)
-                                    
-                                # Check if we're done
-                                if chunk.get("done", False):
-                                    self.response_complete.emit(self.full_response)
-                                    self.progress_update.emit(100)  # Ensure progress bar completes
-                                    break
-                            except json.JSONDecodeError:
-                                continue
-                else:
-                    self.error_occurred.emit(f"Error: {response.status_code} - {response.text}")
-                
+            with tracer.request(self.trace_id):
+                self.generate(tracer)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                tracer.save_profile(profiler, self.trace_id)
+
+    def generate(self, tracer):
+        """Produce the response, from a cache or the server"""
+        try:
+            if self.retriever is not None:
+                with tracer.span("retrieve"):
+                    self.retrieved_context = self.retriever(self.prompt)
+            messages = self.build_messages()
+            tracer.mark("payload_built", messages=len(messages))
+            max_tokens = self.params.get("max_tokens", 2048)
+
+            # Serve identical requests from the response cache when enabled; a
+            # sampled reply is not the answer to the request, only one of many
+            cache_key = None
+            if self.response_cache is not None and is_deterministic(self.params):
+                cache_key = self.response_cache.make_key(
+                    self.client.model_digest(self.model), self.params, messages
+                )
+                cached_tokens = None if self.refresh_cache else self.response_cache.get(cache_key)
+                if cached_tokens is not None:
+                    self.cache_hit.emit("exact")
+                    self.replay_tokens(cached_tokens)
+                    return
+
+            # A similar prompt is not the same prompt: the user decides whether its answer fits
+            namespace, embedding, semantic_hit = self.semantic_lookup()
+            if semantic_hit is not None:
+                self.semantic_match.emit(*semantic_hit)
+                return
+
+            tokens = []
+            # Stream through the shared client so the scheduler sees this request
+            with closing(self.client.chat_stream(self.model, messages, self.params, self.priority)) as chunks:
+                for chunk in chunks:
+                    # Check if we received a token/response piece
+                    token = chunk_token(chunk)
+                    if token is not None:
+                        if not tokens:
+                            tracer.mark("first_token")
+                        self.full_response += token
+                        self.token_count += 1
+                        tokens.append(token)
+                        if self.journal is not None:
+                            self.journal.append(self.journal_stream, token)
+                        self.token_received.emit(token)
+
+                    # Update progress (assuming max_tokens parameter is used)
+                    progress = min(100, int((self.token_count / max_tokens) * 100))
+                    self.progress_update.emit(progress)
+
+                    # Check if we're done
+                    if chunk.get("done", False):
+                        if self.journal is not None:
+                            # Durable until the reply is committed
+                            self.journal.flush(self.journal_stream)
+                        if cache_key is not None:
+                            self.response_cache.put(cache_key, self.model, tokens)
+                        if namespace is not None:
+                            self.semantic_cache.add(namespace, self.prompt, self.full_response, embedding)
+                        self.response_complete.emit(self.full_response)
+                        self.progress_update.emit(100)  # Ensure progress bar completes
+                        break
+
         except Exception as e:
-            self.error_occurred.emit(f"Error: {str(e)}")
+            logger.warning("Request to %s failed: %s", self.model, e)
+            message = str(e)
+            self.error_occurred.emit(message if message.startswith("Error:") else f"Error: {message}")
 
     def get_models(self):
         """Get available models from Ollama"""
         try:
-            response = requests.get(f"{self.base_url}/api/tags")
-            if response.status_code == 200:
-                return [model['name'] for model in response.json()['models']]
-            return []
+            return self.client.model_names()
         except Exception:
-            return []
\ No newline at end of file
+            return []
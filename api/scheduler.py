@@ -0,0 +1,276 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+from stats import percentile
+
+
+class Priority:
+    """Priority classes for outbound model requests (lower runs first)"""
+    INTERACTIVE = 0
+    BACKGROUND = 10
+
+    NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+    @classmethod
+    def name(cls, priority):
+        return cls.NAMES.get(priority, str(priority))
+
+
+class SchedulerTimeout(Exception):
+    """Raised when a request could not get a slot before its deadline"""
+
+
+class RequestPreempted(Exception):
+    """Raised inside a background request that yielded to interactive work"""
+
+
+class Ticket:
+    """A single request waiting for, or holding, a scheduler slot"""
+    __slots__ = ("model", "priority", "seq", "enqueued_at", "started_at",
+                 "granted", "preempted", "cancelled")
+
+    def __init__(self, model, priority, seq):
+        self.model = model
+        self.priority = priority
+        self.seq = seq
+        self.enqueued_at = time.perf_counter()
+        self.started_at = None
+        self.granted = False
+        self.cancelled = False
+        # Set when an interactive request needs this background slot back
+        self.preempted = threading.Event()
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    @property
+    def wait_time(self):
+        """Seconds spent in the queue before the slot was granted"""
+        end = self.started_at if self.started_at is not None else time.perf_counter()
+        return end - self.enqueued_at
+
+    def check_preempted(self):
+        """Raise RequestPreempted if the scheduler asked this request to yield"""
+        if self.preempted.is_set():
+            raise RequestPreempted(f"Background request for {self.model} preempted")
+
+
+class RequestScheduler:
+    """
+    Central gate for every outbound request to the Ollama server.
+
+    Requests are admitted in priority order, limited per model and in total.
+    Background requests are deferred while any interactive request is running
+    or queued, and running background requests are flagged for preemption
+    when interactive work arrives.
+    """
+
+    def __init__(self, per_model_limit=1, max_total=4, model_limits=None,
+                 preempt_background=True, metrics_window=256):
+        """
+        Args:
+            per_model_limit: Default number of concurrent requests per model
+            max_total: Maximum number of concurrent requests to the server
+            model_limits: Optional dict overriding the limit for specific models
+            preempt_background: Ask running background requests to yield
+                when an interactive request is waiting
+            metrics_window: Number of recent queue waits kept per priority
+        """
+        self.per_model_limit = per_model_limit
+        self.max_total = max_total
+        self.model_limits = dict(model_limits or {})
+        self.preempt_background = preempt_background
+
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._queue = []  # heap of waiting tickets
+        self._running = set()
+        self._running_per_model = defaultdict(int)
+        self._interactive_running = 0
+
+        # Queue-wait metrics per priority
+        self._metrics_window = metrics_window
+        self._granted = defaultdict(int)
+        self._timeouts = defaultdict(int)
+        self._preemptions = defaultdict(int)
+        self._total_wait = defaultdict(float)
+        self._max_wait = defaultdict(float)
+        self._recent_waits = defaultdict(lambda: deque(maxlen=self._metrics_window))
+
+    def set_model_limit(self, model, limit):
+        """Override the concurrency limit for one model"""
+        with self._cond:
+            self.model_limits[model] = limit
+            self._cond.notify_all()
+
+    def _limit_for(self, model):
+        return self.model_limits.get(model, self.per_model_limit)
+
+    def _interactive_pending(self):
+        return self._interactive_running > 0 or any(
+            t.priority < Priority.BACKGROUND for t in self._queue
+        )
+
+    def _can_run(self, ticket):
+        """Check whether a waiting ticket may be granted a slot right now"""
+        if len(self._running) >= self.max_total:
+            return False
+        if ticket.model is not None and \
+                self._running_per_model[ticket.model] >= self._limit_for(ticket.model):
+            return False
+        if ticket.priority >= Priority.BACKGROUND and self._interactive_pending():
+            return False
+        # Don't overtake a better ticket that is waiting for the same model
+        for other in self._queue:
+            if other is not ticket and other < ticket and other.model == ticket.model:
+                return False
+        return True
+
+    def _request_preemption(self):
+        """Flag running background tickets so they hand their slots back"""
+        for running in self._running:
+            if running.priority >= Priority.BACKGROUND and not running.preempted.is_set():
+                running.preempted.set()
+                self._preemptions[running.priority] += 1
+
+    def acquire(self, model=None, priority=Priority.INTERACTIVE, timeout=None):
+        """
+        Wait for a slot to talk to the server
+
+        Args:
+            model: Model the request targets, or None for model-agnostic calls
+            priority: One of the Priority classes
+            timeout: Optional maximum seconds to wait in the queue
+
+        Returns:
+            ticket: The granted Ticket, to be passed to release()
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._cond:
+            ticket = Ticket(model, priority, next(self._seq))
+            heapq.heappush(self._queue, ticket)
+
+            if priority < Priority.BACKGROUND and self.preempt_background:
+                self._request_preemption()
+
+            while not self._can_run(ticket):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                    ticket.cancelled = True
+                    self._timeouts[priority] += 1
+                    self._cond.notify_all()
+                    raise SchedulerTimeout(
+                        f"No slot for {model or 'server'} after {timeout:.1f}s"
+                    )
+                self._cond.wait(remaining)
+
+            self._queue.remove(ticket)
+            heapq.heapify(self._queue)
+            self._grant(ticket)
+            self._cond.notify_all()
+            return ticket
+
+    def _grant(self, ticket):
+        ticket.granted = True
+        ticket.started_at = time.perf_counter()
+        self._running.add(ticket)
+        if ticket.model is not None:
+            self._running_per_model[ticket.model] += 1
+        if ticket.priority < Priority.BACKGROUND:
+            self._interactive_running += 1
+
+        wait = ticket.wait_time
+        self._granted[ticket.priority] += 1
+        self._total_wait[ticket.priority] += wait
+        self._max_wait[ticket.priority] = max(self._max_wait[ticket.priority], wait)
+        self._recent_waits[ticket.priority].append(wait)
+
+    def release(self, ticket):
+        """Hand a slot back to the scheduler"""
+        with self._cond:
+            if ticket not in self._running:
+                return
+            self._running.discard(ticket)
+            if ticket.model is not None:
+                self._running_per_model[ticket.model] -= 1
+            if ticket.priority < Priority.BACKGROUND:
+                self._interactive_running -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, model=None, priority=Priority.INTERACTIVE, timeout=None):
+        """Context manager holding a slot for the duration of a request"""
+        ticket = self.acquire(model, priority, timeout)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def is_interactive_active(self):
+        """True while any interactive request is running or queued"""
+        with self._cond:
+            return self._interactive_pending()
+
+    def metrics(self):
+        """
+        Snapshot of queue-wait metrics
+
+        Returns:
+            metrics: Dictionary keyed by priority name with counts and wait times
+        """
+        with self._cond:
+            snapshot = {
+                "running": len(self._running),
+                "queued": len(self._queue),
+            }
+            for priority in set(self._granted) | set(self._timeouts):
+                waits = sorted(self._recent_waits[priority])
+                granted = self._granted[priority]
+                snapshot[Priority.name(priority)] = {
+                    "granted": granted,
+                    "timeouts": self._timeouts[priority],
+                    "preemptions": self._preemptions[priority],
+                    "avg_wait": self._total_wait[priority] / granted if granted else 0.0,
+                    "max_wait": self._max_wait[priority],
+                    "p50_wait": percentile(waits, 0.50) or 0.0,
+                    "p95_wait": percentile(waits, 0.95) or 0.0,
+                }
+            return snapshot
+
+    def reset_metrics(self):
+        """Clear all collected queue-wait metrics"""
+        with self._cond:
+            self._granted.clear()
+            self._timeouts.clear()
+            self._preemptions.clear()
+            self._total_wait.clear()
+            self._max_wait.clear()
+            self._recent_waits.clear()
+
+
+_default_scheduler = None
+_default_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Return the process-wide scheduler shared by all Ollama clients"""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = RequestScheduler()
+        return _default_scheduler
+
+
+def configure_scheduler(**kwargs):
+    """Replace the process-wide scheduler, e.g. with limits from config"""
+    global _default_scheduler
+    with _default_lock:
+        _default_scheduler = RequestScheduler(**kwargs)
+        return _default_scheduler
@@ -0,0 +1,35 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from database.transfer import export_conversations, import_conversations
+
+class TransferWorker(QThread):
+    """Worker thread exporting or importing every conversation; requestInterruption() cancels it"""
+    progress_update = pyqtSignal(str)
+    transfer_finished = pyqtSignal(dict)  # Conversation and message counts
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, db, path, importing=False):
+        super().__init__()
+        self.db = db
+        self.path = path
+        self.importing = importing
+
+    def run(self):
+        try:
+            if self.importing:
+                stats = import_conversations(
+                    self.db, self.path,
+                    progress=lambda conversations, messages: self.progress_update.emit(
+                        f"Importing... {conversations} conversations"),
+                    cancelled=self.isInterruptionRequested
+                )
+            else:
+                stats = export_conversations(
+                    self.db, self.path,
+                    progress=lambda done, total: self.progress_update.emit(
+                        f"Exporting... {done}/{total} conversations"),
+                    cancelled=self.isInterruptionRequested
+                )
+            self.transfer_finished.emit(stats)
+        except Exception as e:
+            self.error_occurred.emit(f"Error {'importing' if self.importing else 'exporting'}: {str(e)}")
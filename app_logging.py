@@ -0,0 +1,79 @@
+"""
+Logging setup for the application.
+
+Modules log through `logging.getLogger(__name__)` with lazy %-style
+arguments, so a disabled level costs one integer comparison and no string
+formatting. configure_logging() routes every enabled record through a
+QueueHandler; a QueueListener thread does the file I/O, so the GUI thread
+and the streaming worker never block on disk.
+
+Per-module verbosity comes from log_settings["levels"], keyed by logger
+name, e.g. {"ui.message_widget": "DEBUG", "api": "WARNING"}.
+"""
+import logging
+import logging.handlers
+import queue
+import sys
+from pathlib import Path
+
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(threadName)s %(name)s: %(message)s"
+
+_listener = None
+
+
+def configure_logging(settings, log_dir=None):
+    """
+    Install the queue handler and start the background writer
+
+    Args:
+        settings: The log_settings config section
+        log_dir: Directory for rotating log files (default: ./data/logs)
+
+    Returns:
+        listener: The running QueueListener (already started)
+    """
+    global _listener
+    shutdown_logging()
+
+    handlers = []
+    formatter = logging.Formatter(LOG_FORMAT)
+    if settings.get("file", True):
+        log_dir = Path(log_dir or Path.cwd() / "data" / "logs")
+        log_dir.mkdir(parents=True, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_dir / "ollama_chat.log",
+            maxBytes=settings.get("max_bytes", 5 * 1024 * 1024),
+            backupCount=settings.get("backup_count", 3),
+            encoding="utf-8"
+        )
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    if settings.get("console", False):
+        console_handler = logging.StreamHandler(sys.stderr)
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
+
+    # Unbounded so logging never blocks the caller; records are small
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(settings.get("level", "INFO"))
+
+    for name, level in settings.get("levels", {}).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
@@ -0,0 +1,269 @@
+"""
+Headless batch runner for JSONL prompt workloads.
+
+Reads prompts from a JSONL file (streamed, one record per line), runs each
+against one or more models with bounded concurrency and writes results plus
+timing metrics to a JSONL file and/or the conversation database.
+
+Each input line is a JSON object with either a "prompt" string or a
+"messages" list, and optionally "id", "system", "model" and "options":
+
+    {"id": "q1", "prompt": "Explain WAL mode", "options": {"temperature": 0}}
+
+Usage:
+
+    python batch_runner.py prompts.jsonl -m llama3 -m mistral -c 4 -o results.jsonl
+    python batch_runner.py prompts.jsonl -m llama3 --db data/ollama_chat.db --resume
+
+This module must not import PyQt so it starts quickly on servers.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from api.ollama_client import OllamaClient, chunk_token
+from api.scheduler import configure_scheduler
+from config import load_config
+from database import DatabaseManager
+from stats import percentile
+
+
+def iter_jobs(input_path, models):
+    """
+    Stream (job_key, model, record) tuples from a JSONL file
+
+    The job key identifies a (line, model) pair for checkpointing.
+    """
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Skipping line {line_no}: {e}", file=sys.stderr)
+                continue
+
+            record_models = [record["model"]] if record.get("model") else models
+            for model in record_models:
+                yield f"{line_no}:{model}", model, record
+
+
+def build_messages(record):
+    """Turn an input record into an API-format message list"""
+    if "messages" in record:
+        messages = list(record["messages"])
+    else:
+        messages = [{"role": "user", "content": record["prompt"]}]
+
+    if record.get("system"):
+        messages.insert(0, {"role": "system", "content": record["system"]})
+    return messages
+
+
+class BatchRunner:
+    """Runs jobs concurrently and records results, checkpoints and metrics"""
+
+    def __init__(self, client, output_path=None, db=None, checkpoint_path=None, concurrency=2,
+                 append=False):
+        self.client = client
+        self.output_path = output_path
+        # Only a resumed run keeps the results already in the output file
+        self.append = append
+        self.db = db
+        self.checkpoint_path = checkpoint_path
+        self.concurrency = concurrency
+
+        self.completed = set()
+        self.results = []  # (latency, ttft, tokens) per successful job
+        self.errors = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self._output = None
+        self._checkpoint = None
+
+    def load_checkpoint(self):
+        """Read job keys finished by a previous run"""
+        if self.checkpoint_path and Path(self.checkpoint_path).exists():
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                self.completed = {line.strip() for line in f if line.strip()}
+        return len(self.completed)
+
+    def run_job(self, job_key, model, record):
+        """Run one prompt against one model and return a result record"""
+        messages = build_messages(record)
+        started = time.perf_counter()
+        first_token_at = None
+        tokens = 0
+        parts = []
+        final_chunk = {}
+
+        try:
+            for chunk in self.client.chat_stream(model, messages, record.get("options")):
+                token = chunk_token(chunk)
+                if token:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    parts.append(token)
+                    tokens += 1
+                if chunk.get("done", False):
+                    final_chunk = chunk
+            error = None
+        except Exception as e:
+            error = str(e)
+
+        finished = time.perf_counter()
+        return {
+            "job": job_key,
+            "id": record.get("id"),
+            "model": model,
+            "messages": messages,
+            "response": "".join(parts),
+            "error": error,
+            "metrics": {
+                "latency_s": finished - started,
+                "ttft_s": (first_token_at - started) if first_token_at else None,
+                "tokens": tokens,
+                "tokens_per_s": tokens / (finished - first_token_at)
+                if first_token_at and finished > first_token_at else None,
+                "eval_count": final_chunk.get("eval_count"),
+                "eval_duration_ns": final_chunk.get("eval_duration"),
+            },
+        }
+
+    def record(self, result):
+        """Persist a result and mark its job as done"""
+        with self._lock:
+            if result["error"]:
+                self.errors += 1
+                print(f"{result['job']} failed: {result['error']}", file=sys.stderr)
+            else:
+                metrics = result["metrics"]
+                self.results.append((metrics["latency_s"], metrics["ttft_s"], metrics["tokens"]))
+
+            if self._output:
+                self._output.write(json.dumps(result, ensure_ascii=False) + "\n")
+                self._output.flush()
+
+            if self.db and not result["error"]:
+                title = str(result["id"] or result["job"])
+                self.db.save_conversation(
+                    title=f"[batch] {title}"[:60],
+                    model=result["model"],
+                    messages=result["messages"] + [{"role": "assistant", "content": result["response"]}]
+                )
+
+            # Failed jobs are not checkpointed, so --resume retries them
+            if self._checkpoint and not result["error"]:
+                self._checkpoint.write(result["job"] + "\n")
+                self._checkpoint.flush()
+
+    def run(self, jobs):
+        """Run all jobs, keeping at most `concurrency` * 2 in memory"""
+        in_flight = threading.BoundedSemaphore(self.concurrency * 2)
+
+        def execute(job):
+            try:
+                self.record(self.run_job(*job))
+            except Exception as e:
+                # Nobody reads the future's result; count it instead of losing it
+                with self._lock:
+                    self.errors += 1
+                print(f"{job[0]} could not be recorded: {e}", file=sys.stderr)
+            finally:
+                in_flight.release()
+
+        if self.output_path:
+            self._output = open(self.output_path, "a" if self.append else "w", encoding="utf-8")
+        if self.checkpoint_path:
+            self._checkpoint = open(self.checkpoint_path, "a", encoding="utf-8")
+
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                for job in jobs:
+                    if job[0] in self.completed:
+                        self.skipped += 1
+                        continue
+                    in_flight.acquire()
+                    pool.submit(execute, job)
+        finally:
+            for f in (self._output, self._checkpoint):
+                if f:
+                    f.close()
+        return time.perf_counter() - started
+
+    def summary(self, wall_time):
+        """Build the final throughput summary"""
+        latencies = sorted(r[0] for r in self.results)
+        ttfts = sorted(r[1] for r in self.results if r[1] is not None)
+        tokens = sum(r[2] for r in self.results)
+
+        return {
+            "completed": len(self.results),
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "wall_time_s": wall_time,
+            "requests_per_s": len(self.results) / wall_time if wall_time else 0.0,
+            "tokens": tokens,
+            "tokens_per_s": tokens / wall_time if wall_time else 0.0,
+            "latency_p50_s": percentile(latencies, 0.50),
+            "latency_p95_s": percentile(latencies, 0.95),
+            "ttft_p50_s": percentile(ttfts, 0.50),
+            "ttft_p95_s": percentile(ttfts, 0.95),
+        }
+
+
+def main(argv=None):
+    config = load_config()
+
+    parser = argparse.ArgumentParser(description="Run a JSONL prompt workload against Ollama")
+    parser.add_argument("input", help="JSONL file with one prompt per line")
+    parser.add_argument("-m", "--model", action="append", default=[],
+                        help="Model to run (repeat for several models)")
+    parser.add_argument("-c", "--concurrency", type=int, default=2)
+    parser.add_argument("-o", "--output", help="Write results to this JSONL file (appended to with --resume)")
+    parser.add_argument("--db", help="Also save each result as a conversation in this database")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output or input>.ckpt)")
+    parser.add_argument("--resume", action="store_true", help="Skip jobs finished by a previous run")
+    parser.add_argument("--base-url", default=config["api_settings"]["base_url"])
+    args = parser.parse_args(argv)
+
+    if not args.output and not args.db:
+        parser.error("give --output and/or --db")
+    if not args.model:
+        parser.error("give at least one --model (records may override it with a \"model\" field)")
+
+    checkpoint = args.checkpoint or f"{args.output or args.input}.ckpt"
+    if not args.resume and Path(checkpoint).exists():
+        Path(checkpoint).unlink()
+
+    # The batch is the only client in this process, so let it use every slot
+    scheduler = configure_scheduler(per_model_limit=args.concurrency,
+                                    max_total=args.concurrency * max(1, len(args.model)))
+    client = OllamaClient(args.base_url, scheduler=scheduler, timeout=config["api_settings"]["timeout"])
+
+    runner = BatchRunner(
+        client,
+        output_path=args.output,
+        db=DatabaseManager(args.db) if args.db else None,
+        checkpoint_path=checkpoint,
+        concurrency=args.concurrency,
+        append=args.resume
+    )
+    if args.resume:
+        print(f"Resuming: {runner.load_checkpoint()} jobs already done", file=sys.stderr)
+
+    wall_time = runner.run(iter_jobs(args.input, args.model))
+    summary = runner.summary(wall_time)
+    print(json.dumps(summary, indent=2))
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+# Stand-alone performance benchmarks; run a module with `python -m benchmarks.<name>`
@@ -0,0 +1,150 @@
+"""
+Message compression threshold report.
+
+Saves the same conversations into a temporary database once per
+compression threshold (plus once uncompressed) and reports the database
+size, the space saved against the uncompressed run and the cost of
+saving, loading and content-searching a conversation.
+
+The default corpus is synthetic: short chat turns, long answers with code
+blocks and pasted logs. Use --source to sample the messages of a real
+conversation database instead.
+
+    python -m benchmarks.bench_compression --thresholds 512 4096 16384
+    python -m benchmarks.bench_compression --source data/ollama_chat.db --codec zlib
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+from pathlib import Path
+
+from database import DatabaseManager
+from database.compression import DEFAULT_THRESHOLD, available_codecs, default_codec
+
+from .bench_db import WORDS, make_text, timed
+
+DEFAULT_THRESHOLDS = (512, 1024, DEFAULT_THRESHOLD, 16384)
+MESSAGES_PER_CONVERSATION = 10
+
+
+def make_log(rng, lines):
+    levels = ("DEBUG", "INFO", "INFO", "INFO", "WARNING", "ERROR")
+    return "\n".join(
+        f"2024-05-{rng.randint(1, 28):02d} 12:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d},"
+        f"{rng.randint(0, 999):03d} {rng.choice(levels):<7} [worker-{rng.randint(1, 8)}] "
+        f"{make_text(rng, rng.randint(4, 14))} id={rng.getrandbits(32):08x}"
+        for _ in range(lines)
+    )
+
+
+def make_answer(rng):
+    parts = [make_text(rng, rng.randint(40, 120))]
+    for _ in range(rng.randint(0, 3)):
+        body = "\n".join(f"    {rng.choice(WORDS)} = {rng.choice(WORDS)}({rng.randint(0, 99)})"
+                         for _ in range(rng.randint(5, 40)))
+        parts.append(f"```python\ndef {rng.choice(WORDS)}():\n{body}\n```")
+        parts.append(make_text(rng, rng.randint(20, 60)))
+    return "\n\n".join(parts)
+
+
+def synthetic_conversations(rng, count):
+    """Conversations mixing short prompts, long answers and pasted logs"""
+    conversations = []
+    for _ in range(count):
+        messages = []
+        for i in range(MESSAGES_PER_CONVERSATION):
+            if i % 2:
+                content = make_answer(rng)
+            elif rng.random() < 0.15:
+                content = "Why does this fail?\n\n" + make_log(rng, rng.randint(20, 400))
+            else:
+                content = make_text(rng, rng.randint(5, 30))
+            messages.append({"role": "assistant" if i % 2 else "user", "content": content})
+        conversations.append(messages)
+    return conversations
+
+
+def source_conversations(db_path, count):
+    """Up to `count` conversations from an existing database, as plain text"""
+    source = DatabaseManager(db_path)
+    conversations = []
+    for summary in source.list_conversations(limit=count):
+        messages = source.get_conversation(summary["id"])["messages"]
+        conversations.append([{"role": m.role, "content": m.text} for m in messages if not m.image_path])
+    return conversations
+
+
+def run(thresholds=DEFAULT_THRESHOLDS, codec=None, conversations=200, repeats=20,
+        source=None, seed_value=0):
+    """
+    Run the benchmark
+
+    Returns:
+        results: List of dictionaries with size and timings per threshold
+    """
+    rng = random.Random(seed_value)
+    corpus = (source_conversations(source, conversations) if source
+              else synthetic_conversations(rng, conversations))
+    codec = codec or default_codec()
+    raw_bytes = sum(len(m["content"].encode("utf-8")) for c in corpus for m in c)
+    ids = [rng.randrange(len(corpus)) for _ in range(repeats)]
+    terms = [rng.choice(WORDS) for _ in range(repeats)]
+
+    results = []
+    baseline_size = None
+    for threshold in (0,) + tuple(thresholds):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DatabaseManager(Path(tmp) / "bench.db", compress_threshold=threshold, codec=codec)
+            saved_ids = [db.save_conversation(f"Bench {n}", "llama3", messages)
+                         for n, messages in enumerate(corpus)]
+            size = os.path.getsize(db.db_path)
+            with db.connect() as conn:
+                compressed = conn.execute("SELECT COUNT(*) FROM messages WHERE codec IS NOT NULL").fetchone()[0]
+            if baseline_size is None:
+                baseline_size = size
+
+            save = timed(lambda i: db.save_conversation("Timed", "llama3", corpus[ids[i]]), repeats)
+            load = timed(lambda i: db.get_conversation(saved_ids[ids[i]]), repeats)
+            search = timed(lambda i: db.search_by_content(terms[i], limit=20), repeats)
+
+        results.append({
+            "benchmark": f"compression.{codec if threshold else 'none'}.{threshold}",
+            "threshold": threshold,
+            "messages": sum(len(c) for c in corpus),
+            "compressed_messages": compressed,
+            "raw_mb": raw_bytes / 1e6,
+            "db_mb": size / 1e6,
+            "saved_pct": 100 * (baseline_size - size) / baseline_size if baseline_size else 0.0,
+            "save_ms": save["median_ms"],
+            "load_ms": load["median_ms"],
+            "search_content_ms": search["median_ms"],
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--thresholds", type=int, nargs="+", default=list(DEFAULT_THRESHOLDS))
+    parser.add_argument("--codec", choices=available_codecs())
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--source", help="Sample conversations from this database instead")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    results = run(args.thresholds, args.codec, args.conversations, args.repeats, args.source)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'threshold':>9} {'compressed':>10} {'db MB':>8} {'saved':>7} "
+          f"{'save ms':>8} {'load ms':>8} {'search ms':>9}")
+    for r in results:
+        print(f"{r['threshold'] or 'off':>9} {r['compressed_messages']:>10} {r['db_mb']:8.2f} "
+              f"{r['saved_pct']:6.1f}% {r['save_ms']:8.2f} {r['load_ms']:8.2f} {r['search_content_ms']:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
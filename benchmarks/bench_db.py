@@ -0,0 +1,120 @@
+"""
+Conversation database benchmark.
+
+Measures DatabaseManager save, update, list, search and load at 1k, 10k
+and 100k stored conversations (6 messages each) in a temporary database.
+
+    python -m benchmarks.bench_db --sizes 1000 10000
+
+Seeding 100k conversations takes a while and about 150 MB of disk.
+"""
+import argparse
+import json
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from database import DatabaseManager
+from stats import percentile
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+MESSAGES_PER_CONVERSATION = 6
+WORDS = ("sqlite index query model token stream python widget layout cache vector "
+         "prompt reply thread signal memory latency benchmark render scroll json").split()
+
+
+def make_text(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def make_messages(rng, count=MESSAGES_PER_CONVERSATION):
+    return [{"role": "user" if i % 2 == 0 else "assistant",
+             "content": make_text(rng, 12 if i % 2 == 0 else 80)} for i in range(count)]
+
+
+def seed(db, count, rng):
+    """Bulk-insert conversations directly; save_conversation would take minutes at 100k"""
+    start = datetime(2024, 1, 1)
+    with sqlite3.connect(db.db_path) as conn:
+        for first in range(0, count, 5000):
+            conversations = []
+            messages = []
+            for n in range(first, min(count, first + 5000)):
+                stamp = (start + timedelta(minutes=n)).isoformat()
+                conversations.append((n + 1, f"Conversation {n} {rng.choice(WORDS)}", "llama3", stamp, stamp))
+                for msg in make_messages(rng):
+                    messages.append((n + 1, msg["role"], msg["content"], stamp))
+            conn.executemany('''
+            INSERT INTO conversations (id, title, model, created_at, updated_at) VALUES (?, ?, ?, ?, ?)
+            ''', conversations)
+            conn.executemany('''
+            INSERT INTO messages (conversation_id, role, content, timestamp) VALUES (?, ?, ?, ?)
+            ''', messages)
+        conn.commit()
+
+
+def timed(operation, repeats):
+    timings = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        operation(i)
+        timings.append(1000 * (time.perf_counter() - start))
+    timings.sort()
+    return {
+        "median_ms": statistics.median(timings),
+        "p95_ms": percentile(timings, 0.95),
+    }
+
+
+def run(sizes=DEFAULT_SIZES, repeats=20, seed_value=0):
+    """
+    Run the benchmark
+
+    Returns:
+        results: List of dictionaries with per-operation timings at each size
+    """
+    rng = random.Random(seed_value)
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DatabaseManager(Path(tmp) / "bench.db")
+            seed(db, size, rng)
+            ids = [rng.randint(1, size) for _ in range(repeats)]
+            new_messages = make_messages(rng, MESSAGES_PER_CONVERSATION + 2)
+
+            operations = {
+                "save": lambda i: db.save_conversation(f"Bench {i}", "llama3", make_messages(rng)),
+                "update": lambda i: db.update_conversation(ids[i], messages=new_messages),
+                "list": lambda i: db.list_conversations(limit=20),
+                "search": lambda i: db.list_conversations(limit=20, search=WORDS[i % len(WORDS)]),
+                "search_content": lambda i: db.search_by_content(WORDS[i % len(WORDS)], limit=20),
+                "load": lambda i: db.get_conversation(ids[i]),
+            }
+            for name, operation in operations.items():
+                results.append(dict(benchmark=f"db.{name}.{size}", conversations=size,
+                                    **timed(operation, repeats)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeats)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for result in results:
+        print(f"{result['benchmark']:<28} median {result['median_ms']:8.2f} ms  p95 {result['p95_ms']:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+History search index benchmark.
+
+Fills a temporary database with synthetic conversations, builds the
+memory-mapped message index from it (random vectors stand in for
+embeddings, so only the app's own cost is measured) and times queries
+including the id-to-message lookup, at several database sizes.
+
+    python -m benchmarks.bench_history_index --sizes 1000 10000 100000
+"""
+import argparse
+import json
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from database import DatabaseManager
+from database.vector_store import MappedVectorIndex
+from stats import percentile
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+MESSAGES_PER_CONVERSATION = 10
+
+
+def populate(db, message_count, seed=0):
+    """Bulk insert synthetic conversations directly for speed"""
+    rng = random.Random(seed)
+    words = "model token stream cache index vector query answer python sqlite".split()
+    now = datetime.now().isoformat()
+
+    with sqlite3.connect(db.db_path) as conn:
+        cursor = conn.cursor()
+        for conversation in range(message_count // MESSAGES_PER_CONVERSATION):
+            cursor.execute('''
+            INSERT INTO conversations (title, model, system_prompt, created_at, updated_at)
+            VALUES (?, 'bench', NULL, ?, ?)
+            ''', (f"Conversation {conversation}", now, now))
+            conversation_id = cursor.lastrowid
+            cursor.executemany('''
+            INSERT INTO messages (conversation_id, role, content, timestamp)
+            VALUES (?, ?, ?, ?)
+            ''', [(conversation_id, "user" if i % 2 == 0 else "assistant",
+                   " ".join(rng.choices(words, k=40)), now)
+                  for i in range(MESSAGES_PER_CONVERSATION)])
+        conn.commit()
+
+
+def run(sizes=DEFAULT_SIZES, dim=384, dtype="float32", queries=50, batch_size=256, seed=0):
+    """
+    Run the benchmark
+
+    Returns:
+        results: List of dictionaries, one per database size
+    """
+    rng = np.random.default_rng(seed)
+    results = []
+
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DatabaseManager(Path(tmp) / "bench.db")
+            populate(db, size, seed)
+            index = MappedVectorIndex(Path(tmp) / "history_index", dtype=dtype)
+
+            # Same loop the HistoryIndexer runs, minus the embedding request
+            start = time.perf_counter()
+            while True:
+                rows = db.get_messages_after(index.last_id, batch_size)
+                if not rows:
+                    break
+                vectors = rng.standard_normal((len(rows), dim), dtype=np.float32)
+                index.add([row['id'] for row in rows], vectors)
+            build_s = time.perf_counter() - start
+
+            latencies = []
+            for _ in range(queries):
+                query = rng.standard_normal(dim, dtype=np.float32)
+                start = time.perf_counter()
+                ids, _ = index.search(query, 80)
+                db.get_messages_by_ids(ids[0].tolist())
+                latencies.append(time.perf_counter() - start)
+            latencies.sort()
+
+            # Batched queries amortize the pass over the mapped file
+            batch = rng.standard_normal((queries, dim), dtype=np.float32)
+            start = time.perf_counter()
+            index.search(batch, 20)
+            batch_s = time.perf_counter() - start
+
+            results.append({
+                "benchmark": "history_index",
+                "messages": size,
+                "dim": dim,
+                "dtype": dtype,
+                "build_s": build_s,
+                "index_bytes": index.vec_path.stat().st_size,
+                "query_p50_ms": 1000 * latencies[len(latencies) // 2],
+                "query_p95_ms": 1000 * percentile(latencies, 0.95),
+                "batched_query_ms": 1000 * batch_s / queries,
+            })
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--dtype", choices=["float16", "float32"], default="float32")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.dim, args.dtype, args.queries)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for result in results:
+        print(f"{result['messages']:>9,} messages  build {result['build_s']:.2f}s  "
+              f"index {result['index_bytes'] / 1e6:.1f} MB  "
+              f"query p50 {result['query_p50_ms']:.2f} ms  p95 {result['query_p95_ms']:.2f} ms  "
+              f"batched {result['batched_query_ms']:.3f} ms/query")
+
+
+if __name__ == "__main__":
+    main()
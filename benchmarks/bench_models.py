@@ -0,0 +1,128 @@
+"""
+Message model memory and payload benchmark.
+
+Loads one long conversation from a temporary database into the old
+representation (a list of {"role", "content"} dicts, as the UI kept it)
+and into a Conversation of slotted Messages, and reports the memory each
+keeps alive (tracemalloc) and the cost of turning it into a request body:
+json.dumps of the dicts for every request versus Message fragments, which
+are serialized on the first request and reused afterwards.
+
+    python -m benchmarks.bench_models --messages 10000
+"""
+import argparse
+import gc
+import json
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from database import DatabaseManager
+from database.models import Conversation, canonical_json, messages_json
+
+from .bench_db import make_messages, timed
+
+
+def retained_bytes(build):
+    """Bytes still allocated after build() returns, counting only what its result keeps"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def run(message_counts=(10_000,), repeats=10, seed_value=0):
+    """
+    Run the benchmark
+
+    Returns:
+        results: List of dictionaries with memory and timings per conversation size
+    """
+    rng = random.Random(seed_value)
+    results = []
+    for count in message_counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DatabaseManager(Path(tmp) / "bench.db", compress_threshold=0)
+            conversation_id = db.save_conversation("Bench", "llama3", make_messages(rng, count))
+
+            def load_dicts():
+                # What the UI used to hold: a fresh dict (and role string) per message
+                with db.connect() as conn:
+                    rows = conn.execute(
+                        "SELECT role, content FROM messages WHERE conversation_id = ? ORDER BY id",
+                        (conversation_id,)
+                    ).fetchall()
+                return [{"role": role, "content": content} for role, content in rows]
+
+            def load_model():
+                return db.get_conversation(conversation_id)["messages"]
+
+            dicts, dict_bytes = retained_bytes(load_dicts)
+            messages, model_bytes = retained_bytes(load_model)
+            # Both hold the same (ASCII) text; the rest is per-message overhead
+            text_bytes = sum(len(m["content"]) + 49 for m in dicts)
+
+            load = timed(lambda i: load_model(), repeats)
+            dict_body = timed(lambda i: canonical_json([dict(m) for m in dicts]), repeats)
+
+            def cold_body(i):
+                return messages_json(Conversation(m.to_dict() for m in messages))
+
+            cold = timed(cold_body, repeats)
+            # Filling the payload and fragment caches is what the first request costs in memory
+            _, cache_bytes = retained_bytes(lambda: messages_json(messages))
+            warm = timed(lambda i: messages_json(messages), repeats)
+
+            started = time.perf_counter()
+            payloads = messages.to_api()
+            to_api_ms = 1000 * (time.perf_counter() - started)
+            assert json.loads(messages_json(messages)) == payloads
+
+        results.append({
+            "benchmark": f"models.{count}",
+            "messages": count,
+            "text_mb": text_bytes / 1e6,
+            "dicts_mb": dict_bytes / 1e6,
+            "model_mb": model_bytes / 1e6,
+            "dict_overhead_b": (dict_bytes - text_bytes) / count,
+            "model_overhead_b": (model_bytes - text_bytes) / count,
+            "payload_cache_mb": cache_bytes / 1e6,
+            "load_ms": load["median_ms"],
+            "dict_body_ms": dict_body["median_ms"],
+            "model_body_cold_ms": cold["median_ms"],
+            "model_body_warm_ms": warm["median_ms"],
+            "to_api_ms": to_api_ms,
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, nargs="+", default=[10_000])
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    results = run(args.messages, args.repeats)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for r in results:
+        print(f"{r['messages']:,} messages ({r['text_mb']:.2f} MB of text)")
+        print(f"  memory    dicts {r['dicts_mb']:7.2f} MB ({r['dict_overhead_b']:.0f} B/message overhead)"
+              f"   model {r['model_mb']:7.2f} MB ({r['model_overhead_b']:.0f} B/message overhead)"
+              f"   + payload cache {r['payload_cache_mb']:.2f} MB once sent")
+        print(f"  body      dicts {r['dict_body_ms']:7.2f} ms   model cold {r['model_body_cold_ms']:7.2f} ms"
+              f"   warm {r['model_body_warm_ms']:7.2f} ms   to_api {r['to_api_ms']:.2f} ms")
+        print(f"  load      {r['load_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
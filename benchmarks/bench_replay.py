@@ -0,0 +1,113 @@
+"""
+Streaming replay benchmark.
+
+Replays recorded session fixtures (see tools/session_replay.py) as fast as
+possible through the NDJSON parsing path and, when PyQt6 is installed,
+through OllamaWorker's signal path, and reports per-token cost. No model
+or server is needed, so results are comparable between machines and runs.
+
+    python -m benchmarks.bench_replay
+    python -m benchmarks.bench_replay my_fixture.jsonl --worker
+"""
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+from api.ollama_client import chunk_token, iter_chunks
+from tools.session_replay import ReplayClient, load_fixture
+
+FIXTURE_DIR = Path(__file__).resolve().parent / "fixtures"
+
+
+def bench_parse(frames, repeats):
+    """Time iter_chunks + chunk_token over the recorded lines"""
+    lines = [line for _, line in frames]
+    timings = []
+    tokens = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        parts = []
+        for chunk in iter_chunks(lines):
+            token = chunk_token(chunk)
+            if token:
+                parts.append(token)
+        "".join(parts)
+        timings.append(time.perf_counter() - start)
+        tokens = len(parts)
+    return tokens, timings
+
+
+def bench_worker(path, repeats):
+    """Time a full OllamaWorker run fed by a ReplayClient at unlimited speed"""
+    from PyQt6.QtCore import QCoreApplication
+    from api.ollama_worker import OllamaWorker
+
+    app = QCoreApplication.instance() or QCoreApplication([])
+    client = ReplayClient([path], speed=0)
+    timings = []
+    tokens = 0
+    for _ in range(repeats):
+        received = []
+        worker = OllamaWorker("replay", "replay", [], client=client)
+        worker.token_received.connect(received.append)
+        worker.finished.connect(app.quit)
+        start = time.perf_counter()
+        worker.start()
+        app.exec()
+        worker.wait()
+        timings.append(time.perf_counter() - start)
+        tokens = len(received)
+    return tokens, timings
+
+
+def summarize(name, tokens, timings):
+    median = statistics.median(timings)
+    return {
+        "benchmark": name,
+        "tokens": tokens,
+        "median_ms": 1000 * median,
+        "min_ms": 1000 * min(timings),
+        "us_per_token": 1e6 * median / tokens if tokens else None,
+    }
+
+
+def run(fixtures=None, repeats=20, worker=False):
+    """
+    Run the benchmark
+
+    Returns:
+        results: List of dictionaries with timings per fixture and path
+    """
+    fixtures = fixtures or sorted(FIXTURE_DIR.glob("*.jsonl"))
+    results = []
+    for path in fixtures:
+        _, frames = load_fixture(path)
+        name = Path(path).stem
+        results.append(summarize(f"replay.parse.{name}", *bench_parse(frames, repeats)))
+        if worker:
+            results.append(summarize(f"replay.worker.{name}", *bench_worker(str(path), repeats)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("fixtures", nargs="*", help="Fixture files (default: benchmarks/fixtures/*.jsonl)")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--worker", action="store_true", help="Also replay through OllamaWorker (needs PyQt6)")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    results = run(args.fixtures, args.repeats, args.worker)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for result in results:
+        print(f"{result['benchmark']:<40} {result['tokens']:>6} tokens  "
+              f"median {result['median_ms']:.2f} ms  ({result['us_per_token']:.2f} us/token)")
+
+
+if __name__ == "__main__":
+    main()
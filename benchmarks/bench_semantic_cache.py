@@ -0,0 +1,99 @@
+"""
+Semantic cache lookup benchmark.
+
+Measures exact (flat) and approximate (IVF) nearest-neighbour lookups over
+synthetic unit vectors at 10k, 100k and 1M cached entries.
+
+    python -m benchmarks.bench_semantic_cache --dim 384 --queries 200
+
+Memory use is entries * dim * 4 bytes (1M x 384 is about 1.5 GB).
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from database.vector_store import IVFIndex, VectorMatrix, normalize_rows
+from stats import percentile
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+
+
+def _timed_queries(search, queries):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        "mean_ms": 1000 * sum(latencies) / len(latencies),
+        "p50_ms": 1000 * latencies[len(latencies) // 2],
+        "p95_ms": 1000 * percentile(latencies, 0.95),
+    }
+
+
+def run(sizes=DEFAULT_SIZES, dim=384, queries=200, nprobe=8, seed=0):
+    """
+    Run the benchmark
+
+    Returns:
+        results: List of dictionaries, one per (size, method)
+    """
+    rng = np.random.default_rng(seed)
+    results = []
+
+    for size in sizes:
+        matrix = VectorMatrix(dim, capacity=size)
+        for start in range(0, size, 100_000):
+            count = min(100_000, size - start)
+            matrix.add(np.arange(start, start + count),
+                       rng.standard_normal((count, dim), dtype=np.float32))
+
+        # Queries are perturbed copies of stored vectors, like rephrased prompts
+        targets = rng.integers(0, size, queries)
+        noise = 0.1 * rng.standard_normal((queries, dim), dtype=np.float32)
+        query_vectors = normalize_rows(matrix.vectors[targets] + noise)
+
+        flat = _timed_queries(lambda q: matrix.search(q, k=1), query_vectors)
+        results.append({"benchmark": "semantic_cache.flat", "entries": size, "dim": dim, **flat})
+
+        index = IVFIndex(nprobe=nprobe, seed=seed)
+        start = time.perf_counter()
+        index.build(matrix)
+        build_s = time.perf_counter() - start
+
+        found = []
+        ivf = _timed_queries(lambda q: found.append(index.search(matrix, q, k=1)[0][0]), query_vectors)
+        recall = float(np.mean(np.array(found) == targets))
+        results.append({"benchmark": "semantic_cache.ivf", "entries": size, "dim": dim,
+                         "build_s": build_s, "recall_at_1": recall, **ivf})
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.dim, args.queries, args.nprobe)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for result in results:
+        extra = ""
+        if "recall_at_1" in result:
+            extra = f"  build {result['build_s']:.2f}s  recall@1 {result['recall_at_1']:.3f}"
+        print(f"{result['benchmark']:<22} {result['entries']:>9,} entries  "
+              f"p50 {result['p50_ms']:.3f} ms  p95 {result['p95_ms']:.3f} ms{extra}")
+
+
+if __name__ == "__main__":
+    main()
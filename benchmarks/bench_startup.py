@@ -0,0 +1,84 @@
+"""
+Terminal client startup benchmark.
+
+Launches `terminal_chat.py --startup-check` (interpreter start, imports,
+database open and one listing query) repeatedly in fresh processes and
+reports the wall time. The target is well under 200 ms.
+
+    python -m benchmarks.bench_startup --runs 20
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+TARGET_MS = 200
+
+
+def time_command(command, runs, cwd):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=cwd, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(1000 * (time.perf_counter() - start))
+    timings.sort()
+    return timings
+
+
+def run(runs=20):
+    """
+    Run the benchmark
+
+    Returns:
+        results: List of dictionaries with startup timings in milliseconds
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "startup.db"
+        commands = {
+            "python_baseline": [sys.executable, "-c", "pass"],
+            "terminal_chat": [sys.executable, str(REPO_ROOT / "terminal_chat.py"),
+                              "--startup-check", "--db", str(db_path)],
+        }
+        # Warm the OS file cache and create the database once
+        subprocess.run(commands["terminal_chat"], cwd=REPO_ROOT, check=True)
+
+        for name, command in commands.items():
+            timings = time_command(command, runs, REPO_ROOT)
+            results.append({
+                "benchmark": f"startup.{name}",
+                "runs": runs,
+                "median_ms": statistics.median(timings),
+                "min_ms": timings[0],
+                "max_ms": timings[-1],
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    results = run(args.runs)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for result in results:
+        print(f"{result['benchmark']:<24} median {result['median_ms']:.1f} ms  "
+              f"min {result['min_ms']:.1f} ms  max {result['max_ms']:.1f} ms")
+    chat = next(r for r in results if r["benchmark"] == "startup.terminal_chat")
+    verdict = "OK" if chat["median_ms"] < TARGET_MS else "OVER TARGET"
+    print(f"terminal_chat startup {chat['median_ms']:.1f} ms vs {TARGET_MS} ms target: {verdict}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Message styling benchmark on Qt's offscreen platform.
+
+Measures creating (and first showing) MessageWidgets and toggling the
+theme of a window that holds them, with the message styles in the theme
+stylesheet (ui/theme.py) as the app does now, and with the per-widget
+inline stylesheets MessageWidget used to set on the frame, the text edit,
+the labels and every action button.
+
+    python -m benchmarks.bench_styles --messages 1000
+
+Needs PyQt6; no display is required.
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+# The stylesheets MessageWidget used to set on each instance
+LEGACY_FRAME = {
+    True: """
+        #userMessage {
+            background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #2A2F3B, stop:1 #353B48);
+            color: white;
+            border-radius: 12px;
+            margin: 2px 10px 2px 50px;
+            padding: 2px;
+        }
+    """,
+    False: """
+        #assistantMessage {
+            background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #40454F, stop:1 #4A5568);
+            color: white;
+            border-radius: 12px;
+            margin: 2px 50px 2px 10px;
+            padding: 2px;
+            border-left: 3px solid #10a37f;
+        }
+    """,
+}
+LEGACY_TEXT = """
+    background-color: transparent;
+    border: none;
+    color: white;
+    font-family: 'Segoe UI';
+    padding: 5px;
+"""
+LEGACY_BUTTON = """
+    QPushButton#actionButton {
+        background-color: rgba(255, 255, 255, 0.1);
+        color: rgba(255, 255, 255, 0.8);
+        border-radius: 4px;
+        border: none;
+        padding: 4px 8px;
+        font-size: 9pt;
+    }
+    QPushButton#actionButton:hover {
+        background-color: rgba(255, 255, 255, 0.2);
+    }
+    QPushButton#actionButton:pressed {
+        background-color: rgba(255, 255, 255, 0.15);
+    }
+"""
+
+
+def apply_inline_styles(widget):
+    from PyQt6.QtWidgets import QPushButton
+
+    widget.setStyleSheet(LEGACY_FRAME[widget.is_user])
+    widget.messageText.setStyleSheet(LEGACY_TEXT)
+    widget.time_label.setStyleSheet("color: rgba(255, 255, 255, 0.5);")
+    widget.branch_label.setStyleSheet("color: rgba(255, 255, 255, 0.6);")
+    for button in widget.findChildren(QPushButton):
+        button.setStyleSheet(LEGACY_BUTTON)
+
+
+def create_messages(app, container, count, inline):
+    """Add `count` messages to the container and show them; returns milliseconds"""
+    from ui.message_widget import MessageWidget
+
+    layout = container.layout()
+    start = time.perf_counter()
+    for i in range(count):
+        widget = MessageWidget(i % 2 == 0, f"Message {i}: " + "lorem ipsum " * 20, parent=container)
+        if inline:
+            apply_inline_styles(widget)
+        layout.addWidget(widget)
+    app.processEvents()
+    return 1000 * (time.perf_counter() - start)
+
+
+def clear_messages(app, container):
+    layout = container.layout()
+    while layout.count():
+        widget = layout.takeAt(0).widget()
+        if widget:
+            widget.deleteLater()
+    app.processEvents()
+
+
+def toggle_theme(app, window, dark):
+    from ui.theme import apply_theme
+
+    start = time.perf_counter()
+    apply_theme(window, dark)
+    app.processEvents()
+    return 1000 * (time.perf_counter() - start)
+
+
+def summarize(name, timings, **extra):
+    return dict(benchmark=name, median_ms=statistics.median(timings), min_ms=min(timings), **extra)
+
+
+def run(message_counts=(1_000,), repeats=5):
+    """
+    Run the benchmark
+
+    Returns:
+        results: List of dictionaries with creation and theme toggle timings
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtWidgets import QApplication, QScrollArea, QVBoxLayout, QWidget
+
+    from ui.theme import apply_default_theme
+
+    app = QApplication.instance() or QApplication([])
+    apply_default_theme(app)
+    results = []
+    for count in message_counts:
+        for inline in (False, True):
+            variant = "inline" if inline else "theme"
+            window = QScrollArea()
+            window.setWidgetResizable(True)
+            container = QWidget()
+            QVBoxLayout(container)
+            window.setWidget(container)
+            window.resize(900, 700)
+            window.show()
+            app.processEvents()
+
+            creation = []
+            for _ in range(repeats):
+                clear_messages(app, container)
+                creation.append(create_messages(app, container, count, inline))
+            results.append(summarize(f"styles.create_{variant}.{count}", creation, messages=count,
+                                     us_per_message=1000 * statistics.median(creation) / count))
+
+            toggles = []
+            for _ in range(repeats):
+                toggles.append(toggle_theme(app, window, False))
+                toggles.append(toggle_theme(app, window, True))
+            results.append(summarize(f"styles.toggle_{variant}.{count}", toggles, messages=count))
+
+            if not inline:
+                # The theme that is already in effect is not applied again
+                unchanged = [toggle_theme(app, window, True) for _ in range(repeats)]
+                results.append(summarize(f"styles.toggle_unchanged.{count}", unchanged, messages=count))
+
+            clear_messages(app, container)
+            window.close()
+            window.deleteLater()
+            app.processEvents()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, nargs="+", default=[1_000])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    results = run(args.messages, args.repeats)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for result in results:
+        print(f"{result['benchmark']:<32} median {result['median_ms']:9.2f} ms  min {result['min_ms']:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
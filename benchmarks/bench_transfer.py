@@ -0,0 +1,77 @@
+"""
+Bulk export and import throughput.
+
+Seeds a temporary database with conversations (6 messages each), exports
+it to JSONL with each available compression and imports every export
+into a fresh database, reporting messages per second and file size.
+
+    python -m benchmarks.bench_transfer --conversations 50000
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from database import DatabaseManager
+from database.transfer import export_conversations, import_conversations, zstandard
+
+from .bench_db import seed
+
+SUFFIXES = {None: ".jsonl", "gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+
+
+def run(conversations=20_000, seed_value=0):
+    """
+    Run the benchmark
+
+    Returns:
+        results: List of dictionaries with export and import rates per compression
+    """
+    compressions = [None, "gzip"] + (["zstd"] if zstandard is not None else [])
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        source = DatabaseManager(tmp / "source.db")
+        seed(source, conversations, random.Random(seed_value))
+
+        for compression in compressions:
+            path = tmp / f"export{SUFFIXES[compression]}"
+            started = time.perf_counter()
+            stats = export_conversations(source, path)
+            export_s = time.perf_counter() - started
+
+            target = DatabaseManager(tmp / f"import-{compression or 'plain'}.db")
+            started = time.perf_counter()
+            import_conversations(target, path)
+            import_s = time.perf_counter() - started
+
+            results.append({
+                "benchmark": f"transfer.{compression or 'plain'}.{conversations}",
+                "messages": stats["messages"],
+                "file_mb": path.stat().st_size / 1e6,
+                "export_messages_per_s": stats["messages"] / export_s,
+                "import_messages_per_s": stats["messages"] / import_s,
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--conversations", type=int, default=20_000)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    results = run(args.conversations)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for r in results:
+        print(f"{r['benchmark']:<28} {r['file_mb']:8.1f} MB  export {r['export_messages_per_s']:9,.0f} msg/s"
+              f"  import {r['import_messages_per_s']:9,.0f} msg/s")
+
+
+if __name__ == "__main__":
+    main()
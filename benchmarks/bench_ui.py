@@ -0,0 +1,172 @@
+"""
+Rendering benchmark on Qt's offscreen platform.
+
+Measures streaming a recorded reply into a MessageWidget token by token
+(the same get_text/set_text cycle as OllamaChatUI.handle_token) and
+OllamaChatUI.load_conversation for conversations of increasing length,
+and switching back and forth between two such conversations, which reuses
+pooled message widgets instead of constructing new ones.
+
+    python -m benchmarks.bench_ui --messages 20 100 400
+
+Needs PyQt6; no display is required.
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from api.ollama_client import chunk_token, iter_chunks
+from tools.session_replay import ReplayClient, load_fixture
+
+FIXTURE = Path(__file__).resolve().parent / "fixtures" / "code_table_unicode.jsonl"
+DEFAULT_MESSAGE_COUNTS = (20, 100, 400)
+
+
+def fixture_tokens(path=FIXTURE):
+    _, frames = load_fixture(path)
+    tokens = []
+    for chunk in iter_chunks(line for _, line in frames):
+        token = chunk_token(chunk)
+        if token:
+            tokens.append(token)
+    return tokens
+
+
+def bench_token_append(app, tokens, repeats):
+    from ui.message_widget import MessageWidget
+
+    timings = []
+    for _ in range(repeats):
+        widget = MessageWidget(is_user=False, text=tokens[0])
+        widget.show()
+        start = time.perf_counter()
+        for token in tokens[1:]:
+            widget.set_text(widget.get_text() + token)
+            app.processEvents()
+        timings.append(1000 * (time.perf_counter() - start))
+        widget.deleteLater()
+    app.processEvents()
+    return timings
+
+
+def save_bench_conversation(window, rng, reply, count):
+    messages = []
+    for i in range(count):
+        if i % 2 == 0:
+            messages.append({"role": "user", "content": f"Question {i}: how do I sort {rng.randint(1, 99)} items?"})
+        else:
+            messages.append({"role": "assistant", "content": reply[:rng.randint(200, len(reply))]})
+    return window.db.save_conversation(f"Bench {count}", "replay", messages)
+
+
+def bench_load_conversation(app, window, tokens, counts, repeats):
+    rng = random.Random(0)
+    reply = "".join(tokens)
+    results = {}
+    for count in counts:
+        conversation_id = save_bench_conversation(window, rng, reply, count)
+
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            window.load_conversation(conversation_id)
+            app.processEvents()
+            timings.append(1000 * (time.perf_counter() - start))
+        results[count] = timings
+    return results
+
+
+def bench_switch_conversation(app, window, tokens, counts, repeats):
+    """Alternate between two conversations; returns timings and widgets constructed per count"""
+    rng = random.Random(1)
+    reply = "".join(tokens)
+    results = {}
+    for count in counts:
+        first = save_bench_conversation(window, rng, reply, count)
+        second = save_bench_conversation(window, rng, reply, count)
+        # Warm up: the pool fills with the first conversation's widgets
+        window.load_conversation(first)
+        app.processEvents()
+        created = window.widget_pool.created
+
+        timings = []
+        for i in range(repeats):
+            start = time.perf_counter()
+            window.load_conversation(second if i % 2 == 0 else first)
+            app.processEvents()
+            timings.append(1000 * (time.perf_counter() - start))
+        results[count] = (timings, window.widget_pool.created - created)
+    return results
+
+
+def summarize(name, timings, **extra):
+    return dict(benchmark=name, median_ms=statistics.median(timings), min_ms=min(timings), **extra)
+
+
+def run(message_counts=DEFAULT_MESSAGE_COUNTS, repeats=5):
+    """
+    Run the benchmark
+
+    Returns:
+        results: List of dictionaries with render timings
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtWidgets import QApplication
+
+    app = QApplication.instance() or QApplication([])
+    tokens = fixture_tokens()
+    results = []
+
+    previous_cwd = Path.cwd()
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull, \
+            contextlib.redirect_stdout(devnull):
+        # The window keeps its database under ./data
+        os.chdir(tmp)
+        try:
+            timings = bench_token_append(app, tokens, repeats)
+            results.append(summarize("ui.token_append", timings, tokens=len(tokens),
+                                     us_per_token=1000 * statistics.median(timings) / len(tokens)))
+
+            from ui.main_window import OllamaChatUI
+
+            window = OllamaChatUI(client=ReplayClient([str(FIXTURE)], speed=0))
+            window.auto_save_timer.stop()
+            window.show()
+            app.processEvents()
+            for count, timings in bench_load_conversation(app, window, tokens, message_counts, repeats).items():
+                results.append(summarize(f"ui.load_conversation.{count}", timings, messages=count))
+            switches = bench_switch_conversation(app, window, tokens, message_counts, repeats)
+            for count, (timings, created) in switches.items():
+                results.append(summarize(f"ui.switch_conversation.{count}", timings, messages=count,
+                                         widgets_created=created))
+            window.close()
+            app.processEvents()
+        finally:
+            os.chdir(previous_cwd)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, nargs="+", default=list(DEFAULT_MESSAGE_COUNTS))
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    results = run(args.messages, args.repeats)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for result in results:
+        print(f"{result['benchmark']:<28} median {result['median_ms']:9.2f} ms  min {result['min_ms']:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Query plan checks for the hot database queries.
+
+Runs EXPLAIN QUERY PLAN for the conversation listing (hot and archived),
+listing search, conversation load and message branch queries on a fresh
+database and asserts that they use their indexes: no full table scan of
+messages, no temporary B-tree for sorting and no join fan-out. Exits with
+status 1 when a plan regresses. tests/test_query_plans.py asserts the same
+PLAN_CHECKS under pytest.
+
+    python -m benchmarks.check_query_plans
+"""
+import argparse
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+from database import DatabaseManager
+from database.db_manager import (LIST_ARCHIVE_SEARCH_WHERE, LIST_CONVERSATIONS_SQL, LIST_SEARCH_WHERE,
+                                 MESSAGE_PATH_SQL, NEWEST_LEAF_SQL)
+
+# name -> (sql, params, details that must appear, details that must not appear)
+PLAN_CHECKS = {
+    "list_conversations": (
+        LIST_CONVERSATIONS_SQL.format(where="", archive_where=""), (20, 0),
+        ["SCAN c USING INDEX idx_conversations_updated",
+         "SCAN a USING INDEX idx_archived_updated"],
+        ["TEMP B-TREE", "messages", "conversation_tags"],
+    ),
+    "list_conversations_search": (
+        LIST_CONVERSATIONS_SQL.format(where=LIST_SEARCH_WHERE, archive_where=LIST_ARCHIVE_SEARCH_WHERE),
+        ("%q%", "%q%", "%q%", 20, 0),
+        ["SCAN c USING INDEX idx_conversations_updated",
+         "SCAN a USING INDEX idx_archived_updated",
+         # idx_messages_parent starts with conversation_id too; either index will do
+         "SEARCH m USING"],
+        ["TEMP B-TREE", "SCAN m"],
+    ),
+    "get_conversation_messages": (
+        "SELECT * FROM messages WHERE conversation_id = ? ORDER BY timestamp, id", (1,),
+        ["SEARCH messages USING INDEX idx_messages_conversation (conversation_id=?)"],
+        ["TEMP B-TREE", "SCAN messages"],
+    ),
+    "delete_conversation_messages": (
+        "DELETE FROM messages WHERE conversation_id = ?", (1,),
+        ["SEARCH messages USING"],
+        ["SCAN messages"],
+    ),
+    "message_path": (
+        MESSAGE_PATH_SQL, (1,),
+        ["SEARCH m USING INTEGER PRIMARY KEY (rowid=?)",
+         "SEARCH s USING COVERING INDEX idx_messages_parent (conversation_id=? AND parent_id=?)"],
+        ["SCAN m", "SCAN s", "SCAN messages"],
+    ),
+    "newest_leaf": (
+        NEWEST_LEAF_SQL, (1, 1),
+        ["SEARCH c USING COVERING INDEX idx_messages_parent (conversation_id=? AND parent_id=?)"],
+        ["SCAN c"],
+    ),
+}
+
+
+def explain(conn, sql, params):
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def run():
+    """
+    Check every query plan
+
+    Returns:
+        results: List of dictionaries with the plan and any failures per query
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(Path(tmp) / "plans.db")
+        with db.connect() as conn:
+            for name, (sql, params, required, forbidden) in PLAN_CHECKS.items():
+                plan = explain(conn, sql, params)
+                failures = [f"missing: {detail}" for detail in required
+                            if not any(detail in line for line in plan)]
+                failures += [f"unexpected: {detail}" for detail in forbidden
+                             if any(detail in line for line in plan)]
+                results.append({"benchmark": f"plan.{name}", "plan": plan, "failures": failures})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    results = run()
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            status = "FAIL" if result["failures"] else "ok"
+            print(f"{status:<4} {result['benchmark']}")
+            for line in result["plan"]:
+                print(f"       {line}")
+            for failure in result["failures"]:
+                print(f"       !! {failure}")
+    return 1 if any(result["failures"] for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Load test for the client layer.
+
+Drives N concurrent chat sessions through the app's OllamaClient and
+RequestScheduler, each sending several turns, against the fake Ollama
+server (started in-process by default) or a real one, and reports
+throughput plus TTFT and latency percentiles.
+
+    python -m benchmarks.load_test --sessions 16 --turns 4 --parallel 4
+    python -m benchmarks.load_test --base-url http://localhost:11434 --model llama3
+"""
+import argparse
+import json
+import threading
+import time
+
+from api.ollama_client import OllamaClient, chunk_token
+from api.scheduler import RequestScheduler
+from stats import percentile
+from tools.fake_ollama import FakeOllamaConfig, FakeOllamaServer
+
+
+def run_session(client, model, session, turns, records, lock):
+    """One simulated user: a conversation of several streamed turns"""
+    messages = []
+    for turn in range(turns):
+        messages.append({"role": "user", "content": f"session {session} question {turn}"})
+        started = time.perf_counter()
+        first_token = None
+        tokens = 0
+        parts = []
+        error = None
+        try:
+            for chunk in client.chat_stream(model, messages):
+                token = chunk_token(chunk)
+                if token:
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                    tokens += 1
+                    parts.append(token)
+        except Exception as e:
+            error = str(e)
+        finished = time.perf_counter()
+
+        messages.append({"role": "assistant", "content": "".join(parts)})
+        with lock:
+            records.append({
+                "latency": finished - started,
+                "ttft": (first_token - started) if first_token else None,
+                "tokens": tokens,
+                "error": error,
+            })
+
+
+def run(sessions=8, turns=3, base_url=None, model="fake-llama:latest", parallel=4,
+        ttft=0.05, tokens_per_s=200.0, response_tokens=64, error_rate=0.0):
+    """
+    Run the load test
+
+    Returns:
+        result: Dictionary with throughput, latency percentiles and scheduler metrics
+    """
+    server = None
+    if base_url is None:
+        server = FakeOllamaServer(FakeOllamaConfig(
+            ttft=ttft, tokens_per_s=tokens_per_s, response_tokens=response_tokens,
+            parallel=parallel, error_rate=error_rate, seed=0
+        )).start()
+        base_url = server.base_url
+
+    scheduler = RequestScheduler(per_model_limit=parallel, max_total=parallel)
+    client = OllamaClient(base_url, scheduler=scheduler)
+    records = []
+    lock = threading.Lock()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=run_session, args=(client, model, i, turns, records, lock))
+               for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_time = time.perf_counter() - started
+
+    if server:
+        server.stop()
+
+    ok = [r for r in records if not r["error"]]
+    latencies = sorted(r["latency"] for r in ok)
+    ttfts = sorted(r["ttft"] for r in ok if r["ttft"] is not None)
+    tokens = sum(r["tokens"] for r in ok)
+    queue = scheduler.metrics().get("interactive", {})
+
+    return {
+        "benchmark": "load_test",
+        "sessions": sessions,
+        "turns": turns,
+        "parallel": parallel,
+        "requests": len(records),
+        "errors": len(records) - len(ok),
+        "wall_time_s": wall_time,
+        "requests_per_s": len(ok) / wall_time,
+        "tokens_per_s": tokens / wall_time,
+        "ttft_p50_ms": 1000 * (percentile(ttfts, 0.50) or 0),
+        "ttft_p95_ms": 1000 * (percentile(ttfts, 0.95) or 0),
+        "ttft_p99_ms": 1000 * (percentile(ttfts, 0.99) or 0),
+        "latency_p50_ms": 1000 * (percentile(latencies, 0.50) or 0),
+        "latency_p95_ms": 1000 * (percentile(latencies, 0.95) or 0),
+        "latency_p99_ms": 1000 * (percentile(latencies, 0.99) or 0),
+        "queue_wait_p95_ms": 1000 * queue.get("p95_wait", 0.0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--parallel", type=int, default=4, help="Server slots and client concurrency")
+    parser.add_argument("--base-url", help="Use a running server instead of the fake one")
+    parser.add_argument("--model", default="fake-llama:latest")
+    parser.add_argument("--ttft", type=float, default=0.05)
+    parser.add_argument("--tokens-per-s", type=float, default=200.0)
+    parser.add_argument("--response-tokens", type=int, default=64)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    result = run(args.sessions, args.turns, args.base_url, args.model, args.parallel,
+                 args.ttft, args.tokens_per_s, args.response_tokens, args.error_rate)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    print(f"{result['requests']} requests ({result['errors']} errors) in {result['wall_time_s']:.2f}s: "
+          f"{result['requests_per_s']:.1f} req/s, {result['tokens_per_s']:.0f} tokens/s")
+    print(f"TTFT     p50 {result['ttft_p50_ms']:.0f} ms  p95 {result['ttft_p95_ms']:.0f} ms  "
+          f"p99 {result['ttft_p99_ms']:.0f} ms")
+    print(f"Latency  p50 {result['latency_p50_ms']:.0f} ms  p95 {result['latency_p95_ms']:.0f} ms  "
+          f"p99 {result['latency_p99_ms']:.0f} ms")
+    print(f"Scheduler queue wait p95 {result['queue_wait_p95_ms']:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Benchmark suite runner with baseline comparison.
+
+Runs the selected benchmark modules with quick settings, writes all results
+as one JSON document and compares them with a stored baseline, flagging
+any metric that got worse by more than the tolerance.
+
+    python -m benchmarks.runner --save-baseline           # record a baseline
+    python -m benchmarks.runner                           # compare against it
+    python -m benchmarks.runner db replay --tolerance 0.1 --output results.json
+
+Exit status is 1 when a regression was found. Baselines are machine
+specific, so record one on the machine (or CI runner) that compares.
+"""
+import argparse
+import importlib
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+# Suite name -> (module, keyword arguments for a quick run)
+SUITES = {
+    "plans": ("benchmarks.check_query_plans", {}),
+    "db": ("benchmarks.bench_db", {"sizes": (1_000, 10_000, 100_000), "repeats": 10}),
+    "compression": ("benchmarks.bench_compression", {"conversations": 200, "repeats": 10}),
+    "transfer": ("benchmarks.bench_transfer", {"conversations": 20_000}),
+    "replay": ("benchmarks.bench_replay", {"repeats": 20}),
+    "ui": ("benchmarks.bench_ui", {"message_counts": (20, 100), "repeats": 3}),
+    "semantic_cache": ("benchmarks.bench_semantic_cache", {"sizes": (10_000, 100_000), "queries": 50}),
+    "history_index": ("benchmarks.bench_history_index", {"sizes": (10_000,), "queries": 20}),
+    "startup": ("benchmarks.bench_startup", {"runs": 10}),
+    "models": ("benchmarks.bench_models", {"message_counts": (10_000,), "repeats": 10}),
+    "styles": ("benchmarks.bench_styles", {"message_counts": (1_000,), "repeats": 5}),
+}
+DEFAULT_SUITES = ("plans", "db", "replay", "ui", "startup")
+
+
+def metric_direction(name):
+    """+1 when larger is better, -1 when smaller is better, 0 when not compared"""
+    if name.endswith("_per_s") or name.startswith("recall"):
+        return 1
+    if name.endswith("_ms") or name.endswith("_s") or name.startswith("us_per_"):
+        return -1
+    return 0
+
+
+def run_suites(names):
+    """Run suites by name; suites whose dependencies are missing are skipped"""
+    results = []
+    for name in names:
+        module_name, kwargs = SUITES[name]
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError as e:
+            print(f"Skipping {name}: {e}", file=sys.stderr)
+            continue
+
+        print(f"Running {name}...", file=sys.stderr)
+        started = time.perf_counter()
+        suite_results = module.run(**kwargs)
+        # load_test and a few others return a single dictionary
+        if isinstance(suite_results, dict):
+            suite_results = [suite_results]
+        results.extend(suite_results)
+        print(f"  {len(suite_results)} results in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare results with a baseline
+
+    Returns:
+        regressions: List of (benchmark, metric, baseline_value, value, change) tuples
+    """
+    previous = {result["benchmark"]: result for result in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        before = previous.get(result["benchmark"])
+        if before is None:
+            continue
+        for metric, value in result.items():
+            direction = metric_direction(metric)
+            old = before.get(metric)
+            if not direction or not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            change = (value - old) / old
+            if -direction * change > tolerance:
+                regressions.append((result["benchmark"], metric, old, value, change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("suites", nargs="*",
+                        help=f"Suites to run: {', '.join(SUITES)} (default: {' '.join(DEFAULT_SUITES)})")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative slowdown before flagging (default 0.25 = 25%%)")
+    parser.add_argument("--output", help="Also write the results JSON to this file")
+    args = parser.parse_args(argv)
+    unknown = set(args.suites) - set(SUITES)
+    if unknown:
+        parser.error(f"unknown suites: {', '.join(sorted(unknown))}")
+
+    document = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "results": run_suites(args.suites or DEFAULT_SUITES),
+    }
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(document, indent=2), encoding="utf-8")
+    if args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(document, indent=2), encoding="utf-8")
+        print(f"Saved baseline with {len(document['results'])} results to {args.baseline}")
+        return 0
+
+    baseline_path = Path(args.baseline)
+    if not baseline_path.exists():
+        print(json.dumps(document, indent=2))
+        print(f"No baseline at {baseline_path}; run with --save-baseline to create one", file=sys.stderr)
+        return 1 if failed_checks(document["results"]) else 0
+
+    regressions = compare(document["results"], json.loads(baseline_path.read_text(encoding="utf-8")),
+                          args.tolerance)
+    for benchmark, metric, old, value, change in regressions:
+        print(f"REGRESSION {benchmark} {metric}: {old:.3f} -> {value:.3f} ({change:+.0%})")
+    print(f"{len(document['results'])} results, {len(regressions)} regressions "
+          f"(tolerance {args.tolerance:.0%})")
+    return 1 if regressions or failed_checks(document["results"]) else 0
+
+
+def failed_checks(results):
+    """Report pass/fail checks (such as query plans), which need no baseline"""
+    failed = [result for result in results if result.get("failures")]
+    for result in failed:
+        print(f"FAILED {result['benchmark']}: {'; '.join(result['failures'])}")
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -14,6 +14,13 @@ DEFAULT_CONFIG = {
     "conversation_settings": {
         "system_prompt": "You are a helpful AI assistant.",
         "auto_save": True,
+        "auto_save_min_interval": 10,
+        "auto_save_max_interval": 300,
+        "stream_journal": True,
+        "journal_fsync_interval": 1.0,
+        "compress_threshold": 4096,
+        "archive_after_days": 30,
+        "maintenance_idle_seconds": 120,
         "save_path": str(Path.home() / "ollama_chats"),
         "show_timestamps": True
     },
@@ -23,13 +30,61 @@ DEFAULT_CONFIG = {
         "dark_theme": True,
         "font_size": 10,
         "window_width": 1100,
-        "window_height": 800
+        "window_height": 800,
+        "message_widget_pool": 1000
+    },
+    
+    # Cache settings
+    "cache_settings": {
+        "response_cache": False,
+        "max_size_mb": 64,
+        "semantic_cache": False,
+        "semantic_threshold": 0.95,
+        "semantic_approximate": False,
+        "semantic_max_entries": 10000,
+        "embedding_model": "nomic-embed-text"
+    },
+    
+    # Search settings
+    "search_settings": {
+        "semantic_history": False,
+        "embedding_model": "nomic-embed-text",
+        "index_dtype": "float32"
+    },
+    
+    # Document retrieval settings
+    "rag_settings": {
+        "embedding_model": "nomic-embed-text",
+        "chunk_bytes": 2048,
+        "overlap_bytes": 256,
+        "top_k": 4,
+        "batch_size": 32,
+        "embed_concurrency": 2
+    },
+    
+    # Tracing and profiling of the request path
+    "trace_settings": {
+        "tracing": False,
+        "latency_overlay": False,
+        "buffer_size": 100000
+    },
+    
+    # Logging (levels: DEBUG, INFO, WARNING, ERROR)
+    "log_settings": {
+        "level": "INFO",
+        "file": True,
+        "console": False,
+        "max_bytes": 5 * 1024 * 1024,
+        "backup_count": 3,
+        "levels": {}
     },
     
     # API settings
     "api_settings": {
         "base_url": "http://localhost:11434",
-        "timeout": 60
+        "timeout": 60,
+        "max_parallel_requests": 4,
+        "per_model_parallel": 1
     }
 }
 
@@ -1,4 +1,9 @@
 # database/__init__.py
 from .db_manager import DatabaseManager
+from .db_writer import ConversationHandle, DatabaseWriter
+from .migrations import Migrator
+from .models import Conversation, Message
+from .response_cache import ResponseCache
+from .stream_journal import StreamJournal
 
-__all__ = ['DatabaseManager']
\ No newline at end of file
+__all__ = ['DatabaseManager', 'DatabaseWriter', 'ConversationHandle', 'Migrator', 'Conversation', 'Message', 'ResponseCache', 'StreamJournal']
\ No newline at end of file
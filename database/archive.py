@@ -0,0 +1,187 @@
+"""
+Cold archive for conversations that are no longer being used.
+
+Old conversations are moved out of SQLite into immutable segment files in
+the archive directory (next to the database by default):
+
+    segment-000001.seg   b"OCARCH01" followed by one zlib-compressed JSON
+                         record per conversation
+    segment-000001.idx   Offset index: sorted (conversation id, offset,
+                         length) int64 triples
+
+Segments are written once (to a temporary name, fsynced, then renamed
+into place with the index last) and never modified. They are read through
+mmap: a lookup is a binary search in the mapped index followed by a
+zero-copy memoryview slice of the mapped segment that is handed straight
+to zlib. zlib is used regardless of the message codec so archives stay
+readable without optional packages.
+
+The hot database keeps one small row per archived conversation in
+`archived_conversations` (title, timestamps, counters, segment number) so
+listing and title search stay in SQL. Deleting or restoring a conversation
+only removes its row; the record stays in the segment as dead data until
+maintenance compacts the segment (see database/maintenance.py).
+"""
+import json
+import mmap
+import os
+import re
+import threading
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+SEGMENT_MAGIC = b"OCARCH01"
+INDEX_DTYPE = np.dtype([("id", "<i8"), ("offset", "<i8"), ("length", "<i8")])
+ZLIB_LEVEL = 6
+
+_SEGMENT_NAME = re.compile(r"segment-(\d+)\.idx$")
+
+
+class ArchiveSegment:
+    """One immutable segment file and its offset index, mapped lazily"""
+
+    def __init__(self, seg_path, idx_path):
+        self.seg_path = Path(seg_path)
+        self.idx_path = Path(idx_path)
+        self._file = None
+        self._mmap = None
+        self._index = None
+
+    def _open(self):
+        if self._mmap is None:
+            self._index = np.fromfile(self.idx_path, dtype=INDEX_DTYPE)
+            self._file = open(self.seg_path, "rb")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if self._mmap[:len(SEGMENT_MAGIC)] != SEGMENT_MAGIC:
+                self.close()
+                raise ValueError(f"Not an archive segment: {self.seg_path}")
+
+    @property
+    def ids(self):
+        self._open()
+        return self._index["id"]
+
+    @property
+    def lengths(self):
+        """Compressed size of each record, in the order of `ids`"""
+        self._open()
+        return self._index["length"]
+
+    @property
+    def modified_at(self):
+        """When the segment was written (its index file's mtime)"""
+        return self.idx_path.stat().st_mtime
+
+    def get(self, conversation_id):
+        """Return the archived conversation record, or None if it is not in this segment"""
+        self._open()
+        ids = self._index["id"]
+        i = int(np.searchsorted(ids, conversation_id))
+        if i >= len(ids) or ids[i] != conversation_id:
+            return None
+        offset, length = int(self._index["offset"][i]), int(self._index["length"][i])
+        with memoryview(self._mmap) as view:
+            return json.loads(zlib.decompress(view[offset:offset + length]))
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._index = None
+
+
+class ConversationArchive:
+    """Directory of archive segments"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._segments = {}
+
+    def _paths(self, number):
+        stem = self.directory / f"segment-{number:06d}"
+        return stem.with_suffix(".seg"), stem.with_suffix(".idx")
+
+    def segment_numbers(self):
+        """Numbers of the complete segments on disk, ascending"""
+        if not self.directory.exists():
+            return []
+        return sorted(int(m.group(1)) for m in map(_SEGMENT_NAME.match, os.listdir(self.directory)) if m)
+
+    def segment(self, number):
+        with self._lock:
+            segment = self._segments.get(number)
+            if segment is None:
+                seg_path, idx_path = self._paths(number)
+                if not idx_path.exists():
+                    raise FileNotFoundError(f"Archive segment {number} is missing from {self.directory}")
+                segment = self._segments[number] = ArchiveSegment(seg_path, idx_path)
+            return segment
+
+    def get(self, number, conversation_id):
+        """Read one conversation record from segment `number`"""
+        return self.segment(number).get(conversation_id)
+
+    def write_segment(self, records):
+        """
+        Write conversation records to a new immutable segment
+
+        Args:
+            records: Conversation dictionaries, each with an integer "id"
+
+        Returns:
+            number: The new segment's number
+        """
+        records = sorted(records, key=lambda r: r["id"])
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        with self._lock:
+            numbers = self.segment_numbers()
+            number = numbers[-1] + 1 if numbers else 1
+            seg_path, idx_path = self._paths(number)
+            index = np.empty(len(records), dtype=INDEX_DTYPE)
+
+            seg_tmp = seg_path.with_suffix(".seg.tmp")
+            with open(seg_tmp, "wb") as f:
+                f.write(SEGMENT_MAGIC)
+                offset = len(SEGMENT_MAGIC)
+                for i, record in enumerate(records):
+                    blob = zlib.compress(json.dumps(record, ensure_ascii=False).encode("utf-8"), ZLIB_LEVEL)
+                    f.write(blob)
+                    index[i] = (record["id"], offset, len(blob))
+                    offset += len(blob)
+                f.flush()
+                os.fsync(f.fileno())
+
+            idx_tmp = idx_path.with_suffix(".idx.tmp")
+            with open(idx_tmp, "wb") as f:
+                f.write(index.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            # The index appearing is what makes a segment exist
+            os.replace(seg_tmp, seg_path)
+            os.replace(idx_tmp, idx_path)
+        return number
+
+    def delete_segment(self, number):
+        """Remove a segment (used when none of its conversations are referenced any more)"""
+        with self._lock:
+            segment = self._segments.pop(number, None)
+            if segment is not None:
+                segment.close()
+            seg_path, idx_path = self._paths(number)
+            for path in (idx_path, seg_path):
+                if path.exists():
+                    path.unlink()
+
+    def close(self):
+        with self._lock:
+            for segment in self._segments.values():
+                segment.close()
+            self._segments.clear()
@@ -0,0 +1,104 @@
+"""
+Compression of large message bodies.
+
+Messages whose UTF-8 content is at least `threshold` bytes are stored in
+`messages.content_blob`, compressed with zstd when the `zstandard`
+package is installed and zlib otherwise, with the codec name in
+`messages.codec` and an empty `messages.content`. Rows with a NULL codec
+keep plain text in `content`, so short messages and rows written before
+compression existed are read exactly as before.
+
+SQL that needs the text of any row uses MESSAGE_TEXT_SQL, which only
+calls into Python for compressed rows; connections must have the
+`message_text` function registered with register_functions().
+"""
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_THRESHOLD = 4096
+
+# Compressed output must be at most this fraction of the input to be kept;
+# otherwise every read would pay for decompression to save almost nothing
+MIN_SAVING_RATIO = 0.9
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# Plain text of a messages row aliased as {m}
+MESSAGE_TEXT_SQL = ("(CASE WHEN {m}.codec IS NULL THEN {m}.content "
+                    "ELSE message_text({m}.codec, {m}.content_blob) END)")
+
+
+def available_codecs():
+    return ("zlib", "zstd") if zstandard is not None else ("zlib",)
+
+
+def default_codec():
+    return "zstd" if zstandard is not None else "zlib"
+
+
+def compress(data, codec):
+    """Compress bytes with the named codec"""
+    if codec == "zlib":
+        return zlib.compress(data, ZLIB_LEVEL)
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd compression needs the zstandard package")
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    raise ValueError(f"Unknown message codec: {codec}")
+
+
+def decompress(blob, codec):
+    """Decompress bytes written by compress()"""
+    if codec == "zlib":
+        return zlib.decompress(blob)
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("This database has zstd-compressed messages; install zstandard to read them")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    raise ValueError(f"Unknown message codec: {codec}")
+
+
+def encode(text, threshold=DEFAULT_THRESHOLD, codec=None):
+    """
+    Choose the stored form of a message body
+
+    Args:
+        text: Message content
+        threshold: Minimum size in bytes to compress; None or 0 disables compression
+        codec: "zlib" or "zstd", defaults to the best available
+
+    Returns:
+        (content, content_blob, codec): Column values for the messages row
+    """
+    if not threshold or not text:
+        return text, None, None
+    raw = text.encode("utf-8")
+    if len(raw) < threshold:
+        return text, None, None
+
+    codec = codec or default_codec()
+    blob = compress(raw, codec)
+    if len(blob) > len(raw) * MIN_SAVING_RATIO:
+        return text, None, None
+    return "", blob, codec
+
+
+def decode(content, content_blob, codec):
+    """Return the plain text of a stored message body"""
+    if codec is None:
+        return content
+    return decompress(content_blob, codec).decode("utf-8")
+
+
+def _message_text(codec, content_blob):
+    return decompress(content_blob, codec).decode("utf-8") if content_blob is not None else ""
+
+
+def register_functions(conn):
+    """Make message_text(codec, blob) available to SQL on `conn`"""
+    conn.create_function("message_text", 2, _message_text, deterministic=True)
@@ -1,13 +1,92 @@
 import sqlite3
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 
+from .archive import ConversationArchive
+from .compression import DEFAULT_THRESHOLD, MESSAGE_TEXT_SQL, decode, encode, register_functions
+from .migrations import NEXT_ID_SQL, PATH_LENGTH_SQL, Migrator, link_message_chain
+from .models import Conversation, Message, as_message
+
+# Conversation listing reads the trigger-maintained columns, so it is a
+# merge of two index-ordered scans (hot and archived conversations) with
+# no join or GROUP BY
+LIST_CONVERSATIONS_SQL = '''
+SELECT c.id, c.title, c.model, c.created_at, c.updated_at,
+       c.message_count, c.tag_list AS tags, 0 AS archived
+FROM conversations c
+{where}
+UNION ALL
+SELECT a.id, a.title, a.model, a.created_at, a.updated_at,
+       a.message_count, a.tag_list, 1
+FROM archived_conversations a
+{archive_where}
+ORDER BY updated_at DESC
+LIMIT ? OFFSET ?
+'''
+
+LIST_SEARCH_WHERE = f'''
+WHERE c.title LIKE ?
+   OR EXISTS (SELECT 1 FROM messages m WHERE m.conversation_id = c.id AND {MESSAGE_TEXT_SQL.format(m="m")} LIKE ?)
+'''
+
+# Archived message bodies live outside SQLite; search archived titles only
+LIST_ARCHIVE_SEARCH_WHERE = '''
+WHERE a.title LIKE ?
+'''
+
+# Messages form a tree per conversation. A branch is the path from a
+# message up to the root: one primary key lookup per step, root first,
+# with each message's position among its siblings (same parent)
+MESSAGE_PATH_SQL = '''
+WITH RECURSIVE path(id, depth) AS (
+    SELECT id, 0 FROM messages WHERE id = ?
+    UNION ALL
+    SELECT m.parent_id, path.depth + 1
+    FROM path JOIN messages m ON m.id = path.id
+    WHERE m.parent_id IS NOT NULL
+)
+SELECT m.*,
+       (SELECT COUNT(*) FROM messages s
+        WHERE s.conversation_id = m.conversation_id AND s.parent_id IS m.parent_id) AS sibling_count,
+       (SELECT COUNT(*) FROM messages s
+        WHERE s.conversation_id = m.conversation_id AND s.parent_id IS m.parent_id
+          AND s.id < m.id) AS sibling_index
+FROM path JOIN messages m ON m.id = path.id
+ORDER BY path.depth DESC
+'''
+
+# Follows the newest child down from a message to a leaf
+NEWEST_LEAF_SQL = '''
+WITH RECURSIVE descent(id, depth) AS (
+    SELECT ?, 0
+    UNION ALL
+    SELECT (SELECT MAX(c.id) FROM messages c
+            WHERE c.conversation_id = ? AND c.parent_id = descent.id),
+           descent.depth + 1
+    FROM descent WHERE descent.id IS NOT NULL
+)
+SELECT id FROM descent WHERE id IS NOT NULL ORDER BY depth DESC LIMIT 1
+'''
+
 class DatabaseManager:
     """Manages SQLite database operations for the application"""
     
-    def __init__(self, db_path=None):
-        """Initialize the database manager with a database file path"""
+    def __init__(self, db_path=None, background_migrations=False,
+                 compress_threshold=DEFAULT_THRESHOLD, codec=None, archive_dir=None):
+        """
+        Initialize the database manager with a database file path
+        
+        Args:
+            db_path: Database file, defaults to data/ollama_chat.db
+            background_migrations: Leave data backfills for the caller to run
+                (see Migrator.run_backfills) instead of finishing them here
+            compress_threshold: Message bodies of at least this many bytes are
+                stored compressed; None or 0 stores everything as plain text
+            codec: "zlib" or "zstd"; defaults to zstd when it is installed
+            archive_dir: Directory of archive segments, defaults to
+                <database name>_archive next to the database
+        """
         if db_path is None:
             # Default to a 'data' directory in the application folder
             db_dir = Path.cwd() / 'data'
@@ -16,67 +95,28 @@ class DatabaseManager:
         else:
             self.db_path = Path(db_path)
             
-        self.init_db()
+        self.compress_threshold = compress_threshold
+        self.codec = codec
+        self.archive = ConversationArchive(
+            archive_dir or self.db_path.with_name(f"{self.db_path.stem}_archive")
+        )
+        self.migrator = Migrator(self.db_path)
+        self.init_db(run_backfills=not background_migrations)
     
-    def init_db(self):
-        """Initialize the database with necessary tables"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Create conversations table
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS conversations (
-                id INTEGER PRIMARY KEY,
-                title TEXT NOT NULL,
-                model TEXT NOT NULL,
-                system_prompt TEXT,
-                created_at TIMESTAMP NOT NULL,
-                updated_at TIMESTAMP NOT NULL
-            )
-            ''')
-            
-            # Create messages table
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS messages (
-                id INTEGER PRIMARY KEY,
-                conversation_id INTEGER NOT NULL,
-                role TEXT NOT NULL,
-                content TEXT NOT NULL,
-                timestamp TIMESTAMP NOT NULL,
-                has_image BOOLEAN DEFAULT 0,
-                image_path TEXT,
-                FOREIGN KEY (conversation_id) REFERENCES conversations (id) ON DELETE CASCADE
-            )
-            ''')
-            
-            # Create tags table for categorizing conversations
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS tags (
-                id INTEGER PRIMARY KEY,
-                name TEXT UNIQUE NOT NULL
-            )
-            ''')
-            
-            # Create conversation_tags junction table
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS conversation_tags (
-                conversation_id INTEGER,
-                tag_id INTEGER,
-                PRIMARY KEY (conversation_id, tag_id),
-                FOREIGN KEY (conversation_id) REFERENCES conversations (id) ON DELETE CASCADE,
-                FOREIGN KEY (tag_id) REFERENCES tags (id) ON DELETE CASCADE
-            )
-            ''')
-            
-            # Create settings table
-            cursor.execute('''
-            CREATE TABLE IF NOT EXISTS settings (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL
-            )
-            ''')
-            
-            conn.commit()
+    def init_db(self, run_backfills=True):
+        """Bring the database schema up to date"""
+        self.migrator.upgrade()
+        with self.connect() as conn:
+            # Readers no longer wait for the writer thread; checkpoints happen during maintenance
+            conn.execute("PRAGMA journal_mode=WAL")
+        if run_backfills:
+            self.migrator.run_backfills()
+    
+    def connect(self):
+        """Open a connection with the SQL functions queries rely on"""
+        conn = sqlite3.connect(self.db_path)
+        register_functions(conn)
+        return conn
     
     def save_conversation(self, title, model, messages, system_prompt=None):
         """
@@ -85,58 +125,72 @@ class DatabaseManager:
         Args:
             title: Title of the conversation
             model: AI model used in the conversation
-            messages: List of message dictionaries with role and content
+            messages: Messages (or message dictionaries with role and content);
+                Message objects are given the id of their row
             system_prompt: Optional system prompt used for this conversation
             
         Returns:
             conversation_id: ID of the saved conversation
         """
-        now = datetime.now().isoformat()
-        
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Insert conversation
-            cursor.execute('''
-            INSERT INTO conversations (title, model, system_prompt, created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?)
-            ''', (title, model, system_prompt, now, now))
-            
-            conversation_id = cursor.lastrowid
-            
-            # Insert messages
-            for msg in messages:
-                has_image = 0
-                image_path = None
-                
-                # Check if message has an image
-                if isinstance(msg.get('content'), dict) and 'image_path' in msg['content']:
-                    has_image = 1
-                    image_path = msg['content']['image_path']
-                    content = msg['content'].get('text', '')
-                else:
-                    content = msg.get('content', '')
-                
-                cursor.execute('''
-                INSERT INTO messages (conversation_id, role, content, timestamp, has_image, image_path)
-                VALUES (?, ?, ?, ?, ?, ?)
-                ''', (conversation_id, msg['role'], content, now, has_image, image_path))
-            
+        with self.connect() as conn:
+            conversation_id = self._insert_conversation(conn.cursor(), title, model, messages, system_prompt)
             conn.commit()
             
             return conversation_id
     
+    def _insert_conversation(self, cursor, title, model, messages, system_prompt=None):
+        """Insert a conversation and its messages using an open cursor"""
+        now = datetime.now().isoformat()
+        
+        # Insert conversation; ids must not collide with archived conversations
+        cursor.execute('''
+        INSERT INTO conversations (id, title, model, system_prompt, created_at, updated_at)
+        VALUES ((SELECT MAX(id) + 1 FROM (SELECT MAX(id) AS id FROM conversations
+                                          UNION ALL SELECT MAX(id) FROM archived_conversations)),
+                ?, ?, ?, ?, ?)
+        ''', (title, model, system_prompt, now, now))
+        
+        conversation_id = cursor.lastrowid
+        leaf_id = self._insert_messages(cursor, conversation_id, messages, now)
+        self._set_active_leaf(cursor, conversation_id, leaf_id, len(messages))
+        return conversation_id
+    
+    def _insert_messages(self, cursor, conversation_id, messages, now, parent_id=None):
+        """
+        Insert messages as a chain below `parent_id` using an open cursor
+        
+        Returns:
+            leaf_id: Id of the last message inserted (parent_id if there were none)
+        """
+        for msg in messages:
+            message = as_message(msg)
+            
+            # Large bodies go to content_blob compressed
+            content, content_blob, codec = encode(message.text, self.compress_threshold, self.codec)
+            
+            cursor.execute(f'''
+            INSERT INTO messages (id, conversation_id, role, content, timestamp, has_image, image_path,
+                                  content_blob, codec, parent_id)
+            VALUES ({NEXT_ID_SQL.format(table="messages")}, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (conversation_id, message.role, content, now, 1 if message.image_path else 0,
+                  message.image_path, content_blob, codec, parent_id))
+            message.parent_id = parent_id
+            parent_id = message.id = cursor.lastrowid
+        return parent_id
+    
     def get_conversation(self, conversation_id):
         """
-        Retrieve a conversation and its messages by ID
+        Retrieve a conversation and the messages of its active branch by ID
         
         Args:
             conversation_id: ID of the conversation to retrieve
             
         Returns:
-            conversation: Dictionary with conversation details and messages
+            conversation: Dictionary with conversation details and a
+                Conversation of Messages, whose branch fields say where
+                each one sits among its alternatives
         """
-        with sqlite3.connect(self.db_path) as conn:
+        with self.connect() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             
@@ -147,40 +201,34 @@ class DatabaseManager:
             
             conversation_row = cursor.fetchone()
             if not conversation_row:
-                return None
+                return self.get_archived_conversation(conversation_id)
             
             conversation = dict(conversation_row)
             
-            # Get messages
-            cursor.execute('''
-            SELECT * FROM messages 
-            WHERE conversation_id = ? 
-            ORDER BY timestamp, id
-            ''', (conversation_id,))
-            
-            messages = []
-            for msg_row in cursor.fetchall():
-                msg = dict(msg_row)
-                
-                # Handle messages with images
-                if msg['has_image'] and msg['image_path']:
-                    message_content = {
-                        'text': msg['content'],
-                        'image_path': msg['image_path']
-                    }
-                    messages.append({
-                        'role': msg['role'],
-                        'content': message_content
-                    })
-                else:
-                    messages.append({
-                        'role': msg['role'],
-                        'content': msg['content']
-                    })
-            
-            conversation['messages'] = messages
+            # Get messages of the active branch
+            rows = []
+            if conversation['active_leaf_id'] is not None:
+                rows = cursor.execute(MESSAGE_PATH_SQL, (conversation['active_leaf_id'],)).fetchall()
+            if not rows:
+                # Not linked into a tree yet (see migration 5)
+                rows = cursor.execute('''
+                SELECT * FROM messages 
+                WHERE conversation_id = ? 
+                ORDER BY timestamp, id
+                ''', (conversation_id,)).fetchall()
+            
+            conversation['messages'] = Conversation(self._conversation_message(self._plain_message(row))
+                                                    for row in rows)
             return conversation
     
+    @staticmethod
+    def _conversation_message(msg):
+        """Message as returned by get_conversation, from a plain-text row"""
+        return Message(msg['role'], msg['content'],
+                       image_path=msg['image_path'] if msg['has_image'] else None,
+                       id=msg['id'], parent_id=msg.get('parent_id'),
+                       sibling_index=msg.get('sibling_index', 0), sibling_count=msg.get('sibling_count', 1))
+    
     def list_conversations(self, limit=20, offset=0, search=None):
         """
         List conversations, optionally filtered by search term
@@ -193,36 +241,20 @@ class DatabaseManager:
         Returns:
             conversations: List of conversation dictionaries
         """
-        with sqlite3.connect(self.db_path) as conn:
+        with self.connect() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             
-            query = '''
-            SELECT c.id, c.title, c.model, c.created_at, c.updated_at,
-                   COUNT(m.id) as message_count,
-                   GROUP_CONCAT(t.name, ', ') as tags
-            FROM conversations c
-            LEFT JOIN messages m ON c.id = m.conversation_id
-            LEFT JOIN conversation_tags ct ON c.id = ct.conversation_id
-            LEFT JOIN tags t ON ct.tag_id = t.id
-            '''
-            
             params = []
+            where = archive_where = ''
             if search:
-                query += '''
-                WHERE c.title LIKE ? OR m.content LIKE ?
-                '''
+                where = LIST_SEARCH_WHERE
+                archive_where = LIST_ARCHIVE_SEARCH_WHERE
                 search_term = f'%{search}%'
-                params.extend([search_term, search_term])
-            
-            query += '''
-            GROUP BY c.id
-            ORDER BY c.updated_at DESC
-            LIMIT ? OFFSET ?
-            '''
+                params.extend([search_term, search_term, search_term])
             
             params.extend([limit, offset])
-            cursor.execute(query, params)
+            cursor.execute(LIST_CONVERSATIONS_SQL.format(where=where, archive_where=archive_where), params)
             
             conversations = [dict(row) for row in cursor.fetchall()]
             return conversations
@@ -234,57 +266,151 @@ class DatabaseManager:
         Args:
             conversation_id: ID of the conversation to update
             title: New title (if provided)
-            messages: New messages list (if provided)
+            messages: The conversation's new active branch (if provided);
+                the leading messages with an id are the stored ones it
+                keeps, the rest are added as a new branch, so no earlier
+                version is lost
             
         Returns:
             success: Boolean indicating success
         """
+        with self.connect() as conn:
+            success = self._update_conversation(conn.cursor(), conversation_id, title, messages)
+            conn.commit()
+            return success
+    
+    def _update_conversation(self, cursor, conversation_id, title=None, messages=None):
+        """Update a conversation using an open cursor; returns whether it exists"""
         now = datetime.now().isoformat()
+        restored_ids = self._restore_archived(cursor, conversation_id)
+        
+        if title:
+            cursor.execute('''
+            UPDATE conversations
+            SET title = ?, updated_at = ?
+            WHERE id = ?
+            ''', (title, now, conversation_id))
+        
+        if messages:
+            cursor.execute('SELECT active_leaf_id FROM conversations WHERE id = ?', (conversation_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return False
+            if row[0] is None:
+                # Written before messages had parents and not backfilled yet
+                link_message_chain(cursor, conversation_id, conversation_id)
+            if restored_ids:
+                # Loaded from the archive, so the ids are the ones the messages had there
+                messages = [as_message(msg) for msg in messages]
+                for message in messages:
+                    message.id = restored_ids.get(message.id)
+                    message.parent_id = restored_ids.get(message.parent_id)
+            
+            leaf_id = self._save_branch(cursor, conversation_id, messages, now)
+            
+            # Update conversation last modified time; `messages` is the whole active branch
+            cursor.execute('''
+            UPDATE conversations
+            SET updated_at = ?, active_leaf_id = ?, message_count = ?
+            WHERE id = ?
+            ''', (now, leaf_id, len(messages), conversation_id))
+        
+        return cursor.rowcount > 0
+    
+    def _save_branch(self, cursor, conversation_id, messages, now):
+        """
+        Store `messages` as a path from the root of a conversation's tree
         
-        with sqlite3.connect(self.db_path) as conn:
+        The leading messages that have an id (given by an earlier save or by
+        get_conversation) are the stored part of the path; from the first
+        message without one, the rest is inserted below it as a new branch.
+        Only the new messages are read or written.
+
+        Returns:
+            leaf_id: Id of the last message
+        """
+        messages = [as_message(msg) for msg in messages]
+        stored = 0
+        while stored < len(messages) and messages[stored].id is not None:
+            stored += 1
+        # Ids given by a save that was rolled back may not exist, or belong to
+        # another message by now; keep only the part of the path that checks out
+        while stored and not self._is_stored_path_end(cursor, conversation_id, messages, stored):
+            stored -= 1
+
+        parent_id = messages[stored - 1].id if stored else None
+        return self._insert_messages(cursor, conversation_id, messages[stored:], now, parent_id)
+
+    @staticmethod
+    def _is_stored_path_end(cursor, conversation_id, messages, count):
+        """Whether messages[count - 1] is stored in the conversation as the child of messages[count - 2]"""
+        message = messages[count - 1]
+        parent_id = messages[count - 2].id if count > 1 else None
+        cursor.execute('''
+        SELECT 1 FROM messages
+        WHERE id = ? AND conversation_id = ? AND role = ? AND parent_id IS ?
+        ''', (message.id, conversation_id, message.role, parent_id))
+        return cursor.fetchone() is not None
+    
+    def get_message_path(self, message_id):
+        """
+        Messages from the root of a conversation down to `message_id`
+        
+        Returns:
+            messages: List of Messages like get_conversation's, root first
+        """
+        with self.connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(MESSAGE_PATH_SQL, (message_id,)).fetchall()
+            return [self._conversation_message(self._plain_message(row)) for row in rows]
+    
+    def get_branch(self, conversation_id, message_id):
+        """
+        The branch through a message: its path from the root continued down
+        the newest replies to a leaf
+        
+        Returns:
+            messages: List of Messages like get_conversation's, root first
+        """
+        with self.connect() as conn:
+            row = conn.execute(NEWEST_LEAF_SQL, (message_id, conversation_id)).fetchone()
+        return self.get_message_path(row[0]) if row else []
+    
+    def get_sibling_ids(self, message_id):
+        """Ids of a message and its alternatives (messages with the same parent), oldest first"""
+        with self.connect() as conn:
             cursor = conn.cursor()
-            
-            if title:
-                cursor.execute('''
-                UPDATE conversations
-                SET title = ?, updated_at = ?
-                WHERE id = ?
-                ''', (title, now, conversation_id))
-            
-            if messages:
-                # Delete existing messages
-                cursor.execute('''
-                DELETE FROM messages
-                WHERE conversation_id = ?
-                ''', (conversation_id,))
-                
-                # Insert new messages
-                for msg in messages:
-                    has_image = 0
-                    image_path = None
-                    
-                    # Check if message has an image
-                    if isinstance(msg.get('content'), dict) and 'image_path' in msg['content']:
-                        has_image = 1
-                        image_path = msg['content']['image_path']
-                        content = msg['content'].get('text', '')
-                    else:
-                        content = msg.get('content', '')
-                    
-                    cursor.execute('''
-                    INSERT INTO messages (conversation_id, role, content, timestamp, has_image, image_path)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                    ''', (conversation_id, msg['role'], content, now, has_image, image_path))
-                
-                # Update conversation last modified time
-                cursor.execute('''
-                UPDATE conversations
-                SET updated_at = ?
-                WHERE id = ?
-                ''', (now, conversation_id))
-            
+            cursor.execute('''
+            SELECT s.id FROM messages m
+            JOIN messages s ON s.conversation_id = m.conversation_id AND s.parent_id IS m.parent_id
+            WHERE m.id = ?
+            ORDER BY s.id
+            ''', (message_id,))
+            return [row[0] for row in cursor.fetchall()]
+    
+    def set_active_leaf(self, conversation_id, leaf_id):
+        """Make the branch ending at `leaf_id` the one get_conversation returns"""
+        with self.connect() as conn:
+            self._set_active_leaf(conn.cursor(), conversation_id, leaf_id)
             conn.commit()
-            return cursor.rowcount > 0
+    
+    def _set_active_leaf(self, cursor, conversation_id, leaf_id, message_count=None):
+        """
+        Set the active branch using an open cursor
+        
+        The listed message count follows the branch; it is counted from
+        `leaf_id` up to the root unless the caller knows it.
+        """
+        if message_count is None:
+            cursor.execute(f'''
+            UPDATE conversations SET active_leaf_id = ?, message_count = {PATH_LENGTH_SQL.format(leaf="?")}
+            WHERE id = ?
+            ''', (leaf_id, leaf_id, conversation_id))
+        else:
+            cursor.execute('''
+            UPDATE conversations SET active_leaf_id = ?, message_count = ? WHERE id = ?
+            ''', (leaf_id, message_count, conversation_id))
+        return cursor.rowcount > 0
     
     def delete_conversation(self, conversation_id):
         """
@@ -296,16 +422,33 @@ class DatabaseManager:
         Returns:
             success: Boolean indicating success
         """
-        with sqlite3.connect(self.db_path) as conn:
+        with self.connect() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
             DELETE FROM conversations
             WHERE id = ?
             ''', (conversation_id,))
+            deleted = cursor.rowcount > 0
+            
+            # Foreign keys are not enforced, so ON DELETE CASCADE does not apply
+            cursor.execute('''
+            DELETE FROM messages
+            WHERE conversation_id = ?
+            ''', (conversation_id,))
+            cursor.execute('''
+            DELETE FROM conversation_tags
+            WHERE conversation_id = ?
+            ''', (conversation_id,))
+            
+            # Archived conversations only lose their catalog row; maintenance compacts the segment
+            cursor.execute('''
+            DELETE FROM archived_conversations
+            WHERE id = ?
+            ''', (conversation_id,))
             
             conn.commit()
-            return cursor.rowcount > 0
+            return deleted or cursor.rowcount > 0
     
     def add_tag_to_conversation(self, conversation_id, tag_name):
         """
@@ -318,29 +461,33 @@ class DatabaseManager:
         Returns:
             success: Boolean indicating success
         """
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Get or create tag
-            cursor.execute('''
-            INSERT OR IGNORE INTO tags (name)
-            VALUES (?)
-            ''', (tag_name,))
-            
-            cursor.execute('''
-            SELECT id FROM tags WHERE name = ?
-            ''', (tag_name,))
-            
-            tag_id = cursor.fetchone()[0]
-            
-            # Add tag to conversation
-            cursor.execute('''
-            INSERT OR IGNORE INTO conversation_tags (conversation_id, tag_id)
-            VALUES (?, ?)
-            ''', (conversation_id, tag_id))
-            
+        with self.connect() as conn:
+            success = self._add_tag(conn.cursor(), conversation_id, tag_name)
             conn.commit()
-            return cursor.rowcount > 0
+            return success
+    
+    def _add_tag(self, cursor, conversation_id, tag_name):
+        """Tag a conversation using an open cursor"""
+        self._restore_archived(cursor, conversation_id)
+        
+        # Get or create tag
+        cursor.execute('''
+        INSERT OR IGNORE INTO tags (name)
+        VALUES (?)
+        ''', (tag_name,))
+        
+        cursor.execute('''
+        SELECT id FROM tags WHERE name = ?
+        ''', (tag_name,))
+        
+        tag_id = cursor.fetchone()[0]
+        
+        # Add tag to conversation
+        cursor.execute('''
+        INSERT OR IGNORE INTO conversation_tags (conversation_id, tag_id)
+        VALUES (?, ?)
+        ''', (conversation_id, tag_id))
+        return cursor.rowcount > 0
     
     def search_by_content(self, search_term, limit=20, offset=0):
         """
@@ -354,16 +501,17 @@ class DatabaseManager:
         Returns:
             results: List of matching conversations with message snippets
         """
-        with sqlite3.connect(self.db_path) as conn:
+        with self.connect() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             
-            query = '''
-            SELECT c.id, c.title, c.model, m.content AS snippet, 
+            message_text = MESSAGE_TEXT_SQL.format(m="m")
+            query = f'''
+            SELECT c.id, c.title, c.model, {message_text} AS snippet, 
                    c.created_at, c.updated_at
             FROM conversations c
             JOIN messages m ON c.id = m.conversation_id
-            WHERE m.content LIKE ?
+            WHERE {message_text} LIKE ?
             ORDER BY c.updated_at DESC
             LIMIT ? OFFSET ?
             '''
@@ -374,6 +522,87 @@ class DatabaseManager:
             results = [dict(row) for row in cursor.fetchall()]
             return results
     
+    def get_messages_after(self, last_id, limit=100):
+        """
+        Fetch messages with an id greater than last_id, oldest first
+        
+        Args:
+            last_id: Highest message id already processed
+            limit: Maximum number of messages to return
+            
+        Returns:
+            messages: List of dictionaries with id, conversation_id, role and content
+        """
+        with self.connect() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+            SELECT id, conversation_id, role, content, content_blob, codec FROM messages
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+            ''', (last_id, limit))
+            
+            return [self._plain_message(row) for row in cursor.fetchall()]
+    
+    def reserve_message_ids(self, last_id):
+        """
+        Make sure messages inserted from now on get ids above `last_id`
+
+        Message ids are never reused from the high-water mark on, but a
+        database upgraded from an older version may have freed ids that an
+        index already recorded as processed.
+        """
+        with self.connect() as conn:
+            conn.execute('''
+            UPDATE id_high_water SET last_id = MAX(last_id, ?) WHERE name = 'messages'
+            ''', (last_id,))
+            conn.commit()
+
+    def get_messages_by_ids(self, message_ids):
+        """
+        Fetch messages and their conversation titles by message id
+        
+        Args:
+            message_ids: Iterable of message ids
+            
+        Returns:
+            messages: Dictionary mapping message id to a message dictionary with
+                      conversation_id, title, role and content
+        """
+        message_ids = list(message_ids)
+        if not message_ids:
+            return {}
+            
+        with self.connect() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            
+            placeholders = ', '.join('?' for _ in message_ids)
+            cursor.execute(f'''
+            SELECT m.id, m.conversation_id, c.title, m.role, m.content, m.content_blob, m.codec
+            FROM messages m
+            JOIN conversations c ON c.id = m.conversation_id
+            WHERE m.id IN ({placeholders})
+            ''', message_ids)
+            
+            return {row['id']: self._plain_message(row) for row in cursor.fetchall()}
+    
+    @staticmethod
+    def _plain_message(row):
+        """Row as a dictionary with decompressed content and no storage columns"""
+        message = dict(row)
+        message['content'] = decode(message['content'], message.pop('content_blob'), message.pop('codec'))
+        return message
+    
+    def get_message_ids(self):
+        """Return the ids of all stored messages"""
+        with self.connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT id FROM messages')
+            return [row[0] for row in cursor.fetchall()]
+    
     def get_stats(self):
         """
         Get database statistics
@@ -381,7 +610,7 @@ class DatabaseManager:
         Returns:
             stats: Dictionary with database statistics
         """
-        with sqlite3.connect(self.db_path) as conn:
+        with self.connect() as conn:
             cursor = conn.cursor()
             
             # Get conversation count
@@ -392,6 +621,9 @@ class DatabaseManager:
             cursor.execute('SELECT COUNT(*) FROM messages')
             message_count = cursor.fetchone()[0]
             
+            cursor.execute('SELECT COUNT(*), COALESCE(SUM(message_count), 0) FROM archived_conversations')
+            archived_count, archived_messages = cursor.fetchone()
+            
             # Get model usage
             cursor.execute('''
             SELECT model, COUNT(*) as count
@@ -414,30 +646,175 @@ class DatabaseManager:
             return {
                 'conversation_count': conversation_count,
                 'message_count': message_count,
+                'archived_conversation_count': archived_count,
+                'archived_message_count': archived_messages,
                 'model_usage': model_usage,
                 'tag_counts': tag_counts
             }
     
+    # Archive of old conversations
+    def archive_conversations(self, older_than_days=30, batch_size=1000, cancelled=None):
+        """
+        Move conversations not updated for a while into archive segments
+        
+        Args:
+            older_than_days: Archive conversations last updated before this many days ago
+            batch_size: Conversations per segment (and per transaction)
+            cancelled: Optional callable; stop between batches when it returns True
+            
+        Returns:
+            archived: Number of conversations moved
+        """
+        cutoff = (datetime.now() - timedelta(days=older_than_days)).isoformat()
+        archived = 0
+        while not (cancelled and cancelled()):
+            with self.connect() as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                cursor.execute('''
+                SELECT * FROM conversations
+                WHERE updated_at < ?
+                ORDER BY updated_at
+                LIMIT ?
+                ''', (cutoff, batch_size))
+                records = [self._archive_record(cursor, dict(row)) for row in cursor.fetchall()]
+            if not records:
+                break
+            
+            # The segment is durable before any row leaves the database
+            segment = self.archive.write_segment(records)
+            moved = 0
+            now = datetime.now().isoformat()
+            with self.connect() as conn:
+                cursor = conn.cursor()
+                for record in records:
+                    # Skip conversations written to since they were read
+                    cursor.execute('''
+                    DELETE FROM conversations WHERE id = ? AND updated_at = ?
+                    ''', (record['id'], record['updated_at']))
+                    if cursor.rowcount == 0:
+                        continue
+                    cursor.execute('DELETE FROM messages WHERE conversation_id = ?', (record['id'],))
+                    cursor.execute('''
+                    INSERT INTO archived_conversations
+                        (id, title, model, created_at, updated_at, message_count, tag_list, segment, archived_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', (record['id'], record['title'], record['model'], record['created_at'],
+                          record['updated_at'], record['message_count'], record['tag_list'], segment, now))
+                    moved += 1
+                conn.commit()
+            if moved == 0:
+                self.archive.delete_segment(segment)
+            archived += moved
+        return archived
+    
+    def _archive_record(self, cursor, conversation):
+        """A conversation row plus its plain-text messages, as stored in a segment"""
+        cursor.execute('''
+        SELECT id, parent_id, role, content, content_blob, codec, timestamp, has_image, image_path
+        FROM messages
+        WHERE conversation_id = ?
+        ORDER BY timestamp, id
+        ''', (conversation['id'],))
+        conversation['messages'] = [self._plain_message(row) for row in cursor.fetchall()]
+        return conversation
+    
+    def get_archived_conversation(self, conversation_id):
+        """Load an archived conversation in the same shape as get_conversation"""
+        with self.connect() as conn:
+            row = conn.execute(
+                'SELECT segment, tag_list FROM archived_conversations WHERE id = ?', (conversation_id,)
+            ).fetchone()
+        if not row:
+            return None
+        
+        conversation = self.archive.get(row[0], conversation_id)
+        if conversation is None:
+            return None
+        conversation['tag_list'] = row[1]
+        messages = self._archived_branch(conversation['messages'], conversation.get('active_leaf_id'))
+        conversation['messages'] = Conversation(self._conversation_message(msg) for msg in messages)
+        conversation['archived'] = True
+        return conversation
+    
+    @staticmethod
+    def _archived_branch(messages, leaf_id):
+        """The active branch of an archived message tree, with sibling positions"""
+        by_id = {msg['id']: msg for msg in messages}
+        if leaf_id not in by_id:
+            # Archived before messages had parents
+            return messages
+        
+        siblings = {}
+        for msg in messages:
+            siblings.setdefault(msg['parent_id'], []).append(msg['id'])
+        path = []
+        msg = by_id[leaf_id]
+        while msg is not None:
+            ids = siblings[msg['parent_id']]
+            path.append(dict(msg, sibling_count=len(ids), sibling_index=sorted(ids).index(msg['id'])))
+            msg = by_id.get(msg['parent_id'])
+        path.reverse()
+        return path
+    
+    def _restore_archived(self, cursor, conversation_id):
+        """
+        Move an archived conversation back into the database before it is written to
+
+        Returns:
+            new_ids: Dictionary of archived message id to new id, or None if
+                the conversation was not archived
+        """
+        cursor.execute('SELECT segment, tag_list FROM archived_conversations WHERE id = ?', (conversation_id,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        
+        record = self.archive.get(row[0], conversation_id)
+        cursor.execute('DELETE FROM archived_conversations WHERE id = ?', (conversation_id,))
+        if record is None:
+            return None
+        cursor.execute('''
+        INSERT INTO conversations (id, title, model, system_prompt, created_at, updated_at, tag_list)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (conversation_id, record['title'], record['model'], record['system_prompt'],
+              record['created_at'], record['updated_at'], row[1]))
+        
+        # Message ids may have been reused meanwhile, so the tree is rebuilt with new ones;
+        # parents come before their children in (timestamp, id) order
+        new_ids = {}
+        leaf_id = None
+        for msg in record['messages']:
+            # Segments written before messages had parents hold a plain chain
+            parent_id = new_ids.get(msg['parent_id']) if 'parent_id' in msg else leaf_id
+            leaf_id = new_ids[msg['id']] = self._insert_messages(
+                cursor, conversation_id, [self._conversation_message(msg)],
+                msg['timestamp'], parent_id
+            )
+        self._set_active_leaf(cursor, conversation_id, new_ids.get(record.get('active_leaf_id'), leaf_id))
+        return new_ids
+    
     # Settings management
     def set_setting(self, key, value):
         """Save a setting to the database"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Convert value to JSON string if it's not a string
-            if not isinstance(value, str):
-                value = json.dumps(value)
-            
-            cursor.execute('''
-            INSERT OR REPLACE INTO settings (key, value)
-            VALUES (?, ?)
-            ''', (key, value))
-            
+        with self.connect() as conn:
+            self._set_setting(conn.cursor(), key, value)
             conn.commit()
     
+    def _set_setting(self, cursor, key, value):
+        """Save a setting using an open cursor"""
+        # Convert value to JSON string if it's not a string
+        if not isinstance(value, str):
+            value = json.dumps(value)
+        
+        cursor.execute('''
+        INSERT OR REPLACE INTO settings (key, value)
+        VALUES (?, ?)
+        ''', (key, value))
+    
     def get_setting(self, key, default=None):
         """Retrieve a setting from the database"""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.connect() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
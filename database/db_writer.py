@@ -0,0 +1,193 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+class ConversationHandle:
+    """
+    Identifies a conversation whose row may not exist yet
+
+    `id` stays None until the writer has inserted the conversation, so any
+    saves queued before that coalesce into the same insert instead of
+    creating duplicates.
+    """
+    __slots__ = ("id",)
+
+    def __init__(self, conversation_id=None):
+        self.id = conversation_id
+
+
+class _Write:
+    __slots__ = ("method", "args", "futures")
+
+    def __init__(self, method, args, future):
+        self.method = method
+        self.args = args
+        self.futures = [future]
+
+
+class DatabaseWriter(threading.Thread):
+    """
+    Background thread that performs DatabaseManager writes off the GUI thread.
+
+    Writes are queued and run in batches, one transaction per batch. A write
+    with a coalescing key replaces a queued write with the same key (e.g. a
+    later save of the same conversation), and both callers' futures resolve
+    with the single result. Every submit returns a concurrent.futures.Future;
+    call .result() when the caller has to wait.
+    """
+
+    def __init__(self, db, batch_window=0.05, max_batch=64):
+        """
+        Args:
+            db: DatabaseManager whose writes are performed
+            batch_window: Seconds to wait for more writes after the first one
+            max_batch: Maximum writes committed in one transaction
+        """
+        super().__init__(name="DatabaseWriter", daemon=True)
+        self.db = db
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+
+        self._pending = OrderedDict()  # key -> _Write
+        self._sequence = 0
+        self._busy = False
+        self._stopping = False
+        self._condition = threading.Condition()
+
+        self.stats = {"submitted": 0, "coalesced": 0, "written": 0, "transactions": 0, "failed": 0}
+
+    def submit(self, method, *args, key=None):
+        """
+        Queue `method(cursor, *args)` to run inside a writer transaction
+
+        Args:
+            method: Callable taking an open cursor first
+            key: Coalescing key; a queued write with the same key is replaced
+
+        Returns:
+            future: Resolves to the method's return value
+        """
+        future = Future()
+        with self._condition:
+            if self._stopping:
+                raise RuntimeError("DatabaseWriter is stopped")
+            self.stats["submitted"] += 1
+
+            queued = self._pending.get(key) if key is not None else None
+            if queued is not None:
+                queued.method = method
+                queued.args = args
+                queued.futures.append(future)
+                self.stats["coalesced"] += 1
+            else:
+                if key is None:
+                    self._sequence += 1
+                    key = ("write", self._sequence)
+                self._pending[key] = _Write(method, args, future)
+            self._condition.notify()
+        return future
+
+    def save_conversation(self, handle, title, model, messages, system_prompt=None):
+        """
+        Insert or update the conversation behind `handle`
+
+        Returns:
+            future: Resolves to the conversation id
+        """
+        return self.submit(self._save, handle, title, model, list(messages), system_prompt,
+                           key=("conversation", id(handle)))
+
+    def _save(self, cursor, handle, title, model, messages, system_prompt):
+        if handle.id is not None and (
+                not messages or self.db._update_conversation(cursor, handle.id, messages=messages)):
+            return handle.id
+        # New conversation, or the row was deleted meanwhile
+        handle.id = self.db._insert_conversation(cursor, title, model, messages, system_prompt)
+        return handle.id
+
+    def set_setting(self, key, value):
+        return self.submit(self.db._set_setting, key, value, key=("setting", key))
+
+    def add_tag_to_conversation(self, conversation_id, tag_name):
+        return self.submit(self.db._add_tag, conversation_id, tag_name)
+
+    def run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopping:
+                    self._condition.wait()
+                if not self._pending and self._stopping:
+                    return
+
+            # Let bursts of writes accumulate so they share a commit
+            if not self._stopping and self.batch_window > 0:
+                time.sleep(self.batch_window)
+
+            with self._condition:
+                batch = []
+                while self._pending and len(batch) < self.max_batch:
+                    batch.append(self._pending.popitem(last=False)[1])
+                self._busy = True
+
+            try:
+                self._commit(batch)
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+
+    def _commit(self, batch):
+        """Run a batch in one transaction, falling back to one per write on error"""
+        try:
+            with self.db.connect() as conn:
+                cursor = conn.cursor()
+                results = [write.method(cursor, *write.args) for write in batch]
+                conn.commit()
+        except Exception as e:
+            if len(batch) > 1:
+                for write in batch:
+                    self._commit([write])
+                return
+            self.stats["failed"] += 1
+            for future in batch[0].futures:
+                future.set_exception(e)
+            return
+
+        self.stats["transactions"] += 1
+        self.stats["written"] += len(batch)
+        for write, result in zip(batch, results):
+            for future in write.futures:
+                future.set_result(result)
+
+    def flush(self, timeout=None):
+        """
+        Wait until every queued write is committed
+
+        Returns:
+            done: False if the deadline passed first
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._pending or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def stop(self, timeout=5.0):
+        """
+        Commit what is queued, then end the thread
+
+        Returns:
+            done: False if writes were still pending at the deadline
+        """
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        done = self.flush(timeout)
+        if self.is_alive():
+            self.join(timeout)
+        return done
@@ -0,0 +1,293 @@
+import json
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+from .migrations import NEXT_ID_SQL, Migrator
+from .vector_store import MappedVectorIndex
+
+# Boundaries we prefer to cut chunks at, best first. All are ASCII, so a cut
+# right after one of them is always a valid UTF-8 boundary.
+SPLIT_MARKERS = (b"\n\n", b"\n", b". ", b" ")
+
+
+def iter_chunks(path, start_offset=0, chunk_bytes=2048, overlap_bytes=256, block_size=1 << 20):
+    """
+    Stream a text file as overlapping chunks without loading it whole
+
+    Args:
+        path: File to read
+        start_offset: Byte offset to resume from (a previous chunk boundary)
+        chunk_bytes: Target chunk size in bytes
+        overlap_bytes: Bytes repeated at the start of the next chunk
+        block_size: Read size
+
+    Yields:
+        (offset, length, text, next_offset): Chunk position and decoded text,
+        plus the offset ingestion resumes from after this chunk
+    """
+    with open(path, "rb") as f:
+        f.seek(start_offset)
+        buffer = b""
+        buffer_offset = start_offset
+        at_eof = False
+
+        while True:
+            while len(buffer) < chunk_bytes * 2 and not at_eof:
+                block = f.read(block_size)
+                if not block:
+                    at_eof = True
+                buffer += block
+
+            if not buffer:
+                return
+
+            if at_eof and len(buffer) <= chunk_bytes:
+                end = len(buffer)
+            else:
+                end = _find_cut(buffer, chunk_bytes)
+
+            text = buffer[:end].decode("utf-8", errors="replace").strip()
+            if at_eof and end == len(buffer):
+                next_start = end
+            else:
+                next_start = _find_overlap_start(buffer, end, overlap_bytes)
+                if next_start <= 0:
+                    next_start = end
+
+            if text:
+                yield buffer_offset, end, text, buffer_offset + next_start
+            buffer = buffer[next_start:]
+            buffer_offset += next_start
+
+
+def _find_cut(buffer, chunk_bytes):
+    """Pick a cut point near chunk_bytes, preferring paragraph/sentence ends"""
+    window_start = chunk_bytes // 2
+    for marker in SPLIT_MARKERS:
+        position = buffer.rfind(marker, window_start, chunk_bytes)
+        if position != -1:
+            return position + len(marker)
+    # No whitespace at all - back off to a UTF-8 character boundary
+    end = min(chunk_bytes, len(buffer))
+    while end > 0 and (buffer[end - 1] & 0xC0) == 0x80:
+        end -= 1
+    if end > 0 and buffer[end - 1] >= 0xC0:
+        end -= 1
+    return end or chunk_bytes
+
+
+def _find_overlap_start(buffer, end, overlap_bytes):
+    """Start the next chunk a little before end, on a word boundary"""
+    if overlap_bytes <= 0:
+        return end
+    position = buffer.find(b" ", max(0, end - overlap_bytes), end)
+    return position + 1 if position != -1 else end
+
+
+class DocumentStore:
+    """
+    Reference documents attached to conversations, split into chunks.
+
+    Chunk text and offsets live in SQLite; chunk embeddings live in one
+    MappedVectorIndex per conversation. Both sides keep their own progress
+    marker (documents.bytes_ingested and the index high-water mark), so an
+    interrupted ingestion resumes where it stopped. The high-water mark
+    works because chunk ids are never reused (see
+    migrations.track_high_water): ids freed by remove_document() are
+    never handed to a later document.
+    """
+
+    def __init__(self, db_path, index_dir):
+        """
+        Args:
+            db_path: SQLite database file (normally the app database)
+            index_dir: Directory holding the per-conversation chunk indexes
+        """
+        self.db_path = db_path
+        self.index_dir = Path(index_dir)
+        self._indexes = {}
+        self.init_db()
+
+    def init_db(self):
+        """Bring the schema up to date and keep new chunk ids above every index"""
+        Migrator(self.db_path).upgrade()
+
+        # Chunks deleted before their ids were tracked may have been
+        # recorded as embedded by an index already
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('''
+            UPDATE id_high_water SET last_id = MAX(last_id, ?) WHERE name = 'document_chunks'
+            ''', (self._indexed_high_water_mark(),))
+            conn.commit()
+
+    def _indexed_high_water_mark(self):
+        """Highest chunk id recorded by any conversation index"""
+        last_id = 0
+        for meta_path in self.index_dir.glob("conversation_*.json"):
+            try:
+                last_id = max(last_id, json.loads(meta_path.read_text()).get("last_id", 0))
+            except (OSError, ValueError):
+                continue
+        return last_id
+
+    def index_for(self, conversation_id):
+        """Return the chunk vector index of a conversation"""
+        index = self._indexes.get(conversation_id)
+        if index is None:
+            index = MappedVectorIndex(self.index_dir / f"conversation_{conversation_id}")
+            self._indexes[conversation_id] = index
+        return index
+
+    def add_document(self, conversation_id, path):
+        """
+        Attach a document to a conversation
+
+        Returns:
+            document_id: ID of the new document row
+        """
+        path = Path(path).resolve()
+        stat = path.stat()
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+            INSERT INTO documents (conversation_id, path, name, size_bytes, mtime, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ''', (conversation_id, str(path), path.name, stat.st_size, stat.st_mtime,
+                  datetime.now().isoformat()))
+            conn.commit()
+            return cursor.lastrowid
+
+    def get_document(self, document_id):
+        """Return a document row as a dictionary, or None"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute('SELECT * FROM documents WHERE id = ?', (document_id,)).fetchone()
+            return dict(row) if row else None
+
+    def list_documents(self, conversation_id):
+        """Return all documents attached to a conversation"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute('''
+            SELECT * FROM documents WHERE conversation_id = ? ORDER BY id
+            ''', (conversation_id,)).fetchall()
+            return [dict(row) for row in rows]
+
+    def has_documents(self, conversation_id):
+        """True if any document is attached to the conversation"""
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute('SELECT 1 FROM documents WHERE conversation_id = ? LIMIT 1',
+                               (conversation_id,)).fetchone()
+            return row is not None
+
+    def incomplete_documents(self, conversation_id=None):
+        """Return documents whose ingestion has not finished"""
+        query = "SELECT * FROM documents WHERE status NOT IN ('ready', 'changed')"
+        params = ()
+        if conversation_id is not None:
+            query += " AND conversation_id = ?"
+            params = (conversation_id,)
+
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            return [dict(row) for row in conn.execute(query + " ORDER BY id", params)]
+
+    def add_chunks(self, document_id, conversation_id, chunks, bytes_ingested):
+        """
+        Store a batch of chunks and advance the document's read position
+
+        Args:
+            document_id: Owning document
+            conversation_id: Conversation the document is attached to
+            chunks: List of (offset, length, text) tuples
+            bytes_ingested: Offset to resume reading from after this batch
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.executemany(f'''
+            INSERT INTO document_chunks (id, document_id, conversation_id, byte_offset, byte_length, text)
+            VALUES ({NEXT_ID_SQL.format(table="document_chunks")}, ?, ?, ?, ?, ?)
+            ''', [(document_id, conversation_id, offset, length, text)
+                  for offset, length, text in chunks])
+            cursor.execute('''
+            UPDATE documents SET bytes_ingested = ?, status = 'ingesting' WHERE id = ?
+            ''', (bytes_ingested, document_id))
+            conn.commit()
+
+    def chunks_to_embed(self, conversation_id, limit=256):
+        """Return (id, text) of chunks newer than the conversation index high-water mark"""
+        index = self.index_for(conversation_id)
+        with sqlite3.connect(self.db_path) as conn:
+            return conn.execute('''
+            SELECT id, text FROM document_chunks
+            WHERE conversation_id = ? AND id > ?
+            ORDER BY id
+            LIMIT ?
+            ''', (conversation_id, index.last_id, limit)).fetchall()
+
+    def set_status(self, document_id, status):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('UPDATE documents SET status = ? WHERE id = ?', (status, document_id))
+            conn.commit()
+
+    def get_chunks(self, chunk_ids):
+        """Return chunk rows (with document name) keyed by chunk id"""
+        chunk_ids = list(chunk_ids)
+        if not chunk_ids:
+            return {}
+
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            placeholders = ', '.join('?' for _ in chunk_ids)
+            rows = conn.execute(f'''
+            SELECT dc.id, dc.document_id, dc.byte_offset, dc.text, d.name
+            FROM document_chunks dc
+            JOIN documents d ON d.id = dc.document_id
+            WHERE dc.id IN ({placeholders})
+            ''', chunk_ids).fetchall()
+            return {row['id']: dict(row) for row in rows}
+
+    def search(self, conversation_id, embedding, k=4):
+        """
+        Find the chunks of a conversation's documents closest to an embedding
+
+        Returns:
+            chunks: List of chunk dictionaries with a 'score' key, best first
+        """
+        index = self.index_for(conversation_id)
+        if index.count == 0:
+            return []
+
+        ids, scores = index.search(embedding, k)
+        rows = self.get_chunks(ids[0].tolist())
+        return [dict(rows[chunk_id], score=score)
+                for chunk_id, score in zip(ids[0].tolist(), scores[0].tolist())
+                if chunk_id in rows]
+
+    def remove_document(self, document_id):
+        """Detach a document; its vectors are dropped from the conversation index"""
+        document = self.get_document(document_id)
+        if not document:
+            return False
+
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('PRAGMA foreign_keys = ON')
+            conn.execute('DELETE FROM documents WHERE id = ?', (document_id,))
+            remaining = [row[0] for row in conn.execute(
+                'SELECT id FROM document_chunks WHERE conversation_id = ?',
+                (document['conversation_id'],))]
+            conn.commit()
+
+        self.index_for(document['conversation_id']).compact(remaining)
+        return True
+
+    def source_changed(self, document):
+        """True if the file on disk no longer matches what was ingested"""
+        try:
+            stat = os.stat(document['path'])
+        except OSError:
+            return True
+        return stat.st_size != document['size_bytes'] or stat.st_mtime != document['mtime']
@@ -0,0 +1,229 @@
+"""
+Idle-time maintenance of the conversation database.
+
+DatabaseMaintenance.run() performs the steps that are due, in this order:
+
+    auto_vacuum         One-off VACUUM switching older databases to
+                        auto_vacuum=INCREMENTAL (new databases start that way)
+    incremental_vacuum  Returns free pages to the filesystem in small chunks
+    optimize            PRAGMA optimize
+    analyze             ANALYZE with a bounded analysis_limit
+    integrity_check     PRAGMA quick_check; problems are logged as errors
+    compact_archive     Rewrites archive segments that are mostly dead
+                        records (of deleted or restored conversations) and
+                        deletes segments nothing refers to any more
+    checkpoint          PRAGMA wal_checkpoint(TRUNCATE), last so it includes
+                        the pages the other steps wrote to the WAL
+
+Every step's duration is logged. interrupt() (safe to call from any thread)
+aborts the running statement with sqlite3_interrupt, which rolls it back,
+and stops the run; the step is retried on a later run. The connection
+uses a short busy timeout so maintenance gives way to the writer instead
+of queueing behind it. When each step last completed is kept in the
+settings table.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Step name -> minimum seconds between runs
+DEFAULT_INTERVALS = {
+    "auto_vacuum": 0,
+    "incremental_vacuum": 0,
+    "optimize": 60 * 60,
+    "analyze": 7 * 24 * 60 * 60,
+    "integrity_check": 7 * 24 * 60 * 60,
+    "compact_archive": 24 * 60 * 60,
+    "checkpoint": 10 * 60,
+}
+
+STATE_KEY = "maintenance_last_run"
+
+
+class MaintenanceInterrupted(Exception):
+    pass
+
+
+class DatabaseMaintenance:
+    """Runs due maintenance steps on one database file"""
+
+    def __init__(self, db_path, intervals=None, vacuum_pages=256, busy_timeout=0.5,
+                 archive=None, compact_dead_ratio=0.5, unreferenced_grace=60 * 60):
+        """
+        Args:
+            db_path: SQLite database file
+            intervals: Overrides for DEFAULT_INTERVALS
+            vacuum_pages: Pages freed per incremental_vacuum statement
+            busy_timeout: Seconds to wait for a lock before skipping a step
+            archive: The database's ConversationArchive; compact_archive
+                does nothing without it
+            compact_dead_ratio: Rewrite a segment once this fraction of its
+                bytes belongs to conversations no longer archived in it
+            unreferenced_grace: Seconds a segment nothing refers to is kept
+                before it is deleted
+        """
+        self.db_path = db_path
+        self.intervals = dict(DEFAULT_INTERVALS, **(intervals or {}))
+        self.vacuum_pages = vacuum_pages
+        self.busy_timeout = busy_timeout
+        self.archive = archive
+        self.compact_dead_ratio = compact_dead_ratio
+        self.unreferenced_grace = unreferenced_grace
+        self.last_report = {}
+
+        self._conn = None
+        self._lock = threading.Lock()
+        self._interrupted = threading.Event()
+
+    def interrupt(self):
+        """Abort the current run as soon as possible"""
+        self._interrupted.set()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.interrupt()
+
+    def _check(self):
+        if self._interrupted.is_set():
+            raise MaintenanceInterrupted()
+
+    def _load_state(self, conn):
+        row = conn.execute("SELECT value FROM settings WHERE key = ?", (STATE_KEY,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def _save_state(self, conn, state):
+        conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                     (STATE_KEY, json.dumps(state)))
+
+    def due_steps(self, state, now=None):
+        """Names of the steps whose interval has passed, in run order"""
+        now = time.time() if now is None else now
+        return [name for name, interval in self.intervals.items()
+                if interval is not None and now - state.get(name, 0) >= interval]
+
+    def run(self):
+        """
+        Run every due step until done or interrupted
+
+        Returns:
+            report: Step name -> {"ms": duration, "result": ...} for completed steps
+        """
+        self._interrupted.clear()
+        report = {}
+        conn = sqlite3.connect(self.db_path, isolation_level=None, timeout=self.busy_timeout,
+                               check_same_thread=False)
+        with self._lock:
+            self._conn = conn
+        try:
+            state = self._load_state(conn)
+            for name in self.due_steps(state):
+                self._check()
+                started = time.perf_counter()
+                try:
+                    result = getattr(self, f"_{name}")(conn)
+                except sqlite3.OperationalError as e:
+                    if self._interrupted.is_set():
+                        raise MaintenanceInterrupted() from e
+                    # Most likely the database is busy; try again next time
+                    logger.info("Maintenance step %s skipped: %s", name, e)
+                    continue
+                elapsed_ms = 1000 * (time.perf_counter() - started)
+                logger.info("Maintenance step %s took %.1f ms (%s)", name, elapsed_ms, result)
+                report[name] = {"ms": elapsed_ms, "result": result}
+
+                state[name] = time.time()
+                self._save_state(conn, state)
+        except MaintenanceInterrupted:
+            logger.info("Maintenance interrupted after %s", ", ".join(report) or "no steps")
+        finally:
+            with self._lock:
+                self._conn = None
+            conn.close()
+        self.last_report = report
+        return report
+
+    # Steps; each returns a short description of what it did
+
+    def _checkpoint(self, conn):
+        busy, log_pages, checkpointed = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        if log_pages < 0:
+            return "not in WAL mode"
+        return f"{checkpointed}/{log_pages} pages checkpointed" + (" (busy)" if busy else "")
+
+    def _auto_vacuum(self, conn):
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return "already incremental"
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")  # Rebuilds the file; required for the mode change
+        return "switched to incremental"
+
+    def _incremental_vacuum(self, conn):
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return "auto_vacuum is not incremental"
+        freed = 0
+        while True:
+            self._check()
+            free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if free_pages == 0:
+                break
+            # executescript steps the pragma to completion; execute() frees one page
+            conn.executescript(f"PRAGMA incremental_vacuum({int(self.vacuum_pages)})")
+            freed += free_pages - conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return f"{freed} pages freed"
+
+    def _optimize(self, conn):
+        conn.execute("PRAGMA optimize")
+        return "ok"
+
+    def _analyze(self, conn):
+        conn.execute("PRAGMA analysis_limit = 1000")
+        conn.execute("ANALYZE")
+        return "ok"
+
+    def _integrity_check(self, conn):
+        problems = [row[0] for row in conn.execute("PRAGMA quick_check")]
+        if problems != ["ok"]:
+            logger.error("Database integrity check failed: %s", "; ".join(problems[:20]))
+            return f"{len(problems)} problems"
+        return "ok"
+
+    def _compact_archive(self, conn):
+        if self.archive is None:
+            return "no archive"
+        live = {}
+        for conversation_id, number in conn.execute("SELECT id, segment FROM archived_conversations"):
+            live.setdefault(number, set()).add(conversation_id)
+
+        compacted = deleted = freed = 0
+        for number in self.archive.segment_numbers():
+            self._check()
+            segment = self.archive.segment(number)
+            keep = live.get(number, set())
+            sizes = dict(zip(segment.ids.tolist(), segment.lengths.tolist()))
+            dead = sum(length for conversation_id, length in sizes.items() if conversation_id not in keep)
+
+            if not keep:
+                # A segment being archived into has no rows until its batch commits,
+                # and a reader may still have a replaced segment's number
+                if time.time() - segment.modified_at >= self.unreferenced_grace:
+                    self.archive.delete_segment(number)
+                    deleted += 1
+                    freed += dead
+            elif dead >= self.compact_dead_ratio * sum(sizes.values()):
+                records = [segment.get(conversation_id) for conversation_id in sorted(keep & sizes.keys())]
+                replacement = self.archive.write_segment(records)
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.execute("UPDATE archived_conversations SET segment = ? WHERE segment = ?",
+                                 (replacement, number))
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    self.archive.delete_segment(replacement)
+                    raise
+                # The old segment is deleted by a later run, once it is past the grace period
+                compacted += 1
+        return f"{compacted} segments compacted, {deleted} deleted ({freed} bytes)"
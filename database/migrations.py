@@ -0,0 +1,571 @@
+"""
+Versioned schema migrations for the conversation database.
+
+The schema version lives in `PRAGMA user_version`. Each migration's
+`upgrade(cursor)` runs in its own transaction together with the version
+bump, so a database is always at exactly one version. Upgrades must be
+cheap (DDL, triggers, defaults); anything proportional to the amount of
+stored data goes in the migration's `backfill`, which is run in keyset
+batches of `batch_size` rows - one short transaction each, with its
+progress stored in `schema_backfills` - so it can run in the background,
+be interrupted, and resume on the next launch.
+
+Every table, index and trigger in the file is created here; the stores
+that share it (documents, response and semantic caches) run upgrade()
+instead of DDL of their own, so the version describes the whole schema.
+
+Adding a migration: append a Migration with the next version number.
+Never edit a migration that has shipped.
+"""
+import logging
+import sqlite3
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# A conversation's tag names, sorted and comma-separated, for the cached tag_list
+TAG_NAMES_SQL = '''(
+    SELECT GROUP_CONCAT(name, ', ') FROM (
+        SELECT t.name FROM conversation_tags ct JOIN tags t ON t.id = ct.tag_id
+        WHERE ct.conversation_id = {conversation} ORDER BY t.name
+    )
+)'''
+
+# Number of messages on the path from a message up to the root of its conversation
+PATH_LENGTH_SQL = '''(
+    WITH RECURSIVE path(id) AS (
+        SELECT {leaf}
+        UNION ALL
+        SELECT m.parent_id FROM path JOIN messages m ON m.id = path.id
+        WHERE m.parent_id IS NOT NULL
+    )
+    SELECT COUNT(*) FROM path WHERE id IS NOT NULL
+)'''
+
+# Next id to insert into a table tracked by track_high_water; NULL (SQLite
+# picks MAX(id) + 1) if the table is not tracked
+NEXT_ID_SQL = "(SELECT last_id + 1 FROM id_high_water WHERE name = '{table}')"
+
+
+class Backfill:
+    """
+    Batched rewrite of existing rows
+
+    `apply(cursor, first_id, last_id)` processes the rows of `table` whose
+    id lies in the inclusive range; ranges are handed out in id order.
+    """
+    __slots__ = ("table", "apply")
+
+    def __init__(self, table, apply):
+        self.table = table
+        self.apply = apply
+
+
+class Migration:
+    __slots__ = ("version", "description", "upgrade", "backfill")
+
+    def __init__(self, version, description, upgrade, backfill=None):
+        self.version = version
+        self.description = description
+        self.upgrade = upgrade
+        self.backfill = backfill
+
+
+def _initial_schema(cursor):
+    """The original tables; also adopts databases created before versioning"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS conversations (
+        id INTEGER PRIMARY KEY,
+        title TEXT NOT NULL,
+        model TEXT NOT NULL,
+        system_prompt TEXT,
+        created_at TIMESTAMP NOT NULL,
+        updated_at TIMESTAMP NOT NULL
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY,
+        conversation_id INTEGER NOT NULL,
+        role TEXT NOT NULL,
+        content TEXT NOT NULL,
+        timestamp TIMESTAMP NOT NULL,
+        has_image BOOLEAN DEFAULT 0,
+        image_path TEXT,
+        FOREIGN KEY (conversation_id) REFERENCES conversations (id) ON DELETE CASCADE
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS tags (
+        id INTEGER PRIMARY KEY,
+        name TEXT UNIQUE NOT NULL
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS conversation_tags (
+        conversation_id INTEGER,
+        tag_id INTEGER,
+        PRIMARY KEY (conversation_id, tag_id),
+        FOREIGN KEY (conversation_id) REFERENCES conversations (id) ON DELETE CASCADE,
+        FOREIGN KEY (tag_id) REFERENCES tags (id) ON DELETE CASCADE
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS settings (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    )
+    ''')
+
+
+def _listing_schema(cursor):
+    """Listing indexes, cached counters and the triggers that keep them current"""
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_messages_conversation
+    ON messages (conversation_id, timestamp)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_conversations_updated
+    ON conversations (updated_at)
+    ''')
+
+    # Unversioned databases from the first release of the listing cache may already have these
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(conversations)")}
+    if "message_count" not in columns:
+        cursor.execute("ALTER TABLE conversations ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0")
+    if "tag_list" not in columns:
+        cursor.execute("ALTER TABLE conversations ADD COLUMN tag_list TEXT")
+
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_messages_count_insert AFTER INSERT ON messages
+    BEGIN
+        UPDATE conversations SET message_count = message_count + 1 WHERE id = NEW.conversation_id;
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_messages_count_delete AFTER DELETE ON messages
+    BEGIN
+        UPDATE conversations SET message_count = message_count - 1 WHERE id = OLD.conversation_id;
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_tags_list_insert AFTER INSERT ON conversation_tags
+    BEGIN
+        UPDATE conversations SET tag_list = {TAG_NAMES_SQL.format(conversation="NEW.conversation_id")}
+        WHERE id = NEW.conversation_id;
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_tags_list_delete AFTER DELETE ON conversation_tags
+    BEGIN
+        UPDATE conversations SET tag_list = {TAG_NAMES_SQL.format(conversation="OLD.conversation_id")}
+        WHERE id = OLD.conversation_id;
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_tags_list_rename AFTER UPDATE OF name ON tags
+    BEGIN
+        UPDATE conversations SET tag_list = {TAG_NAMES_SQL.format(conversation="conversations.id")}
+        WHERE id IN (SELECT conversation_id FROM conversation_tags WHERE tag_id = NEW.id);
+    END
+    ''')
+
+
+def _backfill_listing(cursor, first_id, last_id):
+    """Recount messages and rebuild tag lists for a range of conversations"""
+    # Triggers keep rows current from here on; this fixes up rows written before them
+    cursor.execute(f'''
+    UPDATE conversations SET
+        message_count = (SELECT COUNT(*) FROM messages m WHERE m.conversation_id = conversations.id),
+        tag_list = {TAG_NAMES_SQL.format(conversation="conversations.id")}
+    WHERE id BETWEEN ? AND ?
+    ''', (first_id, last_id))
+
+
+def _message_compression(cursor):
+    """Columns for compressed message bodies (see database/compression.py)"""
+    cursor.execute("ALTER TABLE messages ADD COLUMN content_blob BLOB")
+    cursor.execute("ALTER TABLE messages ADD COLUMN codec TEXT")
+
+
+def _conversation_archive(cursor):
+    """Catalog of conversations moved to archive segments (see database/archive.py)"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS archived_conversations (
+        id INTEGER PRIMARY KEY,
+        title TEXT NOT NULL,
+        model TEXT NOT NULL,
+        created_at TIMESTAMP NOT NULL,
+        updated_at TIMESTAMP NOT NULL,
+        message_count INTEGER NOT NULL DEFAULT 0,
+        tag_list TEXT,
+        segment INTEGER NOT NULL,
+        archived_at TIMESTAMP NOT NULL
+    )
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_archived_updated
+    ON archived_conversations (updated_at)
+    ''')
+
+
+def _message_tree(cursor):
+    """Messages form a tree per conversation; the open branch ends at active_leaf_id"""
+    cursor.execute("ALTER TABLE messages ADD COLUMN parent_id INTEGER")
+    cursor.execute("ALTER TABLE conversations ADD COLUMN active_leaf_id INTEGER")
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_messages_parent
+    ON messages (conversation_id, parent_id)
+    ''')
+
+
+def link_message_chain(cursor, first_id, last_id):
+    """
+    Chain the messages of not yet linked conversations in a range of ids
+
+    Each message's parent becomes the one before it in (timestamp, id)
+    order and the last one becomes the active leaf. Conversations that
+    already have an active leaf were written as trees and are left alone.
+    """
+    cursor.execute('''
+    UPDATE messages SET parent_id = (
+        SELECT p.id FROM messages p
+        WHERE p.conversation_id = messages.conversation_id
+          AND (p.timestamp, p.id) < (messages.timestamp, messages.id)
+        ORDER BY p.timestamp DESC, p.id DESC
+        LIMIT 1
+    )
+    WHERE conversation_id IN (
+        SELECT id FROM conversations WHERE id BETWEEN ? AND ? AND active_leaf_id IS NULL
+    )
+    ''', (first_id, last_id))
+    cursor.execute('''
+    UPDATE conversations SET active_leaf_id = (
+        SELECT m.id FROM messages m WHERE m.conversation_id = conversations.id
+        ORDER BY m.timestamp DESC, m.id DESC
+        LIMIT 1
+    )
+    WHERE id BETWEEN ? AND ? AND active_leaf_id IS NULL
+    ''', (first_id, last_id))
+
+
+def track_high_water(cursor, table):
+    """
+    Record the highest id ever inserted into `table` in id_high_water
+
+    SQLite hands out MAX(id) + 1 for an `id INTEGER PRIMARY KEY`, so
+    deleting the newest rows frees their ids for the next insert, and
+    anything keyed on an id high-water mark (the history and document
+    indexes) skips the new rows. Inserting with NEXT_ID_SQL as the id
+    keeps ids increasing without rebuilding the table as AUTOINCREMENT.
+    """
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS id_high_water (
+        name TEXT PRIMARY KEY,
+        last_id INTEGER NOT NULL
+    )
+    ''')
+    cursor.execute(f"INSERT OR IGNORE INTO id_high_water (name, last_id) "
+                   f"SELECT '{table}', COALESCE(MAX(id), 0) FROM {table}")
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS trg_{table}_high_water AFTER INSERT ON {table}
+    BEGIN
+        UPDATE id_high_water SET last_id = NEW.id WHERE name = '{table}' AND last_id < NEW.id;
+    END
+    ''')
+
+
+def _message_ids_high_water(cursor):
+    """Message ids are never handed out twice (see track_high_water)"""
+    track_high_water(cursor, "messages")
+
+
+def _active_branch_counts(cursor):
+    """message_count is the length of the active branch, kept by the writes that change it"""
+    # Counting every inserted row counted every branch of the tree
+    cursor.execute("DROP TRIGGER IF EXISTS trg_messages_count_insert")
+    cursor.execute("DROP TRIGGER IF EXISTS trg_messages_count_delete")
+
+
+def _backfill_active_branch_counts(cursor, first_id, last_id):
+    """Recount a range of conversations along their active branch"""
+    cursor.execute(f'''
+    UPDATE conversations SET message_count = {PATH_LENGTH_SQL.format(leaf="conversations.active_leaf_id")}
+    WHERE id BETWEEN ? AND ?
+    ''', (first_id, last_id))
+
+
+def _reference_documents(cursor):
+    """Documents attached to conversations and their chunks (see database/document_store.py)"""
+    # Databases that ran an unversioned DocumentStore already have these
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS documents (
+        id INTEGER PRIMARY KEY,
+        conversation_id INTEGER NOT NULL,
+        path TEXT NOT NULL,
+        name TEXT NOT NULL,
+        size_bytes INTEGER NOT NULL,
+        mtime REAL NOT NULL,
+        bytes_ingested INTEGER DEFAULT 0,
+        status TEXT DEFAULT 'pending',
+        created_at TIMESTAMP NOT NULL,
+        FOREIGN KEY (conversation_id) REFERENCES conversations (id) ON DELETE CASCADE
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS document_chunks (
+        id INTEGER PRIMARY KEY,
+        document_id INTEGER NOT NULL,
+        conversation_id INTEGER NOT NULL,
+        byte_offset INTEGER NOT NULL,
+        byte_length INTEGER NOT NULL,
+        text TEXT NOT NULL,
+        FOREIGN KEY (document_id) REFERENCES documents (id) ON DELETE CASCADE
+    )
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_document_chunks_conversation
+    ON document_chunks (conversation_id, id)
+    ''')
+    # The chunk indexes keep a high-water mark just like the history index
+    track_high_water(cursor, "document_chunks")
+
+
+def _response_cache(cursor):
+    """Exact-match cache of complete responses (see database/response_cache.py)"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS response_cache (
+        key TEXT PRIMARY KEY,
+        model TEXT NOT NULL,
+        tokens TEXT NOT NULL,
+        size_bytes INTEGER NOT NULL,
+        created_at TIMESTAMP NOT NULL,
+        last_used REAL NOT NULL,
+        hit_count INTEGER DEFAULT 0
+    )
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_response_cache_last_used
+    ON response_cache (last_used)
+    ''')
+
+
+def _semantic_cache(cursor):
+    """Answers looked up by prompt similarity (see database/semantic_cache.py)"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS semantic_cache (
+        id INTEGER PRIMARY KEY,
+        namespace TEXT NOT NULL,
+        prompt TEXT NOT NULL,
+        response TEXT NOT NULL,
+        embedding BLOB NOT NULL,
+        created_at TIMESTAMP NOT NULL,
+        last_used REAL NOT NULL DEFAULT 0
+    )
+    ''')
+    # Tables from an unversioned SemanticCache predate eviction
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(semantic_cache)")}
+    if "last_used" not in columns:
+        cursor.execute("ALTER TABLE semantic_cache ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_semantic_cache_namespace
+    ON semantic_cache (namespace)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_semantic_cache_last_used
+    ON semantic_cache (last_used)
+    ''')
+
+
+MIGRATIONS = [
+    Migration(1, "Initial schema", _initial_schema),
+    Migration(2, "Listing indexes and cached message counts and tags", _listing_schema,
+              Backfill("conversations", _backfill_listing)),
+    Migration(3, "Compressed message bodies", _message_compression),
+    Migration(4, "Conversation archive", _conversation_archive),
+    Migration(5, "Message branches", _message_tree,
+              Backfill("conversations", link_message_chain)),
+    Migration(6, "Message ids are never reused", _message_ids_high_water),
+    Migration(7, "Message counts follow the active branch", _active_branch_counts,
+              Backfill("conversations", _backfill_active_branch_counts)),
+    Migration(8, "Reference documents", _reference_documents),
+    Migration(9, "Response cache", _response_cache),
+    Migration(10, "Semantic cache", _semantic_cache),
+]
+
+
+class Migrator:
+    """Brings a database file up to the latest schema version"""
+
+    def __init__(self, db_path, migrations=None, batch_size=500):
+        """
+        Args:
+            db_path: SQLite database file
+            migrations: Ordered Migration list, defaults to MIGRATIONS
+            batch_size: Rows rewritten per backfill transaction
+        """
+        self.db_path = db_path
+        self.migrations = sorted(migrations or MIGRATIONS, key=lambda m: m.version)
+        self.batch_size = batch_size
+
+    @property
+    def latest_version(self):
+        return self.migrations[-1].version if self.migrations else 0
+
+    def _connect(self):
+        # Autocommit mode; transactions are opened explicitly
+        return sqlite3.connect(self.db_path, isolation_level=None, timeout=30)
+
+    def version(self):
+        """Current schema version of the database"""
+        conn = self._connect()
+        try:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            conn.close()
+
+    def upgrade(self):
+        """
+        Apply every pending schema step, one transaction per migration
+
+        Backfills are only registered here; run them with run_backfills().
+
+        Returns:
+            applied: Versions applied by this call
+        """
+        applied = []
+        conn = self._connect()
+        try:
+            current = conn.execute("PRAGMA user_version").fetchone()[0]
+            if current == 0:
+                # Only takes effect on a new, empty database; maintenance converts older ones
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            if current > self.latest_version:
+                logger.warning("Database %s is at schema version %d, newer than this build (%d)",
+                               self.db_path, current, self.latest_version)
+                return applied
+
+            for migration in self.migrations:
+                if migration.version <= current:
+                    continue
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    # Another process may have migrated while we waited for the lock
+                    current = conn.execute("PRAGMA user_version").fetchone()[0]
+                    if migration.version <= current:
+                        conn.execute("COMMIT")
+                        continue
+
+                    cursor = conn.cursor()
+                    migration.upgrade(cursor)
+                    if migration.backfill is not None:
+                        self._register_backfill(cursor, migration)
+                    cursor.execute(f"PRAGMA user_version = {int(migration.version)}")
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    logger.exception("Schema migration %d failed", migration.version)
+                    raise
+                current = migration.version
+                applied.append(migration.version)
+                logger.info("Applied schema migration %d: %s", migration.version, migration.description)
+        finally:
+            conn.close()
+        return applied
+
+    def _register_backfill(self, cursor, migration):
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_backfills (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            last_id INTEGER NOT NULL DEFAULT 0,
+            completed_at TIMESTAMP
+        )
+        ''')
+        cursor.execute(
+            "INSERT OR REPLACE INTO schema_backfills (version, description) VALUES (?, ?)",
+            (migration.version, migration.description)
+        )
+
+    def pending_backfills(self):
+        """Migrations whose backfill has not completed, in version order"""
+        conn = self._connect()
+        try:
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_backfills'"
+            ).fetchone()
+            if not exists:
+                return []
+            versions = {row[0] for row in conn.execute(
+                "SELECT version FROM schema_backfills WHERE completed_at IS NULL"
+            )}
+        finally:
+            conn.close()
+        return [m for m in self.migrations if m.version in versions and m.backfill is not None]
+
+    def run_backfills(self, progress=None, cancelled=None):
+        """
+        Run pending backfills in batches
+
+        Args:
+            progress: Optional callback(migration, done, total) after each batch
+            cancelled: Optional callable; stop between batches when it returns True
+
+        Returns:
+            finished: False if cancelled before every backfill completed
+        """
+        for migration in self.pending_backfills():
+            if not self._run_backfill(migration, progress, cancelled):
+                return False
+        return True
+
+    def _run_backfill(self, migration, progress, cancelled):
+        backfill = migration.backfill
+        table = backfill.table
+        conn = self._connect()
+        try:
+            last_id = conn.execute(
+                "SELECT last_id FROM schema_backfills WHERE version = ?", (migration.version,)
+            ).fetchone()[0]
+            total = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            done = conn.execute(f"SELECT COUNT(*) FROM {table} WHERE id <= ?", (last_id,)).fetchone()[0]
+
+            while True:
+                if cancelled and cancelled():
+                    return False
+
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    ids = [row[0] for row in conn.execute(
+                        f"SELECT id FROM {table} WHERE id > ? ORDER BY id LIMIT ?",
+                        (last_id, self.batch_size)
+                    )]
+                    if ids:
+                        backfill.apply(conn.cursor(), ids[0], ids[-1])
+                        last_id = ids[-1]
+                        conn.execute("UPDATE schema_backfills SET last_id = ? WHERE version = ?",
+                                     (last_id, migration.version))
+                    else:
+                        conn.execute("UPDATE schema_backfills SET completed_at = ? WHERE version = ?",
+                                     (datetime.now().isoformat(), migration.version))
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    logger.exception("Backfill for schema migration %d failed", migration.version)
+                    raise
+
+                if not ids:
+                    logger.info("Completed backfill for schema migration %d", migration.version)
+                    return True
+                # Rows inserted meanwhile extend the range; keep total ahead of done
+                done += len(ids)
+                total = max(total, done)
+                if progress:
+                    progress(migration, done, total)
+        finally:
+            conn.close()
+
+    def migrate(self, progress=None, cancelled=None):
+        """Upgrade the schema and run every backfill to completion"""
+        self.upgrade()
+        return self.run_backfills(progress, cancelled)
@@ -0,0 +1,213 @@
+"""
+Message and conversation model shared by the UI, the worker and the database.
+
+A Message is a small __slots__ object instead of a dict whose shape varies
+(`content` as text or as {"text", "image_path"}, an optional `images` list
+of base64 strings). Everything that used to inspect that shape goes
+through the model instead:
+
+    Message.text / image_path    What is shown and stored
+    Message.content              The stored shape: text, or a dict when there is an image
+    Message.payload()            The /api/chat shape; built once and cached
+    Message.fragment()           payload() as canonical JSON bytes; cached
+    Conversation.to_api()        The cached payloads, no copying
+
+Role strings are interned, so 10k messages share three role objects.
+Images are referenced by path and only read and base64-encoded when a
+payload is built; payloads with images are not cached, so the encoded
+image is not kept alive by the conversation. Messages are treated as
+immutable apart from the fields the database assigns (id and the branch
+fields); build a new Message to change the text.
+"""
+import base64
+import json
+import logging
+import sys
+
+logger = logging.getLogger(__name__)
+
+ROLES = {role: sys.intern(role) for role in ("system", "user", "assistant", "tool")}
+
+
+def intern_role(role):
+    """The shared string object for a role name"""
+    return ROLES.get(role) or sys.intern(role)
+
+
+def canonical_json(value):
+    """Compact, key-sorted JSON bytes; equal values always give equal bytes"""
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def read_image(image_path):
+    """An image file as base64 text, or None if it cannot be read"""
+    try:
+        with open(image_path, "rb") as image_file:
+            return base64.b64encode(image_file.read()).decode('utf-8')
+    except OSError as e:
+        logger.debug("Image %s not sent: %s", image_path, e)
+        return None
+
+
+class Message:
+    """One chat message"""
+    __slots__ = ("role", "text", "image_path", "id", "parent_id", "sibling_index", "sibling_count",
+                 "_images", "_payload", "_fragment")
+
+    def __init__(self, role, text="", image_path=None, images=None, id=None, parent_id=None,
+                 sibling_index=0, sibling_count=1):
+        """
+        Args:
+            role: "user", "assistant" or "system"
+            text: Message text
+            image_path: Attached image file; read lazily when the message is sent
+            images: Base64 images to send instead of reading image_path
+            id: Row id once stored
+            parent_id: Id of the previous message in its branch
+            sibling_index: Position among the alternatives to this message
+            sibling_count: Number of alternatives, this one included
+        """
+        self.role = intern_role(role)
+        self.text = text
+        self.image_path = image_path
+        self.id = id
+        self.parent_id = parent_id
+        self.sibling_index = sibling_index
+        self.sibling_count = sibling_count
+        self._images = images
+        self._payload = None
+        self._fragment = None
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a message from the API format or the stored dict format"""
+        content = data.get("content", "")
+        image_path = data.get("image_path")
+        if isinstance(content, dict):
+            image_path = content.get("image_path", image_path)
+            content = content.get("text", "")
+        return cls(data["role"], content, image_path, data.get("images"), data.get("id"),
+                   data.get("parent_id"), data.get("sibling_index", 0), data.get("sibling_count", 1))
+
+    @property
+    def content(self):
+        """The stored shape: the text, or {"text", "image_path"} when an image is attached"""
+        if self.image_path:
+            return {"text": self.text, "image_path": self.image_path}
+        return self.text
+
+    @property
+    def has_image(self):
+        return bool(self.image_path or self._images)
+
+    @property
+    def images(self):
+        """Base64 images for the API; read from image_path on each call"""
+        if self._images is not None:
+            return self._images
+        if self.image_path:
+            image = read_image(self.image_path)
+            return [image] if image is not None else []
+        return []
+
+    def payload(self):
+        """The message in /api/chat format, sharing this message's strings"""
+        if self._payload is not None:
+            return self._payload
+        payload = {"role": self.role, "content": self.text}
+        if self.has_image:
+            images = self.images
+            if images:
+                payload["images"] = images
+            # Not cached: the encoded image would stay in memory with the conversation
+            return payload
+        self._payload = payload
+        return payload
+
+    def fragment(self):
+        """payload() as canonical JSON bytes, for request bodies and cache keys"""
+        if self._fragment is not None:
+            return self._fragment
+        fragment = canonical_json(self.payload())
+        if not self.has_image:
+            self._fragment = fragment
+        return fragment
+
+    def to_dict(self):
+        """The stored dict format ({"role", "content"}), e.g. for JSON files"""
+        return {"role": self.role, "content": self.content}
+
+    def __repr__(self):
+        text = self.text if len(self.text) <= 40 else self.text[:37] + "..."
+        return f"Message({self.role!r}, {text!r}, id={self.id!r})"
+
+
+def as_message(message):
+    """A Message for a Message or a message dict"""
+    return message if isinstance(message, Message) else Message.from_dict(message)
+
+
+def messages_json(messages):
+    """
+    Canonical JSON bytes of a message list, joined from cached fragments
+
+    Equal to canonical_json() of the list of API-format dicts, so request
+    bodies and response cache keys do not depend on which form was passed.
+    """
+    return b"[" + b",".join(
+        message.fragment() if isinstance(message, Message) else canonical_json(message)
+        for message in messages
+    ) + b"]"
+
+
+class Conversation(list):
+    """List of Messages that counts its own mutations (see ui/autosave.py)"""
+    __slots__ = ("version",)
+
+    def __init__(self, messages=()):
+        super().__init__(as_message(message) for message in messages)
+        self.version = 0
+
+    def append(self, message):
+        super().append(as_message(message))
+        self.version += 1
+
+    def extend(self, messages):
+        super().extend(as_message(message) for message in messages)
+        self.version += 1
+
+    def insert(self, index, message):
+        super().insert(index, as_message(message))
+        self.version += 1
+
+    def pop(self, index=-1):
+        message = super().pop(index)
+        self.version += 1
+        return message
+
+    def remove(self, message):
+        super().remove(message)
+        self.version += 1
+
+    def clear(self):
+        super().clear()
+        self.version += 1
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            super().__setitem__(index, [as_message(message) for message in value])
+        else:
+            super().__setitem__(index, as_message(value))
+        self.version += 1
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self.version += 1
+
+    def to_api(self):
+        """The messages in /api/chat format; the cached payloads themselves, not copies"""
+        return [message.payload() for message in self]
+
+    def to_dicts(self):
+        """The messages in the stored dict format"""
+        return [message.to_dict() for message in self]
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from .migrations import Migrator
+from .models import messages_json
+
+
+class ResponseCache:
+    """
+    Opt-in cache of complete model responses stored in SQLite.
+
+    Entries are keyed by a hash of the model digest, the normalized request
+    options and the full message list, and hold the streamed tokens so a hit
+    can be replayed through the normal streaming path. The cache is bounded
+    by total size and evicts least recently used entries first.
+    """
+
+    def __init__(self, db_path, max_bytes=64 * 1024 * 1024):
+        """
+        Args:
+            db_path: SQLite database file (normally the app database)
+            max_bytes: Total size of stored responses before eviction starts
+        """
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.init_db()
+
+    def init_db(self):
+        """Bring the schema, including the cache table, up to date"""
+        Migrator(self.db_path).upgrade()
+
+    @staticmethod
+    def make_key(model_digest, options, messages):
+        """
+        Build the cache key for a request
+
+        Args:
+            model_digest: Digest identifying the exact model weights
+            options: Request options such as temperature and top_p
+            messages: Full API-format message list, including the new prompt
+
+        Returns:
+            key: Hex SHA-256 digest
+        """
+        digest = hashlib.sha256()
+        digest.update(str(model_digest).encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(_canonical_json(normalize_options(options)))
+        digest.update(b'\0')
+        digest.update(messages_json(messages))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        Look up a cached response
+
+        Returns:
+            tokens: List of streamed tokens, or None on a miss
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT tokens FROM response_cache WHERE key = ?', (key,))
+            row = cursor.fetchone()
+
+            if row is None:
+                with self._lock:
+                    self.misses += 1
+                return None
+
+            cursor.execute('''
+            UPDATE response_cache
+            SET last_used = ?, hit_count = hit_count + 1
+            WHERE key = ?
+            ''', (time.time(), key))
+            conn.commit()
+
+        with self._lock:
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, model, tokens):
+        """Store the tokens of a completed response and evict if over budget"""
+        encoded = json.dumps(tokens, ensure_ascii=False)
+        size = len(encoded.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+
+        now = time.time()
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+            INSERT OR REPLACE INTO response_cache
+                (key, model, tokens, size_bytes, created_at, last_used, hit_count)
+            VALUES (?, ?, ?, ?, datetime('now'), ?, 0)
+            ''', (key, model, encoded, size, now))
+            self._evict(cursor)
+            conn.commit()
+
+    def _evict(self, cursor):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        cursor.execute('SELECT COALESCE(SUM(size_bytes), 0) FROM response_cache')
+        total = cursor.fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        cursor.execute('SELECT key, size_bytes FROM response_cache ORDER BY last_used')
+        victims = []
+        for key, size in cursor.fetchall():
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+
+        cursor.executemany('DELETE FROM response_cache WHERE key = ?', victims)
+
+    def clear(self):
+        """Remove every cached response"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('DELETE FROM response_cache')
+            conn.commit()
+
+    def stats(self):
+        """
+        Get cache statistics
+
+        Returns:
+            stats: Dictionary with hit/miss counters and current size
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM response_cache')
+            entries, size = cursor.fetchone()
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': entries,
+                'size_bytes': size,
+                'max_bytes': self.max_bytes
+            }
+
+
+def normalize_options(options):
+    """Normalize request options so equivalent settings hash identically"""
+    normalized = {}
+    for name, value in (options or {}).items():
+        if value is None:
+            continue
+        if isinstance(value, float):
+            value = round(value, 6)
+            if value.is_integer():
+                value = int(value)
+        normalized[name] = value
+    return normalized
+
+
+def is_deterministic(options):
+    """Whether requests with these options always get the same reply, so one can be cached"""
+    options = options or {}
+    # Without a temperature the server samples with its own non-zero default
+    return options.get("temperature") == 0 or options.get("seed") is not None
+
+
+def _canonical_json(value):
+    return json.dumps(value, sort_keys=True, separators=(',', ':'),
+                      ensure_ascii=False).encode('utf-8')
@@ -0,0 +1,179 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from .migrations import Migrator
+from .vector_store import IVFIndex, VectorMatrix, normalize_rows
+
+
+class SemanticCache:
+    """
+    Cache of past answers looked up by embedding similarity of the prompt.
+
+    Entries are grouped into namespaces (chat model, system prompt and
+    embedding model) and each namespace is held in memory as one contiguous
+    float32 matrix. Lookups are a single matrix-vector product, or an
+    inverted-file probe when the approximate index is enabled and the
+    namespace is large enough. The cache is bounded by entry count and
+    evicts least recently used entries first, which also bounds the
+    matrices held in memory.
+    """
+
+    def __init__(self, db_path, threshold=0.95, approximate=False, approximate_min_entries=50000,
+                 max_entries=10000):
+        """
+        Args:
+            db_path: SQLite database file (normally the app database)
+            threshold: Minimum cosine similarity for a hit
+            approximate: Use an IVF index for large namespaces
+            approximate_min_entries: Namespace size at which IVF kicks in
+            max_entries: Number of stored answers before eviction starts
+        """
+        self.db_path = db_path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.approximate = approximate
+        self.approximate_min_entries = approximate_min_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._matrices = {}  # namespace -> VectorMatrix
+        self._indexes = {}  # namespace -> IVFIndex
+        self.init_db()
+
+    def init_db(self):
+        """Bring the schema, including the cache table, up to date"""
+        Migrator(self.db_path).upgrade()
+
+    @staticmethod
+    def namespace(model, system_prompt, embedding_model):
+        """Build the namespace key entries are grouped under"""
+        raw = f"{model}\0{system_prompt or ''}\0{embedding_model}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _matrix(self, namespace, dim):
+        """Return the in-memory matrix for a namespace, loading it on first use"""
+        matrix = self._matrices.get(namespace)
+        if matrix is not None:
+            return matrix
+
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute('''
+            SELECT id, embedding FROM semantic_cache
+            WHERE namespace = ?
+            ORDER BY id
+            ''', (namespace,)).fetchall()
+
+        matrix = VectorMatrix(dim, capacity=max(1024, len(rows)))
+        if rows:
+            ids = [row[0] for row in rows]
+            vectors = np.frombuffer(b''.join(row[1] for row in rows), dtype=np.float32)
+            matrix.add(ids, vectors.reshape(len(rows), -1))
+        self._matrices[namespace] = matrix
+        return matrix
+
+    def _search(self, namespace, matrix, embedding):
+        if self.approximate and matrix.size >= self.approximate_min_entries:
+            index = self._indexes.get(namespace)
+            if index is None:
+                index = self._indexes[namespace] = IVFIndex()
+            if index.needs_rebuild(matrix):
+                index.build(matrix)
+            return index.search(matrix, embedding, k=1)
+        return matrix.search(embedding, k=1)
+
+    def lookup(self, namespace, embedding):
+        """
+        Find the closest cached prompt in a namespace
+
+        Args:
+            namespace: Key from namespace()
+            embedding: Embedding of the incoming prompt
+
+        Returns:
+            (response, similarity): The cached answer and its score, or None
+        """
+        embedding = normalize_rows(embedding)
+        with self._lock:
+            matrix = self._matrix(namespace, embedding.shape[1])
+            if matrix.size == 0 or matrix.dim != embedding.shape[1]:
+                self.misses += 1
+                return None
+
+            ids, scores = self._search(namespace, matrix, embedding)
+            if len(ids) == 0 or scores[0] < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry_id, similarity = int(ids[0]), float(scores[0])
+
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute('SELECT response FROM semantic_cache WHERE id = ?',
+                               (entry_id,)).fetchone()
+            conn.execute('UPDATE semantic_cache SET last_used = ? WHERE id = ?', (time.time(), entry_id))
+            conn.commit()
+        if row is None:
+            return None
+        return row[0], similarity
+
+    def add(self, namespace, prompt, response, embedding):
+        """Store an answered prompt together with its embedding and evict if over budget"""
+        embedding = normalize_rows(embedding)
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+            INSERT INTO semantic_cache (namespace, prompt, response, embedding, created_at, last_used)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ''', (namespace, prompt, response, embedding.tobytes(), datetime.now().isoformat(), time.time()))
+            entry_id = cursor.lastrowid
+            evicted = self._evict(cursor)
+            conn.commit()
+
+        with self._lock:
+            # Matrices that lost rows are reloaded on their next lookup
+            for name in evicted:
+                self._matrices.pop(name, None)
+                self._indexes.pop(name, None)
+            matrix = self._matrices.get(namespace)
+            if matrix is not None and matrix.dim == embedding.shape[1]:
+                matrix.add([entry_id], embedding)
+
+    def _evict(self, cursor):
+        """
+        Drop least recently used entries once the cache holds more than max_entries
+
+        A tenth of the budget goes at once, so a full cache does not reload
+        a namespace matrix on every add.
+
+        Returns:
+            namespaces: Namespaces that lost entries
+        """
+        cursor.execute('SELECT COUNT(*) FROM semantic_cache')
+        excess = cursor.fetchone()[0] - self.max_entries
+        if excess <= 0:
+            return set()
+
+        cursor.execute('''
+        SELECT id, namespace FROM semantic_cache ORDER BY last_used LIMIT ?
+        ''', (excess + self.max_entries // 10,))
+        victims = cursor.fetchall()
+        cursor.executemany('DELETE FROM semantic_cache WHERE id = ?', [(entry_id,) for entry_id, _ in victims])
+        return {namespace for _, namespace in victims}
+
+    def clear(self):
+        """Remove every cached answer"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('DELETE FROM semantic_cache')
+            conn.commit()
+        with self._lock:
+            self._matrices.clear()
+            self._indexes.clear()
+
+    def stats(self):
+        """Get hit/miss counters"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
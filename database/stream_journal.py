@@ -0,0 +1,178 @@
+import json
+import os
+import threading
+import time
+from itertools import count
+from pathlib import Path
+
+from .models import as_message
+
+
+class StreamJournal:
+    """
+    Append-only journal of in-flight streamed responses.
+
+    Tokens are buffered and appended in batches as JSON lines; the file is
+    flushed to the OS on every batch and fsynced at most once per
+    `fsync_interval`. A stream is finished once the save that includes the
+    complete reply is committed to SQLite, so a crash between the reply
+    arriving and the background write landing still loses nothing. With
+    auto-save off nothing commits it, so it is finished as soon as the reply
+    is complete; it is discarded on error. When no streams are open the file
+    is truncated. Anything still open at
+    startup was cut off mid-stream by a crash and can be recovered with
+    recover().
+
+    Records:
+        {"op": "begin", "stream": 1, "conversation_id": 7, "model": ..., "prompt": ..., "messages": [...]}
+        {"op": "tokens", "stream": 1, "text": "..."}
+        {"op": "end", "stream": 1}
+    """
+
+    def __init__(self, path, flush_tokens=32, flush_interval=0.25, fsync_interval=1.0):
+        """
+        Args:
+            path: Journal file
+            flush_tokens: Tokens buffered before a batch is written
+            flush_interval: Seconds after which a partial batch is written anyway
+            fsync_interval: Minimum seconds between fsync calls
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_tokens = flush_tokens
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._open = {}  # stream id -> {"tokens": [...], "last_flush": t}
+        self._ids = count(int(time.time() * 1000))
+        self._last_fsync = 0.0
+
+    def begin(self, conversation_id, model, prompt, messages=None):
+        """
+        Start journaling a response
+
+        Args:
+            conversation_id: Saved conversation the reply belongs to, if any
+            model: Model generating the reply
+            prompt: The user message being answered
+            messages: Conversation so far; stored only when there is no id yet
+
+        Returns:
+            stream_id: Pass to append(), finish() or discard()
+        """
+        stream_id = next(self._ids)
+        record = {"op": "begin", "stream": stream_id, "conversation_id": conversation_id,
+                  "model": model, "prompt": prompt, "started_at": time.time()}
+        if conversation_id is None and messages:
+            record["messages"] = [as_message(m).to_dict() for m in messages]
+
+        with self._lock:
+            self._open[stream_id] = {"tokens": [], "last_flush": time.monotonic()}
+            self._write([record], sync=False)
+        return stream_id
+
+    def append(self, stream_id, token):
+        """Buffer a token; writes a batch when it is large or old enough"""
+        with self._lock:
+            stream = self._open.get(stream_id)
+            if stream is None:
+                return
+            stream["tokens"].append(token)
+            if (len(stream["tokens"]) >= self.flush_tokens
+                    or time.monotonic() - stream["last_flush"] >= self.flush_interval):
+                self._flush_stream(stream_id, stream)
+
+    def flush(self, stream_id=None):
+        """Write buffered tokens of one stream (or all) and fsync"""
+        with self._lock:
+            for sid, stream in list(self._open.items()):
+                if stream_id is None or sid == stream_id:
+                    self._flush_stream(sid, stream, force_sync=True)
+
+    def finish(self, stream_id):
+        """The reply is committed (or will not be saved automatically); forget it"""
+        self._close(stream_id)
+
+    def discard(self, stream_id):
+        """The reply failed or was abandoned; forget it"""
+        self._close(stream_id)
+
+    def _close(self, stream_id):
+        with self._lock:
+            if self._open.pop(stream_id, None) is None:
+                return
+            if self._open:
+                self._write([{"op": "end", "stream": stream_id}], sync=False)
+            else:
+                # Nothing in flight - the whole journal is obsolete
+                self._truncate()
+
+    def _flush_stream(self, stream_id, stream, force_sync=False):
+        if stream["tokens"]:
+            record = {"op": "tokens", "stream": stream_id, "text": "".join(stream["tokens"])}
+            stream["tokens"].clear()
+            self._write([record], sync=True, force_sync=force_sync)
+        stream["last_flush"] = time.monotonic()
+
+    def _write(self, records, sync, force_sync=False):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records))
+        self._file.flush()
+        if sync:
+            now = time.monotonic()
+            if force_sync or now - self._last_fsync >= self.fsync_interval:
+                os.fsync(self._file.fileno())
+                self._last_fsync = now
+
+    def _truncate(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        with open(self.path, "w", encoding="utf-8"):
+            pass
+
+    def recover(self):
+        """
+        Read responses left unfinished by a previous run
+
+        Returns:
+            streams: List of begin records with the partial reply under "text"
+        """
+        if not self.path.exists():
+            return []
+
+        streams = {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from the crash
+                    continue
+                stream_id = record.get("stream")
+                if record.get("op") == "begin":
+                    streams[stream_id] = dict(record, text="")
+                elif record.get("op") == "tokens" and stream_id in streams:
+                    streams[stream_id]["text"] += record.get("text", "")
+                elif record.get("op") == "end":
+                    streams.pop(stream_id, None)
+
+        with self._lock:
+            return [s for sid, s in streams.items() if sid not in self._open and s["text"]]
+
+    def compact(self):
+        """Drop finished and recovered streams from the file"""
+        with self._lock:
+            if not self._open:
+                self._truncate()
+
+    def close(self):
+        """Flush everything and close the file (open streams stay recoverable)"""
+        self.flush()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,337 @@
+"""
+Streaming bulk export and import of the conversation store.
+
+Export format: JSON Lines, optionally gzip (.gz) or zstd (.zst)
+compressed. The first line is a header and every following line is one
+conversation:
+
+    {"format": "ollama-chat-studio/conversations", "version": 1, "exported_at": "..."}
+    {"id": 7, "title": "...", "model": "llama3", "system_prompt": null,
+     "created_at": "...", "updated_at": "...", "tags": ["work"], "active_leaf_id": 12,
+     "messages": [{"id": 11, "parent_id": null, "role": "user", "content": "...",
+                   "timestamp": "...", "image_path": "..."}]}
+
+Messages are the conversation's whole tree (every branch), parents
+before children; "active_leaf_id" names the last message of the open
+branch. Records without it (older exports) are imported as one chain.
+
+Export walks conversations, messages and tags with three cursors that are
+each read once, in conversation id order, and merge-joined, so memory
+use is bounded by the largest single conversation. Archived
+conversations follow the hot ones. Import parses one line at a time and
+inserts with executemany in one transaction per `batch_messages`
+messages. It also accepts a single-chat .json file (a list of messages).
+
+Both can be cancelled: a cancelled export deletes its partial file, a
+cancelled import keeps the conversations of the transactions committed
+so far.
+"""
+import gzip
+import itertools
+import json
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+from .compression import decode, encode
+from .models import Message
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+EXPORT_FORMAT = "ollama-chat-studio/conversations"
+EXPORT_VERSION = 1
+
+
+def detect_compression(path):
+    suffix = Path(path).suffix.lower()
+    return {".gz": "gzip", ".zst": "zstd"}.get(suffix)
+
+
+def open_text(path, mode, compression=None):
+    """
+    Open a possibly compressed text file
+
+    Args:
+        path: File path
+        mode: "r" or "w"
+        compression: None, "gzip" or "zstd"; inferred from the suffix when None
+    """
+    compression = compression or detect_compression(path)
+    if compression == "gzip":
+        return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=6)
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd export files need the zstandard package")
+        return zstandard.open(path, mode + "t", encoding="utf-8")
+    if compression is not None:
+        raise ValueError(f"Unknown compression: {compression}")
+    return open(path, mode, encoding="utf-8")
+
+
+class _Cancelled(Exception):
+    """Raised inside an export to stop writing"""
+
+
+class _GroupedRows:
+    """Rows from a cursor ordered by conversation id, taken one conversation at a time"""
+
+    def __init__(self, cursor):
+        self._groups = itertools.groupby(cursor, key=lambda row: row[0])
+        self._current = next(self._groups, None)
+
+    def take(self, conversation_id):
+        """Rows for `conversation_id`; ids must be requested in ascending order"""
+        # Skip rows whose conversation no longer exists
+        while self._current is not None and self._current[0] < conversation_id:
+            self._current = next(self._groups, None)
+        if self._current is None or self._current[0] != conversation_id:
+            return []
+        rows = list(self._current[1])
+        self._current = next(self._groups, None)
+        return rows
+
+
+def _message_record(message_id, parent_id, role, content, timestamp, has_image, image_path):
+    message = {"id": message_id, "parent_id": parent_id, "role": role, "content": content,
+               "timestamp": timestamp}
+    if has_image and image_path:
+        message["image_path"] = image_path
+    return message
+
+
+def export_conversations(db, path, compression=None, include_archived=True, progress=None, cancelled=None):
+    """
+    Stream every conversation to a JSONL file
+
+    Args:
+        db: DatabaseManager to export
+        path: Output file; .gz or .zst selects compression unless given
+        compression: None, "gzip" or "zstd"
+        include_archived: Also export conversations in the cold archive
+        progress: Optional callback(done, total) every 100 conversations
+        cancelled: Optional callable; stop between conversations when it returns True
+
+    Returns:
+        stats: Dictionary with conversation and message counts, and
+            whether the export was cancelled
+    """
+    stats = {"conversations": 0, "messages": 0, "cancelled": False}
+    conn = db.connect()
+    try:
+        total = conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+        if include_archived:
+            total += conn.execute("SELECT COUNT(*) FROM archived_conversations").fetchone()[0]
+
+        conversations = conn.execute('''
+        SELECT id, title, model, system_prompt, created_at, updated_at, active_leaf_id
+        FROM conversations ORDER BY id
+        ''')
+        messages = _GroupedRows(conn.execute('''
+        SELECT conversation_id, id, parent_id, role, content, content_blob, codec, timestamp,
+               has_image, image_path
+        FROM messages ORDER BY conversation_id, timestamp, id
+        '''))
+        tags = _GroupedRows(conn.execute('''
+        SELECT ct.conversation_id, t.name
+        FROM conversation_tags ct JOIN tags t ON t.id = ct.tag_id
+        ORDER BY ct.conversation_id, t.name
+        '''))
+
+        with open_text(path, "w", compression) as f:
+            f.write(json.dumps({"format": EXPORT_FORMAT, "version": EXPORT_VERSION,
+                                "exported_at": datetime.now().isoformat()}) + "\n")
+
+            def write(record):
+                if cancelled and cancelled():
+                    raise _Cancelled
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                stats["conversations"] += 1
+                stats["messages"] += len(record["messages"])
+                if progress and stats["conversations"] % 100 == 0:
+                    progress(stats["conversations"], total)
+
+            for conversation_id, title, model, system_prompt, created_at, updated_at, leaf_id in conversations:
+                write({
+                    "id": conversation_id, "title": title, "model": model,
+                    "system_prompt": system_prompt, "created_at": created_at, "updated_at": updated_at,
+                    "tags": [row[1] for row in tags.take(conversation_id)],
+                    "active_leaf_id": leaf_id,
+                    "messages": [
+                        _message_record(message_id, parent_id, role, decode(content, blob, codec), timestamp,
+                                        has_image, image_path)
+                        for _, message_id, parent_id, role, content, blob, codec, timestamp, has_image, image_path
+                        in messages.take(conversation_id)
+                    ],
+                })
+
+            if include_archived:
+                archived = conn.execute("SELECT id, segment FROM archived_conversations ORDER BY id")
+                for conversation_id, segment in archived.fetchall():
+                    record = db.archive.get(segment, conversation_id)
+                    if record is None:
+                        continue
+                    write({
+                        "id": conversation_id, "title": record["title"], "model": record["model"],
+                        "system_prompt": record["system_prompt"], "created_at": record["created_at"],
+                        "updated_at": record["updated_at"],
+                        "tags": [row[0] for row in conn.execute('''
+                        SELECT t.name FROM conversation_tags ct JOIN tags t ON t.id = ct.tag_id
+                        WHERE ct.conversation_id = ? ORDER BY t.name
+                        ''', (conversation_id,))],
+                        "active_leaf_id": record.get("active_leaf_id"),
+                        "messages": [
+                            _message_record(m["id"], m.get("parent_id"), m["role"], m["content"],
+                                            m["timestamp"], m["has_image"], m["image_path"])
+                            for m in record["messages"]
+                        ],
+                    })
+    except _Cancelled:
+        stats["cancelled"] = True
+    finally:
+        conn.close()
+
+    if stats["cancelled"]:
+        # A truncated export would import as if it were complete
+        Path(path).unlink(missing_ok=True)
+        return stats
+    if progress:
+        progress(stats["conversations"], total)
+    return stats
+
+
+def _read_records(f):
+    """Yield conversation records from an export file or a single-chat .json file"""
+    first = f.read(1)
+    if first == "[":
+        # A chat saved as one JSON list of API-format messages
+        messages = json.loads(first + f.read())
+        now = datetime.now().isoformat()
+        title = next((m["content"][:30] for m in messages
+                      if m.get("role") == "user" and isinstance(m.get("content"), str)), "Imported Chat")
+        yield {"title": title, "model": "unknown", "created_at": now, "updated_at": now,
+               "messages": messages}
+        return
+
+    for line in itertools.chain([first + f.readline()], f):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if "format" in record:
+            if record["format"] != EXPORT_FORMAT or record.get("version", 0) > EXPORT_VERSION:
+                raise ValueError(f"Unsupported export format: {record['format']} v{record.get('version')}")
+            continue
+        yield record
+
+
+def import_conversations(db, path, compression=None, batch_messages=50_000, progress=None, cancelled=None):
+    """
+    Import conversations from an export (or single-chat) file as new conversations
+
+    Args:
+        db: DatabaseManager to import into
+        path: Input file; .gz or .zst selects decompression unless given
+        compression: None, "gzip" or "zstd"
+        batch_messages: Messages inserted per transaction
+        progress: Optional callback(conversations, messages) after each transaction
+        cancelled: Optional callable; stop after the current transaction when it returns True
+
+    Returns:
+        stats: Dictionary with counts of the conversations and messages
+            imported, and whether the import was cancelled
+    """
+    stats = {"conversations": 0, "messages": 0, "cancelled": False}
+    # Messages refer to their parent (and conversations to their active
+    # leaf) by position in `messages` until ids are assigned in flush()
+    conversations, messages, tags = [], [], []
+
+    conn = sqlite3.connect(db.db_path, isolation_level=None, timeout=30)
+    try:
+        def flush():
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Ids are assigned inside the transaction so concurrent writers cannot collide
+                first_id = conn.execute('''
+                SELECT COALESCE(MAX(id), 0) + 1 FROM (SELECT MAX(id) AS id FROM conversations
+                                                      UNION ALL SELECT MAX(id) FROM archived_conversations)
+                ''').fetchone()[0]
+                # Above every id handed out so far, not only the current maximum:
+                # message ids freed by deletes must not be reused
+                first_message_id = conn.execute('''
+                SELECT MAX(COALESCE((SELECT last_id FROM id_high_water WHERE name = 'messages'), 0),
+                           COALESCE(MAX(id), 0)) + 1
+                FROM messages
+                ''').fetchone()[0]
+
+                def message_id(position):
+                    return None if position is None else first_message_id + position
+
+                conn.executemany('''
+                INSERT INTO conversations (id, title, model, system_prompt, created_at, updated_at,
+                                           message_count, active_leaf_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', ((first_id + i,) + row[:-1] + (message_id(row[-1]),) for i, row in enumerate(conversations)))
+                conn.executemany('''
+                INSERT INTO messages (id, conversation_id, parent_id, role, content, timestamp, has_image,
+                                      image_path, content_blob, codec)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', ((message_id(position), first_id + index, message_id(parent)) + row
+                      for position, (index, parent, row) in enumerate(messages)))
+                conn.executemany("INSERT OR IGNORE INTO tags (name) VALUES (?)",
+                                 ((name,) for _, name in tags))
+                conn.executemany('''
+                INSERT OR IGNORE INTO conversation_tags (conversation_id, tag_id)
+                SELECT ?, id FROM tags WHERE name = ?
+                ''', ((first_id + index, name) for index, name in tags))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+            stats["conversations"] += len(conversations)
+            stats["messages"] += len(messages)
+            conversations.clear()
+            messages.clear()
+            tags.clear()
+            if progress:
+                progress(stats["conversations"], stats["messages"])
+
+        with open_text(path, "r", compression) as f:
+            for record in _read_records(f):
+                index = len(conversations)
+                created_at = record.get("created_at") or datetime.now().isoformat()
+                # Exported trees keep their shape; anything else becomes one chain
+                tree = record.get("active_leaf_id") is not None
+                positions = {}
+                depths = {None: 0}
+                leaf = None
+                for msg in record.get("messages", ()):
+                    message = Message.from_dict(msg)
+                    content, content_blob, codec = encode(message.text, db.compress_threshold, db.codec)
+                    parent = positions.get(message.parent_id) if tree else leaf
+                    leaf = len(messages)
+                    depths[leaf] = depths.get(parent, 0) + 1
+                    if tree:
+                        positions[message.id] = leaf
+                    messages.append((index, parent, (message.role, content, msg.get("timestamp") or created_at,
+                                                     1 if message.image_path else 0, message.image_path,
+                                                     content_blob, codec)))
+                if tree:
+                    leaf = positions.get(record["active_leaf_id"], leaf)
+                conversations.append((record.get("title") or "Imported Chat", record.get("model") or "unknown",
+                                      record.get("system_prompt"), created_at,
+                                      record.get("updated_at") or created_at, depths[leaf], leaf))
+                tags.extend((index, name) for name in record.get("tags", ()))
+
+                if len(messages) >= batch_messages:
+                    flush()
+                    if cancelled and cancelled():
+                        stats["cancelled"] = True
+                        return stats
+            if conversations:
+                flush()
+    finally:
+        conn.close()
+    return stats
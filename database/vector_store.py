@@ -0,0 +1,311 @@
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+
+def normalize_rows(vectors):
+    """Return float32 rows scaled to unit length (zero rows stay zero)"""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def top_k(matrix, queries, k, chunk_rows=262144):
+    """
+    Batched cosine top-k over a matrix of unit vectors
+
+    Args:
+        matrix: (n, dim) array of unit vectors, float32 or float16
+        queries: (q, dim) array of unit query vectors
+        k: Number of results per query
+        chunk_rows: Rows scored per block, bounds temporary memory
+
+    Returns:
+        (indices, scores): Two (q, k) arrays sorted by descending score
+    """
+    queries = normalize_rows(queries)
+    n = matrix.shape[0]
+    k = min(k, n)
+    if k == 0:
+        empty = np.empty((queries.shape[0], 0))
+        return empty.astype(np.int64), empty.astype(np.float32)
+
+    best_idx = None
+    best_scores = None
+    for start in range(0, n, chunk_rows):
+        block = np.asarray(matrix[start:start + chunk_rows], dtype=np.float32)
+        scores = queries @ block.T
+        kk = min(k, scores.shape[1])
+        part = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+        part_scores = np.take_along_axis(scores, part, axis=1)
+        part += start
+
+        if best_idx is None:
+            best_idx, best_scores = part, part_scores
+        else:
+            best_idx = np.concatenate([best_idx, part], axis=1)
+            best_scores = np.concatenate([best_scores, part_scores], axis=1)
+            keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+            best_idx = np.take_along_axis(best_idx, keep, axis=1)
+            best_scores = np.take_along_axis(best_scores, keep, axis=1)
+
+    order = np.argsort(-best_scores, axis=1)
+    return np.take_along_axis(best_idx, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+
+class VectorMatrix:
+    """Growable contiguous float32 matrix of unit vectors with row ids"""
+
+    def __init__(self, dim, capacity=1024):
+        self.dim = dim
+        self.size = 0
+        self._data = np.empty((capacity, dim), dtype=np.float32)
+        self._ids = np.empty(capacity, dtype=np.int64)
+
+    def _reserve(self, extra):
+        needed = self.size + extra
+        if needed <= self._data.shape[0]:
+            return
+        capacity = max(needed, self._data.shape[0] * 2)
+        data = np.empty((capacity, self.dim), dtype=np.float32)
+        ids = np.empty(capacity, dtype=np.int64)
+        data[:self.size] = self._data[:self.size]
+        ids[:self.size] = self._ids[:self.size]
+        self._data, self._ids = data, ids
+
+    def add(self, ids, vectors):
+        """Append vectors (normalized on the way in) with their ids"""
+        vectors = normalize_rows(vectors)
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-dimensional vectors, got {vectors.shape[1]}")
+        self._reserve(len(ids))
+        self._data[self.size:self.size + len(ids)] = vectors
+        self._ids[self.size:self.size + len(ids)] = ids
+        self.size += len(ids)
+
+    @property
+    def vectors(self):
+        return self._data[:self.size]
+
+    @property
+    def ids(self):
+        return self._ids[:self.size]
+
+    def search(self, query, k=1):
+        """Exact cosine search; returns (ids, scores) for the best k rows"""
+        indices, scores = top_k(self.vectors, query, k)
+        return self.ids[indices[0]], scores[0]
+
+
+class IVFIndex:
+    """
+    Approximate inverted-file index over a VectorMatrix.
+
+    Vectors are clustered with spherical k-means; a query only scores the
+    rows in its nprobe nearest clusters plus any rows added since the last
+    build, which are scanned exactly.
+    """
+
+    def __init__(self, nlist=None, nprobe=8, iterations=8, seed=0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.iterations = iterations
+        self.seed = seed
+        self.centroids = None
+        self.built_size = 0
+        self._order = None
+        self._offsets = None
+
+    def build(self, matrix):
+        """Cluster the current contents of a VectorMatrix"""
+        vectors = matrix.vectors
+        n = vectors.shape[0]
+        nlist = self.nlist or max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(self.seed)
+
+        # Train on a sample, then assign every row
+        sample_size = min(n, nlist * 64)
+        sample = vectors[rng.choice(n, sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(self.iterations):
+            assign = self._assign(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            empty = np.bincount(assign, minlength=nlist) == 0
+            sums[empty] = centroids[empty]
+            centroids = normalize_rows(sums)
+
+        assign = self._assign(vectors, centroids)
+        self._order = np.argsort(assign, kind='stable')
+        self._offsets = np.searchsorted(assign[self._order], np.arange(nlist + 1))
+        self.centroids = centroids
+        self.built_size = n
+
+    @staticmethod
+    def _assign(vectors, centroids, chunk_rows=65536):
+        assign = np.empty(vectors.shape[0], dtype=np.int64)
+        for start in range(0, vectors.shape[0], chunk_rows):
+            block = vectors[start:start + chunk_rows]
+            assign[start:start + chunk_rows] = np.argmax(block @ centroids.T, axis=1)
+        return assign
+
+    def needs_rebuild(self, matrix):
+        return self.centroids is None or matrix.size > self.built_size * 1.5
+
+    def search(self, matrix, query, k=1):
+        """Approximate cosine search; returns (ids, scores) for the best k rows"""
+        query = normalize_rows(query)
+        probes = np.argsort(-(query @ self.centroids.T)[0])[:self.nprobe]
+        rows = [self._order[self._offsets[p]:self._offsets[p + 1]] for p in probes]
+        # Rows added after the last build are always scanned exactly
+        rows.append(np.arange(self.built_size, matrix.size))
+        rows = np.concatenate(rows)
+        if rows.size == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        indices, scores = top_k(matrix.vectors[rows], query, k)
+        return matrix.ids[rows[indices[0]]], scores[0]
+
+
+class MappedVectorIndex:
+    """
+    Append-only on-disk vector index read through a memory map.
+
+    Vectors live in `<base>.vec` as raw float16/float32 rows and their ids in
+    `<base>.ids`; `<base>.json` records the dimension, dtype, row count and
+    the highest id indexed so far. Rows past the recorded count (left by an
+    interrupted append) are ignored and truncated on the next write.
+    """
+
+    def __init__(self, base_path, dtype="float32"):
+        self.base_path = Path(base_path)
+        self.vec_path = self.base_path.with_suffix(".vec")
+        self.ids_path = self.base_path.with_suffix(".ids")
+        self.meta_path = self.base_path.with_suffix(".json")
+        self._lock = threading.RLock()
+        self._mapped = None
+
+        self.meta = {"dim": None, "dtype": dtype, "count": 0, "last_id": 0}
+        if self.meta_path.exists():
+            self.meta.update(json.loads(self.meta_path.read_text()))
+        self.dtype = np.dtype(self.meta["dtype"])
+
+    @property
+    def count(self):
+        return self.meta["count"]
+
+    @property
+    def dim(self):
+        return self.meta["dim"]
+
+    @property
+    def last_id(self):
+        """Highest id appended so far (used as an indexing high-water mark)"""
+        return self.meta["last_id"]
+
+    def _write_meta(self):
+        tmp_path = self.meta_path.with_suffix(".json.tmp")
+        tmp_path.write_text(json.dumps(self.meta))
+        os.replace(tmp_path, self.meta_path)
+
+    def _truncate_to_count(self):
+        if self.dim is None:
+            return
+        for path, row_bytes in ((self.vec_path, self.dim * self.dtype.itemsize), (self.ids_path, 8)):
+            if path.exists() and path.stat().st_size != self.count * row_bytes:
+                with open(path, "r+b") as f:
+                    f.truncate(self.count * row_bytes)
+
+    def add(self, ids, vectors, last_id=None):
+        """
+        Append vectors with their ids
+
+        Args:
+            ids: Sequence of integer ids, one per vector
+            vectors: (n, dim) array-like of embeddings
+            last_id: High-water mark to record (defaults to max(ids))
+        """
+        vectors = normalize_rows(vectors).astype(self.dtype)
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+
+        with self._lock:
+            if self.dim is None:
+                self.meta["dim"] = int(vectors.shape[1])
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-dimensional vectors, got {vectors.shape[1]}")
+
+            self.base_path.parent.mkdir(parents=True, exist_ok=True)
+            self._truncate_to_count()
+            with open(self.vec_path, "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self.ids_path, "ab") as f:
+                f.write(ids.tobytes())
+
+            self.meta["count"] += len(ids)
+            if last_id is None:
+                last_id = int(ids.max()) if len(ids) else self.last_id
+            self.meta["last_id"] = max(self.last_id, last_id)
+            self._write_meta()
+            self._mapped = None
+
+    def mark_indexed(self, last_id):
+        """Advance the high-water mark without adding vectors"""
+        with self._lock:
+            if last_id > self.last_id:
+                self.meta["last_id"] = last_id
+                self._write_meta()
+
+    def _arrays(self):
+        if self._mapped is None:
+            if self.count == 0:
+                return None, None
+            vectors = np.memmap(self.vec_path, dtype=self.dtype, mode="r",
+                                shape=(self.count, self.dim))
+            ids = np.memmap(self.ids_path, dtype=np.int64, mode="r", shape=(self.count,))
+            self._mapped = (vectors, ids)
+        return self._mapped
+
+    def search(self, queries, k=10):
+        """
+        Batched cosine top-k over the mapped vectors
+
+        Returns:
+            (ids, scores): Two (q, k) arrays sorted by descending score
+        """
+        with self._lock:
+            vectors, ids = self._arrays()
+        if vectors is None:
+            empty = np.empty((np.atleast_2d(queries).shape[0], 0))
+            return empty.astype(np.int64), empty.astype(np.float32)
+        indices, scores = top_k(vectors, queries, k)
+        return np.asarray(ids)[indices], scores
+
+    def compact(self, keep_ids):
+        """Rewrite the index keeping only rows whose id is in keep_ids"""
+        with self._lock:
+            vectors, ids = self._arrays()
+            if vectors is None:
+                return 0
+            mask = np.isin(np.asarray(ids), np.fromiter(keep_ids, dtype=np.int64))
+            kept_vectors = np.asarray(vectors)[mask]
+            kept_ids = np.asarray(ids)[mask]
+            self._mapped = None
+            del vectors, ids
+
+            for path, data in ((self.vec_path, kept_vectors), (self.ids_path, kept_ids)):
+                tmp_path = path.with_suffix(path.suffix + ".tmp")
+                with open(tmp_path, "wb") as f:
+                    f.write(data.tobytes())
+                os.replace(tmp_path, path)
+
+            removed = self.count - len(kept_ids)
+            self.meta["count"] = len(kept_ids)
+            self._write_meta()
+            return removed
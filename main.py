@@ -1,12 +1,24 @@
 import sys
+import argparse
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtGui import QIcon, QFont
 
 from ui.main_window import OllamaChatUI
 from ui.theme import apply_default_theme
+from app_logging import configure_logging, shutdown_logging
+from config import load_config
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="Ollama Chat Studio")
+    parser.add_argument("--replay", action="append", metavar="FIXTURE",
+                        help="Stream replies from recorded session fixtures instead of Ollama")
+    parser.add_argument("--replay-speed", type=float, default=1.0,
+                        help="Replay speed multiplier (0 = as fast as possible)")
+    args, qt_args = parser.parse_known_args()
+
+    configure_logging(load_config()["log_settings"])
+    
+    app = QApplication(sys.argv[:1] + qt_args)
     
     # Remove this section or make it a try-except that doesn't exit on failure
     # The default system fonts will be used instead
@@ -27,7 +39,14 @@ if __name__ == "__main__":
     # Set application style
     apply_default_theme(app)
     
-    window = OllamaChatUI()
+    client = None
+    if args.replay:
+        from tools.session_replay import ReplayClient
+        client = ReplayClient(args.replay, speed=args.replay_speed)
+    
+    window = OllamaChatUI(client=client)
     window.show()
     
-    sys.exit(app.exec())
\ No newline at end of file
+    exit_code = app.exec()
+    shutdown_logging()
+    sys.exit(exit_code)
\ No newline at end of file
@@ -0,0 +1,24 @@
+"""
+Summary statistics shared by the scheduler metrics, the batch runner and
+the benchmarks.
+"""
+import math
+
+
+def percentile(sorted_values, fraction):
+    """
+    Nearest-rank percentile of an ascending list
+
+    The smallest value with at least `fraction` of the values at or below
+    it: p95 of 1..20 is 19 and of 1..100 is 95.
+
+    Args:
+        sorted_values: Values sorted ascending
+        fraction: Percentile as a fraction, e.g. 0.95
+
+    Returns:
+        value: The value at that rank, or None for an empty list
+    """
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
@@ -0,0 +1,200 @@
+"""
+Terminal chat client sharing the conversation database with the GUI.
+
+    python terminal_chat.py [-m MODEL] [--load ID] [--db PATH]
+
+Type a message and press Enter to send it. Commands start with a slash:
+/help, /list [N], /load ID, /new, /model [NAME], /models, /save, /quit.
+
+Startup stays fast by never importing PyQt and by importing the HTTP
+client only when the first request is made; measure it with
+`python -m benchmarks.bench_startup`.
+"""
+import argparse
+import sys
+from contextlib import closing
+from datetime import datetime
+
+from config import load_config
+from database import Conversation, DatabaseManager, Message
+
+WELCOME_MESSAGE = "Hello! I'm your Ollama-powered assistant. How can I help you today?"
+
+
+class TerminalChat:
+    """Minimal REPL over the same DatabaseManager and client the GUI uses"""
+
+    def __init__(self, db, base_url, model=None, params=None, out=sys.stdout, timeout=60):
+        self.db = db
+        self.base_url = base_url
+        self.timeout = timeout
+        self.model = model
+        self.params = params or {}
+        self.out = out
+        self._client = None
+        self.new_chat()
+
+    @property
+    def client(self):
+        # Imported lazily: requests alone is a large share of startup time
+        if self._client is None:
+            from api.ollama_client import OllamaClient
+            self._client = OllamaClient(self.base_url, timeout=self.timeout)
+        return self._client
+
+    def write(self, text):
+        self.out.write(text)
+        self.out.flush()
+
+    def new_chat(self):
+        """Start a fresh conversation in the same shape the GUI uses"""
+        self.conversation = Conversation([Message("assistant", WELCOME_MESSAGE)])
+        self.conversation_id = None
+
+    def load(self, conversation_id):
+        """Load a conversation created by either client"""
+        conversation = self.db.get_conversation(conversation_id)
+        if not conversation:
+            self.write(f"Conversation not found: {conversation_id}\n")
+            return False
+
+        self.conversation = Conversation(msg for msg in conversation["messages"] if msg.text)
+        self.conversation_id = conversation_id
+        self.model = self.model or conversation["model"]
+
+        for msg in self.conversation:
+            speaker = "You" if msg.role == "user" else "Assistant"
+            self.write(f"{speaker}: {msg.text}\n\n")
+        self.write(f"-- Loaded conversation {conversation_id}: {conversation['title']} --\n")
+        return True
+
+    def save(self):
+        """Save or update the current conversation, like the GUI's auto-save"""
+        if self.conversation_id:
+            if self.db.update_conversation(self.conversation_id, messages=self.conversation):
+                return self.conversation_id
+
+        title = "New Conversation"
+        for msg in self.conversation:
+            if msg.role == "user":
+                title = msg.text[:30] + "..." if len(msg.text) > 30 else msg.text
+                break
+
+        self.conversation_id = self.db.save_conversation(
+            title=title, model=self.model or "", messages=self.conversation
+        )
+        return self.conversation_id
+
+    def send(self, prompt):
+        """Stream a reply to stdout and append both turns to the conversation"""
+        if not self.model:
+            names = self.client.model_names()
+            if not names:
+                self.write("No models available - pull one with `ollama pull`\n")
+                return
+            self.model = names[0]
+
+        from api.ollama_client import chunk_token
+
+        user_message = Message("user", prompt)
+        messages = self.conversation + [user_message]
+
+        parts = []
+        self.write("Assistant: ")
+        try:
+            # Ctrl+C stops reading mid-reply; closing frees the request slot right away
+            with closing(self.client.chat_stream(self.model, messages, self.params)) as chunks:
+                for chunk in chunks:
+                    token = chunk_token(chunk)
+                    if token:
+                        parts.append(token)
+                        self.write(token)
+        except KeyboardInterrupt:
+            self.write(" [interrupted]")
+        except Exception as e:
+            self.write(f"\nError: {str(e)}\n")
+            return
+        self.write("\n\n")
+
+        self.conversation.append(user_message)
+        self.conversation.append(Message("assistant", "".join(parts)))
+        self.save()
+
+    def list_conversations(self, limit=20):
+        for conv in self.db.list_conversations(limit=limit):
+            date = datetime.fromisoformat(conv['updated_at']).strftime('%Y-%m-%d %H:%M')
+            self.write(f"{conv['id']:>6}  {date}  {conv['message_count']:>4} msgs  "
+                       f"[{conv['model']}] {conv['title']}\n")
+
+    def handle_command(self, line):
+        """Run a slash command; returns False when the REPL should exit"""
+        command, _, argument = line[1:].partition(" ")
+        argument = argument.strip()
+
+        if command in ("quit", "exit", "q"):
+            return False
+        elif command == "help":
+            self.write("/list [N]  /load ID  /new  /model [NAME]  /models  /save  /quit\n")
+        elif command == "list":
+            self.list_conversations(int(argument) if argument else 20)
+        elif command == "load" and argument.isdigit():
+            self.load(int(argument))
+        elif command == "new":
+            self.new_chat()
+            self.write(f"{WELCOME_MESSAGE}\n")
+        elif command == "model":
+            if argument:
+                self.model = argument
+            self.write(f"Model: {self.model or '(first available)'}\n")
+        elif command == "models":
+            self.write("\n".join(self.client.model_names()) + "\n")
+        elif command == "save":
+            self.write(f"Saved conversation {self.save()}\n")
+        else:
+            self.write(f"Unknown command: {line} (try /help)\n")
+        return True
+
+    def repl(self):
+        while True:
+            try:
+                line = input("You: ").strip()
+            except (EOFError, KeyboardInterrupt):
+                self.write("\n")
+                break
+            if not line:
+                continue
+            if line.startswith("/"):
+                if not self.handle_command(line):
+                    break
+            else:
+                self.send(line)
+
+
+def main(argv=None):
+    config = load_config()
+
+    parser = argparse.ArgumentParser(description="Chat with Ollama from the terminal")
+    parser.add_argument("-m", "--model", help="Model to chat with")
+    parser.add_argument("--load", type=int, help="Continue a saved conversation")
+    parser.add_argument("--db", help="Database file (default: data/ollama_chat.db)")
+    parser.add_argument("--base-url", default=config["api_settings"]["base_url"])
+    parser.add_argument("--startup-check", action="store_true",
+                        help="Initialize and exit (used to measure startup time)")
+    args = parser.parse_args(argv)
+
+    chat = TerminalChat(DatabaseManager(args.db), args.base_url, args.model, config["model_params"],
+                        timeout=config["api_settings"]["timeout"])
+    if args.startup_check:
+        chat.db.list_conversations(limit=1)
+        return 0
+
+    if args.load:
+        chat.load(args.load)
+    else:
+        chat.write(f"{WELCOME_MESSAGE}\n(/help for commands)\n\n")
+    chat.repl()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,14 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The application modules are imported from the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from database import DatabaseManager  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    return DatabaseManager(tmp_path / "chat.db")
@@ -0,0 +1,33 @@
+import json
+
+from batch_runner import BatchRunner
+
+
+class EchoClient:
+    def chat_stream(self, model, messages, params=None):
+        yield {"message": {"content": messages[-1]["content"]}, "done": True}
+
+
+class BrokenDatabase:
+    def save_conversation(self, **kwargs):
+        raise OSError("disk full")
+
+
+def jobs(*prompts):
+    return [(f"{n}:m", "m", {"prompt": prompt}) for n, prompt in enumerate(prompts, start=1)]
+
+
+def test_results_that_cannot_be_recorded_count_as_errors():
+    runner = BatchRunner(EchoClient(), db=BrokenDatabase())
+    runner.run(jobs("a", "b"))
+    assert runner.errors == 2
+
+
+def test_output_is_replaced_unless_resuming(tmp_path):
+    output = tmp_path / "results.jsonl"
+    output.write_text('{"job": "stale"}\n')
+
+    BatchRunner(EchoClient(), output_path=output).run(jobs("a"))
+    BatchRunner(EchoClient(), output_path=output, append=True).run(jobs("b"))
+
+    assert [json.loads(line)["response"] for line in output.read_text().splitlines()] == ["a", "b"]
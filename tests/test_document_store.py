@@ -0,0 +1,26 @@
+from database.document_store import DocumentStore
+from database.migrations import Migrator
+
+
+def add_document(store, tmp_path, name, chunks):
+    path = tmp_path / name
+    path.write_text("text")
+    document_id = store.add_document(1, path)
+    store.add_chunks(document_id, 1, chunks, 4)
+    return document_id
+
+
+def test_document_tables_come_from_the_migrations(db, tmp_path):
+    DocumentStore(db.db_path, tmp_path / "index")
+    assert Migrator(db.db_path).version() == Migrator(db.db_path).latest_version
+
+
+def test_chunk_ids_of_a_removed_document_are_not_reused(db, tmp_path):
+    store = DocumentStore(db.db_path, tmp_path / "index")
+    first = add_document(store, tmp_path, "a.txt", [(0, 2, "ab"), (2, 2, "cd")])
+    highest = max(store.get_chunks(range(1, 10)))
+
+    store.remove_document(first)
+    add_document(store, tmp_path, "b.txt", [(0, 2, "ef")])
+
+    assert list(store.get_chunks(range(1, 10))) == [highest + 1]
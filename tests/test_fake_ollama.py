@@ -0,0 +1,59 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from tools.fake_ollama import FakeOllamaConfig, FakeOllamaServer
+
+
+def post_chat(base_url, timeout=5):
+    body = json.dumps({"model": "fake-llama:latest", "stream": False,
+                       "messages": [{"role": "user", "content": "hi"}]}).encode()
+    request = urllib.request.Request(f"{base_url}/api/chat", data=body,
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.status
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def busy_server():
+    # One slot and room for one waiting request; each reply takes half a second
+    config = FakeOllamaConfig(ttft=0.5, jitter=0.0, response_tokens=1, parallel=1, max_queue=1)
+    server = FakeOllamaServer(config).start()
+    statuses = []
+    callers = [threading.Thread(target=lambda: statuses.append(post_chat(server.base_url)))
+               for _ in range(2)]
+    for caller in callers:
+        caller.start()
+    wait_until(lambda: server.active.get("fake-llama:latest") == 1 and server.queued == 1)
+    yield server
+    for caller in callers:
+        caller.join(5)
+    server.stop()
+    assert statuses == [200, 200]
+
+
+def test_requests_over_the_queue_limit_are_rejected(busy_server):
+    with pytest.raises(urllib.error.HTTPError) as rejected:
+        post_chat(busy_server.base_url)
+    assert rejected.value.code == 503
+    assert busy_server.stats["rejected"] == 1
+
+
+def test_server_keeps_answering_after_a_rejection(busy_server):
+    with pytest.raises(urllib.error.HTTPError):
+        post_chat(busy_server.base_url)
+
+    with urllib.request.urlopen(f"{busy_server.base_url}/api/ps", timeout=5) as response:
+        assert response.status == 200
@@ -0,0 +1,61 @@
+import zlib
+
+import numpy as np
+
+from api.history_indexer import HistoryIndexer
+from database import Message
+from database.vector_store import MappedVectorIndex
+
+
+class WordHashClient:
+    """Embeds text as a bag of hashed words, so equal texts get equal vectors"""
+
+    def embed(self, model, texts, priority=None):
+        if isinstance(texts, str):
+            texts = [texts]
+        vectors = np.zeros((len(texts), 64), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.encode()) % 64] += 1.0
+        return vectors
+
+
+def make_indexer(db, tmp_path):
+    index = MappedVectorIndex(tmp_path / "history")
+    return HistoryIndexer(db, index, WordHashClient(), "fake-embed"), index
+
+
+def test_messages_saved_after_a_delete_are_indexed(db, tmp_path):
+    indexer, index = make_indexer(db, tmp_path)
+    old = db.save_conversation("old", "m", [Message("user", "apple pie"), Message("assistant", "banana bread")])
+    indexer.index_pending()
+    high_water_mark = index.last_id
+
+    db.delete_conversation(old)
+    new = db.save_conversation("new", "m", [Message("user", "cherry tart")])
+    indexer.index_pending()
+
+    assert index.last_id > high_water_mark
+    results = indexer.search("cherry tart", k=5)
+    assert [(r["conversation_id"], r["content"]) for r in results] == [(new, "cherry tart")]
+
+
+def test_deleted_messages_are_never_search_results(db, tmp_path):
+    indexer, index = make_indexer(db, tmp_path)
+    old = db.save_conversation("old", "m", [Message("user", "banana bread")])
+    indexer.index_pending()
+    db.delete_conversation(old)
+    db.save_conversation("new", "m", [Message("user", "cherry tart")])
+    indexer.index_pending()
+
+    assert indexer.search("banana bread", k=5)[0]["content"] == "cherry tart"
+
+    indexer.compact()
+    assert index.count == 1
+
+
+def test_reserved_ids_are_not_handed_out(db):
+    db.reserve_message_ids(10)
+    message = Message("user", "hi")
+    db.save_conversation("t", "m", [message])
+    assert message.id == 11
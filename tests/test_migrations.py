@@ -0,0 +1,32 @@
+import sqlite3
+
+from database import DatabaseManager
+from database.document_store import DocumentStore
+from database.migrations import Migrator
+from database.response_cache import ResponseCache
+from database.semantic_cache import SemanticCache
+
+
+def schema(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return sorted(conn.execute("SELECT type, name, sql FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'"))
+
+
+def test_the_stores_create_nothing_the_migrations_do_not(tmp_path):
+    migrated = tmp_path / "migrated.db"
+    Migrator(migrated).upgrade()
+
+    db = DatabaseManager(tmp_path / "app.db")
+    DocumentStore(db.db_path, tmp_path / "index")
+    ResponseCache(db.db_path)
+    SemanticCache(db.db_path)
+
+    assert Migrator(db.db_path).version() == Migrator(db.db_path).latest_version
+    assert schema(db.db_path) == schema(migrated)
+
+
+def test_each_store_brings_a_new_database_up_to_date(tmp_path):
+    for store in (ResponseCache, SemanticCache):
+        path = tmp_path / f"{store.__name__}.db"
+        store(path)
+        assert Migrator(path).version() == Migrator(path).latest_version
@@ -0,0 +1,19 @@
+from api.ollama_client import OllamaClient
+from api.scheduler import RequestScheduler
+from tools.fake_ollama import FakeOllamaConfig, FakeOllamaServer
+
+
+def test_closing_a_stream_early_frees_its_slot():
+    server = FakeOllamaServer(FakeOllamaConfig(ttft=0.0, jitter=0.0, response_tokens=50)).start()
+    try:
+        scheduler = RequestScheduler(per_model_limit=1, max_total=1)
+        client = OllamaClient(server.base_url, scheduler=scheduler)
+        chunks = client.chat_stream("fake-llama:latest", [{"role": "user", "content": "hi"}])
+        next(chunks)
+        chunks.close()
+
+        with scheduler.slot("fake-llama:latest", timeout=1.0):
+            pass
+    finally:
+        server.stop()
+
@@ -0,0 +1,15 @@
+import pytest
+
+from benchmarks.check_query_plans import PLAN_CHECKS, explain
+
+
+@pytest.mark.parametrize("name", PLAN_CHECKS)
+def test_query_uses_its_indexes(db, name):
+    sql, params, required, forbidden = PLAN_CHECKS[name]
+    with db.connect() as conn:
+        plan = explain(conn, sql, params)
+
+    for detail in required:
+        assert any(detail in line for line in plan), f"{detail!r} missing from plan:\n" + "\n".join(plan)
+    for detail in forbidden:
+        assert not any(detail in line for line in plan), f"{detail!r} in plan:\n" + "\n".join(plan)
@@ -0,0 +1,72 @@
+from database import Message
+
+
+def contents(messages):
+    return [(message.role, message.text) for message in messages]
+
+
+def test_repeated_turns_are_stored_as_new_messages(db):
+    first = [Message("user", "hi"), Message("assistant", "hello")]
+    conversation_id = db.save_conversation("t", "m", first)
+
+    # The same exchange again is a new turn, not the stored one
+    conversation = first + [Message("user", "hi"), Message("assistant", "hello")]
+    db.update_conversation(conversation_id, messages=conversation)
+
+    stored = db.get_conversation(conversation_id)["messages"]
+    assert contents(stored) == [("user", "hi"), ("assistant", "hello")] * 2
+    assert len({message.id for message in stored}) == 4
+    assert [message.parent_id for message in stored] == [None] + [message.id for message in stored[:-1]]
+
+
+def test_saving_again_only_inserts_the_new_tail(db):
+    conversation = [Message("user", "question"), Message("assistant", "answer")]
+    conversation_id = db.save_conversation("t", "m", conversation)
+    ids = [message.id for message in conversation]
+
+    db.update_conversation(conversation_id, messages=conversation)
+    conversation.append(Message("user", "follow-up"))
+    db.update_conversation(conversation_id, messages=conversation)
+
+    assert [message.id for message in conversation[:2]] == ids
+    assert conversation[2].parent_id == ids[1]
+    assert db.get_stats()["message_count"] == 3
+
+
+def test_replaced_reply_becomes_a_sibling_branch(db):
+    question, answer = Message("user", "question"), Message("assistant", "answer")
+    conversation_id = db.save_conversation("t", "m", [question, answer])
+
+    regenerated = Message("assistant", "another answer")
+    db.update_conversation(conversation_id, messages=[question, regenerated])
+
+    assert regenerated.parent_id == question.id
+    assert db.get_sibling_ids(regenerated.id) == [answer.id, regenerated.id]
+    listed = db.list_conversations()[0]
+    assert listed["message_count"] == 2
+
+
+def test_identical_regenerated_reply_is_not_merged_into_the_stored_one(db):
+    question, answer = Message("user", "question"), Message("assistant", "answer")
+    conversation_id = db.save_conversation("t", "m", [question, answer])
+
+    regenerated = Message("assistant", "answer")
+    db.update_conversation(conversation_id, messages=[question, regenerated])
+
+    assert regenerated.id != answer.id
+    assert db.get_sibling_ids(answer.id) == [answer.id, regenerated.id]
+
+
+def test_ids_that_are_not_stored_are_saved_as_new_messages(db):
+    question = Message("user", "question")
+    conversation_id = db.save_conversation("t", "m", [question])
+
+    # Left over from a save that was rolled back
+    reply = Message("assistant", "answer")
+    reply.id = 999
+    db.update_conversation(conversation_id, messages=[question, reply])
+
+    assert reply.id != 999
+    assert contents(db.get_conversation(conversation_id)["messages"]) == [
+        ("user", "question"), ("assistant", "answer")
+    ]
@@ -0,0 +1,23 @@
+import numpy as np
+
+from database.semantic_cache import SemanticCache
+
+
+def unit(index, dim=8):
+    vector = np.zeros((1, dim), dtype=np.float32)
+    vector[0, index] = 1.0
+    return vector
+
+
+def test_least_recently_used_answers_are_evicted(tmp_path):
+    cache = SemanticCache(tmp_path / "cache.db", max_entries=3)
+    namespace = SemanticCache.namespace("m", None, "e")
+    for index in range(3):
+        cache.add(namespace, f"q{index}", f"a{index}", unit(index))
+    # q0 was used since, so q1 is the oldest
+    assert cache.lookup(namespace, unit(0)) == ("a0", 1.0)
+
+    cache.add(namespace, "q3", "a3", unit(3))
+
+    assert cache.lookup(namespace, unit(1)) is None
+    assert [cache.lookup(namespace, unit(i))[0] for i in (0, 2, 3)] == ["a0", "a2", "a3"]
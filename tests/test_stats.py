@@ -0,0 +1,13 @@
+from stats import percentile
+
+
+def test_percentile_is_nearest_rank():
+    assert percentile(list(range(1, 21)), 0.95) == 19
+    assert percentile(list(range(1, 101)), 0.95) == 95
+    assert percentile(list(range(1, 101)), 0.50) == 50
+    assert percentile([7], 0.95) == 7
+    assert percentile([1, 2], 0.0) == 1
+
+
+def test_percentile_of_nothing_is_none():
+    assert percentile([], 0.95) is None
@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from database.stream_journal import StreamJournal
+
+
+def test_finished_stream_is_not_recovered(tmp_path):
+    journal = StreamJournal(tmp_path / "journal.jsonl")
+    stream = journal.begin(7, "m", "question")
+    journal.append(stream, "complete answer")
+    journal.flush(stream)
+    # Finished without the conversation ever being saved (auto-save off)
+    journal.finish(stream)
+    journal.close()
+
+    assert StreamJournal(tmp_path / "journal.jsonl").recover() == []
+
+
+def test_stream_cut_off_mid_reply_is_recovered(tmp_path):
+    journal = StreamJournal(tmp_path / "journal.jsonl")
+    stream = journal.begin(7, "m", "question")
+    for token in ("part", "ial"):
+        journal.append(stream, token)
+    journal.close()
+
+    recovered = StreamJournal(tmp_path / "journal.jsonl").recover()
+    assert [(s["conversation_id"], s["prompt"], s["text"]) for s in recovered] == [(7, "question", "partial")]
+
+
+def window_with_stream(tmp_path, auto_save):
+    journal = StreamJournal(tmp_path / "journal.jsonl")
+    stream = journal.begin(7, "m", "question")
+    journal.append(stream, "answer")
+    journal.flush(stream)
+    return SimpleNamespace(
+        tracer=mock.Mock(), trace_id=None, conversation=[], journal=journal, journal_stream=stream,
+        pending_journal_streams=[], stream_checkbox=mock.Mock(isChecked=lambda: True),
+        message_widgets=lambda: [], status_message=mock.Mock(), progress_bar=mock.Mock(),
+        conversation_settings={"auto_save": auto_save}, auto_save_conversation=mock.Mock(),
+    )
+
+
+def test_completed_reply_finishes_its_stream_with_auto_save_off(tmp_path):
+    pytest.importorskip("PyQt6")
+    from ui.main_window import OllamaChatUI
+
+    window = window_with_stream(tmp_path, auto_save=False)
+    OllamaChatUI.handle_response(window, "answer")
+    window.journal.close()
+
+    window.auto_save_conversation.assert_not_called()
+    assert window.journal_stream is None
+    assert StreamJournal(tmp_path / "journal.jsonl").recover() == []
+
+
+def test_completed_reply_stays_journaled_until_its_save_commits(tmp_path):
+    pytest.importorskip("PyQt6")
+    from ui.main_window import OllamaChatUI
+
+    window = window_with_stream(tmp_path, auto_save=True)
+    stream = window.journal_stream
+    OllamaChatUI.handle_response(window, "answer")
+    window.journal.close()
+
+    # Crash before the writer commits: the reply is still recoverable
+    window.auto_save_conversation.assert_called_once()
+    assert window.pending_journal_streams == [stream]
+    assert [s["text"] for s in StreamJournal(tmp_path / "journal.jsonl").recover()] == ["answer"]
@@ -0,0 +1,2 @@
+# tools/__init__.py
+# Development utilities (fake server, recorders, maintenance scripts)
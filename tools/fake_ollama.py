@@ -0,0 +1,344 @@
+"""
+Local stand-in for the Ollama HTTP API.
+
+Implements /api/chat (streaming and non-streaming), /api/tags, /api/show,
+/api/embed and /api/ps with configurable time-to-first-token, token rate,
+jitter, error injection and a limit on parallel generation slots, so the
+client layer, the GUI and load tests can run without a real model.
+
+    python -m tools.fake_ollama --port 11435 --ttft 0.3 --tokens-per-s 40
+
+or in-process:
+
+    server = FakeOllamaServer(FakeOllamaConfig(ttft=0.05)).start()
+    client = OllamaClient(server.base_url)
+    ...
+    server.stop()
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LOREM = ("the quick brown fox jumps over the lazy dog while a local model streams "
+         "tokens to the chat window one small piece at a time").split()
+
+
+class FakeOllamaConfig:
+    """Behaviour knobs for the fake server"""
+
+    def __init__(self, models=("fake-llama:latest", "fake-embed:latest"), ttft=0.2,
+                 tokens_per_s=50.0, jitter=0.2, response_tokens=64, error_rate=0.0,
+                 disconnect_rate=0.0, parallel=1, max_queue=512, embedding_dim=384, seed=None):
+        """
+        Args:
+            models: Model names reported by /api/tags
+            ttft: Seconds before the first token (prompt processing)
+            tokens_per_s: Generation speed per slot
+            jitter: Relative random variation applied to every delay (0.2 = +-20%)
+            response_tokens: Tokens per reply unless the request sets num_predict
+            error_rate: Fraction of chat requests answered with HTTP 500
+            disconnect_rate: Fraction of streams cut off halfway through
+            parallel: Generation slots (like OLLAMA_NUM_PARALLEL)
+            max_queue: Requests allowed to wait for a slot before HTTP 503
+            embedding_dim: Dimension of /api/embed vectors
+            seed: Seed for the jitter and error randomness
+        """
+        self.models = list(models)
+        self.ttft = ttft
+        self.tokens_per_s = tokens_per_s
+        self.jitter = jitter
+        self.response_tokens = response_tokens
+        self.error_rate = error_rate
+        self.disconnect_rate = disconnect_rate
+        self.parallel = parallel
+        self.max_queue = max_queue
+        self.embedding_dim = embedding_dim
+        self.seed = seed
+
+
+def fake_embedding(text, dim):
+    """Deterministic unit vector for a piece of text"""
+    rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+    vector = [rng.gauss(0.0, 1.0) for _ in range(dim)]
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def fake_reply(messages, count):
+    """Deterministic reply tokens derived from the last user message"""
+    prompt = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    rng = random.Random(hashlib.sha256(str(prompt).encode("utf-8")).digest())
+    return [(" " if i else "") + rng.choice(LOREM) for i in range(count)]
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients that drop keep-alive connections (e.g. after an error) are expected
+        pass
+
+
+class FakeOllamaServer:
+    """Threaded HTTP server speaking enough of the Ollama API for tests"""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or FakeOllamaConfig()
+        self.rng = random.Random(self.config.seed)
+        self.rng_lock = threading.Lock()
+        self.slots = threading.Semaphore(self.config.parallel)
+        self.queue_lock = threading.Lock()
+        self.queued = 0
+        self.active = {}  # model -> running generations
+        self.stats = {"chat": 0, "embed": 0, "errors": 0, "rejected": 0, "disconnects": 0}
+
+        server = self
+
+        class Handler(FakeOllamaHandler):
+            fake = server
+
+        self.httpd = _QuietHTTPServer((host, port), Handler)
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve in a background thread; returns self"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="FakeOllama", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def count(self, name):
+        with self.queue_lock:
+            self.stats[name] += 1
+
+    def chance(self, probability):
+        with self.rng_lock:
+            return self.rng.random() < probability
+
+    def delay(self, seconds):
+        """Sleep for a jittered duration"""
+        if seconds <= 0:
+            return
+        with self.rng_lock:
+            factor = 1.0 + self.rng.uniform(-self.config.jitter, self.config.jitter)
+        time.sleep(max(0.0, seconds * factor))
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    fake = None  # Set on the per-server subclass
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # Keep load tests quiet
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self.send_json(200, {"models": [self.model_entry(name) for name in self.fake.config.models]})
+        elif self.path == "/api/ps":
+            with self.fake.queue_lock:
+                running = [name for name, count in self.fake.active.items() if count > 0]
+            self.send_json(200, {"models": [self.model_entry(name) for name in running]})
+        elif self.path in ("/", "/api/version"):
+            self.send_json(200, {"version": "0.0.0-fake"})
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        try:
+            body = self.read_json()
+        except json.JSONDecodeError:
+            self.send_json(400, {"error": "invalid JSON"})
+            return
+
+        if self.path == "/api/chat":
+            self.handle_chat(body)
+        elif self.path == "/api/embed":
+            self.handle_embed(body)
+        elif self.path == "/api/show":
+            self.handle_show(body)
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def model_entry(self, name):
+        digest = hashlib.sha256(name.encode("utf-8")).hexdigest()
+        return {
+            "name": name,
+            "model": name,
+            "digest": digest,
+            "size": 4_000_000_000,
+            "modified_at": datetime.now(timezone.utc).isoformat(),
+            "details": {"family": "fake", "parameter_size": "7B", "quantization_level": "Q4_0"},
+        }
+
+    def known_model(self, name):
+        return name in self.fake.config.models or f"{name}:latest" in self.fake.config.models
+
+    def handle_show(self, body):
+        name = body.get("model") or body.get("name", "")
+        if not self.known_model(name):
+            self.send_json(404, {"error": f"model '{name}' not found"})
+            return
+        self.send_json(200, {
+            "modelfile": f"FROM {name}",
+            "parameters": "num_ctx 4096",
+            "template": "{{ .Prompt }}",
+            "details": self.model_entry(name)["details"],
+            "model_info": {"general.architecture": "fake", "fake.context_length": 4096},
+        })
+
+    def handle_embed(self, body):
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        self.fake.count("embed")
+        self.fake.delay(0.001 * len(inputs))
+        dim = self.fake.config.embedding_dim
+        self.send_json(200, {
+            "model": body.get("model"),
+            "embeddings": [fake_embedding(text, dim) for text in inputs],
+        })
+
+    def handle_chat(self, body):
+        fake = self.fake
+        model = body.get("model", "")
+        if not self.known_model(model):
+            self.send_json(404, {"error": f"model '{model}' not found"})
+            return
+        if fake.chance(fake.config.error_rate):
+            fake.count("errors")
+            self.send_json(500, {"error": "injected failure"})
+            return
+
+        with fake.queue_lock:
+            # count() takes queue_lock itself, so the counter is bumped directly
+            rejected = fake.queued >= fake.config.max_queue
+            if rejected:
+                fake.stats["rejected"] += 1
+            else:
+                fake.queued += 1
+        if rejected:
+            self.send_json(503, {"error": "server busy, please try again"})
+            return
+
+        fake.slots.acquire()
+        with fake.queue_lock:
+            fake.queued -= 1
+            fake.active[model] = fake.active.get(model, 0) + 1
+        try:
+            fake.count("chat")
+            options = body.get("options") or {}
+            count = int(options.get("num_predict") or body.get("max_tokens") or fake.config.response_tokens)
+            count = min(count, fake.config.response_tokens)
+            tokens = fake_reply(body.get("messages", []), count)
+            if body.get("stream", True):
+                self.stream_chat(model, tokens)
+            else:
+                fake.delay(fake.config.ttft + len(tokens) / fake.config.tokens_per_s)
+                self.send_json(200, self.final_chunk(model, "".join(tokens), len(tokens)))
+        finally:
+            with fake.queue_lock:
+                fake.active[model] -= 1
+            fake.slots.release()
+
+    def final_chunk(self, model, content, count):
+        return {
+            "model": model,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "message": {"role": "assistant", "content": content},
+            "done": True,
+            "done_reason": "stop",
+            "eval_count": count,
+            "eval_duration": int(1e9 * count / self.fake.config.tokens_per_s),
+        }
+
+    def stream_chat(self, model, tokens):
+        fake = self.fake
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        disconnect_at = len(tokens) // 2 if fake.chance(fake.config.disconnect_rate) else None
+        fake.delay(fake.config.ttft)
+        for i, token in enumerate(tokens):
+            if i == disconnect_at:
+                fake.count("disconnects")
+                self.close_connection = True
+                return  # Drop the stream without the terminating chunk
+            if i:
+                fake.delay(1.0 / fake.config.tokens_per_s)
+            self.write_chunk({
+                "model": model,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "message": {"role": "assistant", "content": token},
+                "done": False,
+            })
+        self.write_chunk(dict(self.final_chunk(model, "", len(tokens))))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def write_chunk(self, obj):
+        data = json.dumps(obj).encode("utf-8") + b"\n"
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake Ollama server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--ttft", type=float, default=0.2)
+    parser.add_argument("--tokens-per-s", type=float, default=50.0)
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--response-tokens", type=int, default=64)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--disconnect-rate", type=float, default=0.0)
+    parser.add_argument("--parallel", type=int, default=1)
+    parser.add_argument("--embedding-dim", type=int, default=384)
+    parser.add_argument("--model", action="append", help="Model name to advertise (repeatable)")
+    args = parser.parse_args()
+
+    config = FakeOllamaConfig(
+        models=args.model or ("fake-llama:latest", "fake-embed:latest"),
+        ttft=args.ttft, tokens_per_s=args.tokens_per_s, jitter=args.jitter,
+        response_tokens=args.response_tokens, error_rate=args.error_rate,
+        disconnect_rate=args.disconnect_rate, parallel=args.parallel,
+        embedding_dim=args.embedding_dim
+    )
+    server = FakeOllamaServer(config, args.host, args.port)
+    print(f"Fake Ollama listening on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
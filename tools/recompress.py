@@ -0,0 +1,117 @@
+"""
+Re-encode stored message bodies for a new compression threshold or codec.
+
+Compresses plain messages at or above the threshold, stores ones below it
+as plain text again and converts between codecs. Each batch of messages is
+rewritten in its own transaction, so the tool can be interrupted and run
+again. Freed pages stay in the file until --vacuum is given.
+
+    python -m tools.recompress --threshold 2048 --codec zlib --vacuum
+"""
+import argparse
+import sqlite3
+import sys
+
+from database import DatabaseManager
+from database.compression import DEFAULT_THRESHOLD, available_codecs, decode, encode
+
+
+def stored_size(content, content_blob):
+    return len(content.encode("utf-8")) + (len(content_blob) if content_blob is not None else 0)
+
+
+def recompress(db_path=None, threshold=DEFAULT_THRESHOLD, codec=None, batch_size=500, progress=None):
+    """
+    Rewrite every message body with the given settings
+
+    Args:
+        db_path: Conversation database, defaults to the application's
+        threshold: Minimum size in bytes to compress; 0 stores everything plain
+        codec: "zlib" or "zstd", defaults to the best available
+        batch_size: Messages per transaction
+        progress: Optional callback(done, total) after each batch
+
+    Returns:
+        stats: Message counts and stored bytes before and after
+    """
+    db = DatabaseManager(db_path)  # Brings the schema up to date first
+    stats = {"messages": 0, "rewritten": 0, "compressed": 0, "plain": 0,
+             "bytes_before": 0, "bytes_after": 0}
+
+    conn = sqlite3.connect(db.db_path, isolation_level=None, timeout=30)
+    try:
+        total = conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        last_id = 0
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute('''
+                SELECT id, content, content_blob, codec FROM messages
+                WHERE id > ? ORDER BY id LIMIT ?
+                ''', (last_id, batch_size)).fetchall()
+                updates = []
+                for message_id, content, content_blob, old_codec in rows:
+                    stored = encode(decode(content, content_blob, old_codec), threshold, codec)
+                    before = stored_size(content, content_blob)
+                    after = stored_size(stored[0], stored[1])
+                    stats["bytes_before"] += before
+                    stats["bytes_after"] += after
+                    stats["compressed" if stored[2] else "plain"] += 1
+                    if stored != (content, content_blob, old_codec):
+                        updates.append(stored + (message_id,))
+                conn.executemany(
+                    "UPDATE messages SET content = ?, content_blob = ?, codec = ? WHERE id = ?", updates
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+            if not rows:
+                return stats
+            last_id = rows[-1][0]
+            stats["messages"] += len(rows)
+            stats["rewritten"] += len(updates)
+            if progress:
+                progress(stats["messages"], max(total, stats["messages"]))
+    finally:
+        conn.close()
+
+
+def vacuum(db_path):
+    """Rebuild the database file so freed pages are returned to the filesystem"""
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--db", help="Database file (default: data/ollama_chat.db)")
+    parser.add_argument("--threshold", type=int, default=DEFAULT_THRESHOLD,
+                        help="Compress bodies of at least this many bytes; 0 decompresses everything")
+    parser.add_argument("--codec", choices=available_codecs(), help="Default: zstd if installed, else zlib")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards to shrink the file")
+    args = parser.parse_args(argv)
+
+    def report(done, total):
+        print(f"\r{done}/{total} messages", end="", file=sys.stderr, flush=True)
+
+    stats = recompress(args.db, args.threshold, args.codec, args.batch_size, progress=report)
+    print(file=sys.stderr)
+    if args.vacuum:
+        vacuum(DatabaseManager(args.db).db_path)
+
+    saved = stats["bytes_before"] - stats["bytes_after"]
+    print(f"{stats['messages']} messages, {stats['rewritten']} rewritten, "
+          f"{stats['compressed']} compressed, {stats['plain']} plain")
+    print(f"Message bytes: {stats['bytes_before']:,} -> {stats['bytes_after']:,} "
+          f"({saved:+,} saved{'' if args.vacuum else '; run with --vacuum to shrink the file'})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""
+Record real /api/chat streams and replay them without a model.
+
+A fixture is a JSONL file: the first line is a header describing the
+request, every following line is one NDJSON line exactly as the server
+sent it plus its offset in seconds from the start of the request:
+
+    {"fixture": 1, "model": "llama3", "messages": [...], "params": {...}}
+    {"t": 0.412, "line": "{\"model\":\"llama3\",\"message\":{...},\"done\":false}"}
+
+Record against a running server:
+
+    python -m tools.session_replay record -m llama3 -p "Write a quicksort in C" -o fixtures/qs.jsonl
+
+Replay through the GUI streaming path (OllamaWorker, MessageWidget):
+
+    python main.py --replay fixtures/qs.jsonl --replay-speed 4
+
+ReplayClient can also be passed as `client=` to OllamaWorker or any other
+code that expects an OllamaClient.
+"""
+import argparse
+import itertools
+import json
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+from api.ollama_client import OllamaError, iter_chunks
+from api.scheduler import Priority
+
+FIXTURE_VERSION = 1
+
+
+def record_session(client, model, messages, path, params=None, priority=Priority.INTERACTIVE):
+    """
+    Run one streamed chat request and save its lines and timing to a fixture
+
+    Returns:
+        count: Number of NDJSON lines recorded
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({
+            "fixture": FIXTURE_VERSION,
+            "model": model,
+            "messages": messages,
+            "params": params or {},
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }, ensure_ascii=False) + "\n")
+
+        count = 0
+        started = time.perf_counter()
+        for line in client.chat_lines(model, messages, params, priority):
+            if not line:
+                continue
+            f.write(json.dumps({
+                "t": round(time.perf_counter() - started, 6),
+                "line": line.decode("utf-8"),
+            }, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def load_fixture(path):
+    """
+    Read a fixture file
+
+    Returns:
+        (header, frames): frames is a list of (offset_seconds, line_bytes)
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        if header.get("fixture") != FIXTURE_VERSION:
+            raise ValueError(f"{path} is not a version {FIXTURE_VERSION} session fixture")
+        frames = []
+        for line in f:
+            if line.strip():
+                frame = json.loads(line)
+                frames.append((frame["t"], frame["line"].encode("utf-8")))
+    return header, frames
+
+
+def synthesize_fixture(path, text, model="synthetic", ttft=0.3, tokens_per_s=40.0):
+    """
+    Write a fixture for a known reply text with a steady token rate
+
+    The text is split roughly the way model tokenizers do (words with their
+    leading space, punctuation and newlines on their own), which is enough
+    to exercise rendering of code blocks, long lines and unicode.
+    """
+    tokens = re.findall(r" ?\w+| ?[^\w\s]|\s", text)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({
+            "fixture": FIXTURE_VERSION,
+            "model": model,
+            "messages": [],
+            "params": {},
+            "synthetic": True,
+        }) + "\n")
+        for i, token in enumerate(tokens):
+            chunk = {"model": model, "message": {"role": "assistant", "content": token}, "done": False}
+            f.write(json.dumps({"t": round(ttft + i / tokens_per_s, 6),
+                                "line": json.dumps(chunk, ensure_ascii=False)}, ensure_ascii=False) + "\n")
+        final = {"model": model, "message": {"role": "assistant", "content": ""}, "done": True,
+                 "done_reason": "stop", "eval_count": len(tokens),
+                 "eval_duration": int(1e9 * len(tokens) / tokens_per_s)}
+        f.write(json.dumps({"t": round(ttft + len(tokens) / tokens_per_s, 6),
+                            "line": json.dumps(final)}) + "\n")
+    return len(tokens)
+
+
+class ReplayClient:
+    """
+    Stand-in for OllamaClient that streams recorded fixtures
+
+    Each chat request replays the next fixture in turn (cycling), whatever
+    the model and messages, at `speed` times the recorded pace; speed 0
+    replays as fast as possible.
+    """
+
+    def __init__(self, fixtures, speed=1.0):
+        self.fixtures = [load_fixture(path) for path in fixtures]
+        if not self.fixtures:
+            raise ValueError("ReplayClient needs at least one fixture")
+        self.speed = speed
+        self._next = itertools.cycle(range(len(self.fixtures)))
+        self._lock = threading.Lock()
+
+    def model_names(self, priority=Priority.INTERACTIVE):
+        return list(dict.fromkeys(header["model"] for header, _ in self.fixtures))
+
+    def list_models(self, priority=Priority.INTERACTIVE):
+        return [{"name": name, "digest": f"replay-{name}"} for name in self.model_names()]
+
+    def model_digest(self, model, priority=Priority.INTERACTIVE):
+        return f"replay-{model}"
+
+    def show(self, model, priority=Priority.INTERACTIVE):
+        return {"details": {"family": "replay"}}
+
+    def embed(self, model, inputs, priority=Priority.BACKGROUND):
+        raise OllamaError("Error: embeddings are not available while replaying fixtures")
+
+    def chat_lines(self, model, messages, params=None, priority=Priority.INTERACTIVE):
+        with self._lock:
+            _, frames = self.fixtures[next(self._next)]
+
+        started = time.perf_counter()
+        for offset, line in frames:
+            if self.speed > 0:
+                wait = offset / self.speed - (time.perf_counter() - started)
+                if wait > 0:
+                    time.sleep(wait)
+            yield line
+
+    def chat_stream(self, model, messages, params=None, priority=Priority.INTERACTIVE):
+        for chunk in iter_chunks(self.chat_lines(model, messages, params, priority)):
+            yield chunk
+            if chunk.get("done", False):
+                break
+
+    def chat(self, model, messages, params=None, priority=Priority.INTERACTIVE):
+        content = []
+        final = {}
+        for chunk in self.chat_stream(model, messages, params, priority):
+            content.append(chunk.get("message", {}).get("content", ""))
+            final = chunk
+        return dict(final, message={"role": "assistant", "content": "".join(content)})
+
+
+def main(argv=None):
+    from config import load_config
+
+    parser = argparse.ArgumentParser(description="Record or inspect /api/chat session fixtures")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    record = sub.add_parser("record", help="Record one streamed reply from a running server")
+    record.add_argument("-m", "--model", required=True)
+    record.add_argument("-p", "--prompt", required=True)
+    record.add_argument("-s", "--system", help="Optional system prompt")
+    record.add_argument("-o", "--output", required=True)
+    record.add_argument("--base-url", default=load_config()["api_settings"]["base_url"])
+
+    show = sub.add_parser("show", help="Print a fixture's reply and timing summary")
+    show.add_argument("fixture")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        from api.ollama_client import OllamaClient
+
+        messages = [{"role": "user", "content": args.prompt}]
+        if args.system:
+            messages.insert(0, {"role": "system", "content": args.system})
+        count = record_session(OllamaClient(args.base_url), args.model, messages, args.output)
+        print(f"Recorded {count} lines to {args.output}")
+    else:
+        header, frames = load_fixture(args.fixture)
+        reply = ReplayClient([args.fixture], speed=0).chat(header["model"], [])
+        print(reply["message"]["content"])
+        duration = frames[-1][0] if frames else 0.0
+        print(f"\n-- {len(frames)} lines over {duration:.2f}s, model {header['model']}, "
+              f"TTFT {frames[0][0] if frames else 0.0:.2f}s --", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""
+Export or import the whole conversation store.
+
+    python -m tools.transfer export backup.jsonl.zst
+    python -m tools.transfer import backup.jsonl.zst --db data/other.db
+
+The format is described in database/transfer.py; .gz and .zst files are
+compressed and decompressed on the fly.
+"""
+import argparse
+import sys
+import time
+
+from database import DatabaseManager
+from database.transfer import export_conversations, import_conversations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("command", choices=("export", "import"))
+    parser.add_argument("path", help="JSONL file (.jsonl, .jsonl.gz or .jsonl.zst)")
+    parser.add_argument("--db", help="Database file (default: data/ollama_chat.db)")
+    parser.add_argument("--compression", choices=("gzip", "zstd"), help="Override the suffix")
+    parser.add_argument("--no-archived", action="store_true", help="Export only conversations not archived")
+    args = parser.parse_args(argv)
+
+    db = DatabaseManager(args.db)
+    started = time.perf_counter()
+    if args.command == "export":
+        def report(done, total):
+            print(f"\r{done}/{total} conversations", end="", file=sys.stderr, flush=True)
+        stats = export_conversations(db, args.path, args.compression,
+                                     include_archived=not args.no_archived, progress=report)
+    else:
+        def report(conversations, messages):
+            print(f"\r{conversations} conversations, {messages} messages", end="", file=sys.stderr, flush=True)
+        stats = import_conversations(db, args.path, args.compression, progress=report)
+    elapsed = time.perf_counter() - started
+
+    print(file=sys.stderr)
+    print(f"{args.command.capitalize()}ed {stats['conversations']} conversations, {stats['messages']} messages "
+          f"in {elapsed:.1f}s ({stats['messages'] / elapsed if elapsed else 0:,.0f} messages/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
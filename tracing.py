@@ -0,0 +1,261 @@
+"""
+Lightweight tracing for the chat request path.
+
+Spans and instant marks are recorded into a bounded in-memory buffer and
+can be exported as Chrome trace JSON (open in chrome://tracing or
+https://ui.perfetto.dev). Each user request gets an id, bound to the
+thread handling it with `tracer.request(id)`, so marks made deep in the
+client layer are attributed without passing the id around.
+
+Milestones on the request path:
+
+    send_clicked -> payload_built -> request_sent -> first_byte -> first_token
+    -> render_flush (span, per token) -> done -> db_save (span) / db_saved
+
+When tracing is disabled `span()` returns a shared no-op object and
+`mark()` returns after one attribute check. This module must stay free of
+Qt imports.
+"""
+import cProfile
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "request_id", "args", "start")
+
+    def __init__(self, tracer, name, request_id, args):
+        self.tracer = tracer
+        self.name = name
+        self.request_id = request_id
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        self.tracer._record("X", self.name, self.start, end - self.start, self.request_id, self.args)
+        return False
+
+
+class Tracer:
+    """Collects trace events and forwards them to listeners"""
+
+    def __init__(self, buffer_size=100_000):
+        self.enabled = False
+        self.events = deque(maxlen=buffer_size)
+        self.listeners = []
+        self.profile_dir = None
+        self._profile_next = False
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+        self._origin = time.perf_counter_ns()
+        self._thread_names = {}
+        self._pid = os.getpid()
+
+    def new_request(self):
+        """Return a fresh request id, or None while tracing is disabled"""
+        return next(self._ids) if self.enabled else None
+
+    @contextmanager
+    def request(self, request_id):
+        """Attribute marks made on this thread to `request_id`"""
+        previous = getattr(self._local, "request_id", None)
+        self._local.request_id = request_id
+        try:
+            yield
+        finally:
+            self._local.request_id = previous
+
+    def current_request(self):
+        return getattr(self._local, "request_id", None)
+
+    def span(self, name, request_id=None, **args):
+        """Context manager timing a block as a complete event"""
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, name, request_id or self.current_request(), args)
+
+    def complete(self, name, start_ns, request_id=None, **args):
+        """Record a span that started at `start_ns` (perf_counter_ns) and ends now"""
+        if not self.enabled:
+            return
+        end = time.perf_counter_ns()
+        self._record("X", name, start_ns, end - start_ns, request_id or self.current_request(), args)
+
+    def mark(self, name, request_id=None, **args):
+        """Record an instant event"""
+        if not self.enabled:
+            return
+        self._record("i", name, time.perf_counter_ns(), 0, request_id or self.current_request(), args)
+
+    def _record(self, phase, name, start_ns, duration_ns, request_id, args):
+        thread = threading.current_thread()
+        self._thread_names.setdefault(thread.ident, thread.name)
+        event = {
+            "name": name,
+            "ph": phase,
+            "ts": (start_ns - self._origin) / 1000,  # microseconds
+            "pid": self._pid,
+            "tid": thread.ident,
+            "args": dict(args, request=request_id) if request_id is not None else args,
+        }
+        if phase == "X":
+            event["dur"] = duration_ns / 1000
+        else:
+            event["s"] = "t"
+        self.events.append(event)
+        for listener in self.listeners:
+            listener(event)
+
+    def add_listener(self, listener):
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def clear(self):
+        self.events.clear()
+
+    def export_chrome(self, path):
+        """
+        Write the buffered events as Chrome trace / Perfetto JSON
+
+        Returns:
+            count: Number of events written
+        """
+        events = list(self.events)
+        metadata = [{"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid,
+                     "args": {"name": name}} for tid, name in self._thread_names.items()]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f)
+        return len(events)
+
+    def profile_next_request(self, enabled=True):
+        """Run the next request's worker thread under cProfile"""
+        self._profile_next = enabled
+
+    def take_profiler(self):
+        """Return a cProfile.Profile if the next request should be profiled"""
+        if not self._profile_next:
+            return None
+        self._profile_next = False
+        return cProfile.Profile()
+
+    def save_profile(self, profiler, request_id=None):
+        """
+        Dump a finished profile next to the other app data
+
+        Returns:
+            path: The .prof file, loadable with pstats or snakeviz
+        """
+        directory = Path(self.profile_dir or Path.cwd() / "data" / "profiles")
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"request-{request_id or 0}-{time.strftime('%Y%m%d-%H%M%S')}.prof"
+        profiler.dump_stats(path)
+        self.mark("profile_saved", request_id, path=str(path))
+        return path
+
+
+class LatencySummary:
+    """
+    Tracer listener that turns one request's events into a latency summary
+
+    `callback(summary)` is invoked on "done" and again on "db_saved", from
+    whichever thread recorded the event.
+    """
+
+    def __init__(self, callback, max_requests=16):
+        self.callback = callback
+        self.max_requests = max_requests
+        self.requests = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        request_id = event["args"].get("request")
+        if request_id is None:
+            return
+
+        with self._lock:
+            state = self.requests.get(request_id)
+            if state is None:
+                if len(self.requests) >= self.max_requests:
+                    self.requests.pop(next(iter(self.requests)))
+                state = self.requests[request_id] = {"marks": {}, "renders": []}
+
+            if event["name"] == "render_flush":
+                state["renders"].append(event["dur"])
+            elif event["name"] == "db_save":
+                state["save_ms"] = event["dur"] / 1000
+            elif event["ph"] == "i":
+                state["marks"].setdefault(event["name"], event["ts"])
+
+            if event["name"] not in ("done", "db_saved"):
+                return
+            summary = self.summarize(request_id, state)
+        self.callback(summary)
+
+    @staticmethod
+    def summarize(request_id, state):
+        marks = state["marks"]
+        start = marks.get("send_clicked")
+
+        def since_start(name):
+            if start is None or name not in marks:
+                return None
+            return (marks[name] - start) / 1000
+
+        renders = state["renders"]
+        generation_s = None
+        if "first_token" in marks and "done" in marks:
+            generation_s = (marks["done"] - marks["first_token"]) / 1e6
+        return {
+            "request": request_id,
+            "payload_ms": since_start("payload_built"),
+            "first_byte_ms": since_start("first_byte"),
+            "ttft_ms": since_start("first_token"),
+            "total_ms": since_start("done"),
+            "tokens": len(renders),
+            "tokens_per_s": len(renders) / generation_s if generation_s else None,
+            "render_avg_ms": sum(renders) / len(renders) / 1000 if renders else None,
+            "render_max_ms": max(renders) / 1000 if renders else None,
+            "save_ms": state.get("save_ms"),
+        }
+
+
+_default_tracer = Tracer()
+
+
+def get_tracer():
+    """Return the process-wide tracer"""
+    return _default_tracer
+
+
+def configure_tracer(**kwargs):
+    """Replace the process-wide tracer, e.g. with the buffer size from config"""
+    global _default_tracer
+    _default_tracer = Tracer(**kwargs)
+    return _default_tracer
@@ -0,0 +1,50 @@
+class AutoSavePolicy:
+    """
+    Decides when the open conversation needs saving and how often to check.
+
+    A conversation (database.models.Conversation, which counts its own
+    mutations) is dirty when it is a different object, or has a different
+    version, than the one last handed to the database. The check
+    interval drops to `min_interval` while the session is active and backs
+    off by `backoff` per idle check up to `max_interval`.
+    """
+
+    def __init__(self, min_interval=10.0, max_interval=300.0, backoff=2.0):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval
+        self._saved = None  # (id(conversation), version) of the last save
+        self.stats = {"checks": 0, "saves": 0, "writes_avoided": 0}
+
+    def is_dirty(self, conversation):
+        return (id(conversation), conversation.version) != self._saved
+
+    def mark_saved(self, conversation, version=None):
+        """Record that `conversation` (at `version`) is persisted or needs no save"""
+        self._saved = (id(conversation), conversation.version if version is None else version)
+
+    def mark_unsaved(self):
+        """Forget the last save, e.g. after the write failed"""
+        self._saved = None
+
+    def should_save(self, conversation):
+        """Count a periodic or event-driven check and say whether to write"""
+        self.stats["checks"] += 1
+        if self.is_dirty(conversation):
+            self.stats["saves"] += 1
+            return True
+        self.stats["writes_avoided"] += 1
+        return False
+
+    def activity(self):
+        """The user did something; check again soon"""
+        self.interval = self.min_interval
+
+    def next_interval(self, dirty):
+        """Seconds until the next check"""
+        if dirty:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+        return self.interval
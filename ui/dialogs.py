@@ -6,7 +6,7 @@ from PyQt6.QtCore import Qt
 from datetime import datetime
 class ModelParamsDialog(QDialog):
     """Dialog for adjusting model parameters like temperature, top_p, etc."""
-    def __init__(self, params=None, parent=None):
+    def __init__(self, params=None, parent=None, cache_settings=None, cache_stats=None):
         super().__init__(parent)
         self.setWindowTitle("Model Parameters")
         self.setMinimumWidth(400)
@@ -19,6 +19,10 @@ class ModelParamsDialog(QDialog):
             "max_tokens": 2048
         }
         
+        # Response cache settings (opt-in)
+        self.cache_settings = cache_settings or {"response_cache": False, "max_size_mb": 64}
+        self.cache_stats = cache_stats
+        
         self.init_ui()
         
     def init_ui(self):
@@ -88,6 +92,21 @@ class ModelParamsDialog(QDialog):
         layout.addWidget(QLabel("Maximum number of tokens to generate."))
         layout.addSpacing(10)
         
+        # Response cache toggle
+        self.cache_check = QCheckBox("Replay identical requests from the response cache")
+        self.cache_check.setChecked(self.cache_settings.get("response_cache", False))
+        layout.addWidget(self.cache_check)
+        self.semantic_cache_check = QCheckBox("Offer cached answers to similar questions")
+        self.semantic_cache_check.setChecked(self.cache_settings.get("semantic_cache", False))
+        layout.addWidget(self.semantic_cache_check)
+        if self.cache_stats:
+            layout.addWidget(QLabel(
+                f"Cache: {self.cache_stats['hits']} hits, {self.cache_stats['misses']} misses, "
+                f"{self.cache_stats['entries']} entries "
+                f"({self.cache_stats['size_bytes'] / (1024 * 1024):.1f} MB)"
+            ))
+        layout.addSpacing(10)
+        
         # Buttons
         button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
         button_box.accepted.connect(self.accept)
@@ -114,6 +133,11 @@ class ModelParamsDialog(QDialog):
         
     def get_params(self):
         return self.params
+        
+    def get_cache_settings(self):
+        self.cache_settings["response_cache"] = self.cache_check.isChecked()
+        self.cache_settings["semantic_cache"] = self.semantic_cache_check.isChecked()
+        return self.cache_settings
 
 
 class ConversationSettingsDialog(QDialog):
@@ -192,10 +216,13 @@ class ConversationSettingsDialog(QDialog):
 
 class ConversationHistoryDialog(QDialog):
     """Dialog for browsing conversation history"""
-    def __init__(self, conversations, parent=None):
+    def __init__(self, conversations, parent=None, semantic_search=None):
         super().__init__(parent)
         self.conversations = conversations
         self.selected_conversation_id = None
+        self.selected_message_id = None
+        # Callable taking a query and returning matching messages, if available
+        self.semantic_search = semantic_search
         self.init_ui()
         
     def init_ui(self):
@@ -211,7 +238,14 @@ class ConversationHistoryDialog(QDialog):
         self.search_field = QLineEdit()
         self.search_field.setPlaceholderText("Search conversations...")
         self.search_field.textChanged.connect(self.filter_conversations)
+        self.search_field.returnPressed.connect(self.run_semantic_search)
         search_layout.addWidget(self.search_field)
+        
+        # Semantic search over message contents (press Enter to search)
+        self.semantic_check = QCheckBox("Search message meaning")
+        self.semantic_check.setEnabled(self.semantic_search is not None)
+        self.semantic_check.toggled.connect(self.toggle_semantic_mode)
+        search_layout.addWidget(self.semantic_check)
         layout.addLayout(search_layout)
         
         # Conversation list
@@ -242,8 +276,49 @@ class ConversationHistoryDialog(QDialog):
             item.setData(Qt.ItemDataRole.UserRole, conv['id'])
             self.list_widget.addItem(item)
     
+    def toggle_semantic_mode(self, enabled):
+        """Switch between title filtering and semantic message search"""
+        if enabled:
+            self.search_field.setPlaceholderText("Describe what you are looking for and press Enter...")
+            self.run_semantic_search()
+        else:
+            self.search_field.setPlaceholderText("Search conversations...")
+            self.populate_list()
+            self.filter_conversations(self.search_field.text())
+    
+    def run_semantic_search(self):
+        """Run an embedding search and list the best matching messages"""
+        query = self.search_field.text().strip()
+        if not self.semantic_check.isChecked() or not query:
+            return
+            
+        try:
+            results = self.semantic_search(query)
+        except Exception as e:
+            self.list_widget.clear()
+            self.list_widget.addItem(QListWidgetItem(f"Semantic search unavailable: {str(e)}"))
+            return
+            
+        self.list_widget.clear()
+        for result in results:
+            snippet = " ".join(result['content'].split())
+            if len(snippet) > 120:
+                snippet = snippet[:120] + "..."
+            text = f"{result['title']} [{result['score']:.2f}]\n    {result['role']}: {snippet}"
+            
+            item = QListWidgetItem(text)
+            item.setToolTip(result['content'][:1000])
+            item.setData(Qt.ItemDataRole.UserRole, result['conversation_id'])
+            item.setData(Qt.ItemDataRole.UserRole + 1, result['id'])
+            self.list_widget.addItem(item)
+        
+        if not results:
+            self.list_widget.addItem(QListWidgetItem("No matching messages (indexing may still be running)"))
+    
     def filter_conversations(self, text):
         """Filter conversations by search text"""
+        if self.semantic_check.isChecked():
+            return  # Semantic results are refreshed on Enter
         for i in range(self.list_widget.count()):
             item = self.list_widget.item(i)
             if text.lower() in item.text().lower():
@@ -254,6 +329,7 @@ class ConversationHistoryDialog(QDialog):
     def accept_selection(self):
         """Accept the selected conversation"""
         current_item = self.list_widget.currentItem()
-        if current_item:
+        if current_item and current_item.data(Qt.ItemDataRole.UserRole) is not None:
             self.selected_conversation_id = current_item.data(Qt.ItemDataRole.UserRole)
+            self.selected_message_id = current_item.data(Qt.ItemDataRole.UserRole + 1)
             self.accept()
\ No newline at end of file
@@ -0,0 +1,37 @@
+from PyQt6.QtWidgets import QLabel
+from PyQt6.QtCore import pyqtSignal
+
+from tracing import LatencySummary
+
+
+class LatencyOverlay(QLabel):
+    """Status bar readout of the last request's latency breakdown"""
+    summary_ready = pyqtSignal(dict)  # Crosses from worker threads to the GUI thread
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setStyleSheet("color: #F6AD55; font-family: monospace; padding: 0 6px;")
+        self.listener = LatencySummary(self.summary_ready.emit)
+        self.summary_ready.connect(self.show_summary)
+        self.setText("latency: waiting for a traced request")
+
+    def show_summary(self, summary):
+        def ms(value):
+            return "-" if value is None else f"{value:.0f} ms"
+
+        parts = [f"#{summary['request']}", f"TTFT {ms(summary['ttft_ms'])}",
+                 f"total {ms(summary['total_ms'])}"]
+        if summary["tokens_per_s"]:
+            parts.append(f"{summary['tokens_per_s']:.0f} tok/s")
+        if summary["render_avg_ms"] is not None:
+            parts.append(f"render {summary['render_avg_ms']:.2f}/{summary['render_max_ms']:.1f} ms")
+        if summary["save_ms"] is not None:
+            parts.append(f"save {summary['save_ms']:.1f} ms")
+        self.setText("  ".join(parts))
+        self.setToolTip(
+            f"payload built {ms(summary['payload_ms'])}\n"
+            f"first byte {ms(summary['first_byte_ms'])}\n"
+            f"first token {ms(summary['ttft_ms'])}\n"
+            f"done {ms(summary['total_ms'])}\n"
+            f"{summary['tokens']} render flushes"
+        )
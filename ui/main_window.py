@@ -1,55 +1,181 @@
 import sys
 import json
+import logging
+import time
 import base64
-import requests
 from datetime import datetime
 from pathlib import Path
-from database import DatabaseManager
+from database import (DatabaseManager, DatabaseWriter, ConversationHandle, ResponseCache, StreamJournal,
+                      Conversation, Message)
+from database.response_cache import is_deterministic
+from database.semantic_cache import SemanticCache
+from database.vector_store import MappedVectorIndex
+from database.document_store import DocumentStore
+from database.maintenance import DatabaseMaintenance
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                             QTextEdit, QPushButton, QSplitter, QComboBox, 
                             QLabel, QFileDialog, QScrollArea, QCheckBox,
                             QStatusBar, QProgressBar, QMenu, QMenuBar,
                             QToolBar, QDialog, QFrame, QSizePolicy, QMessageBox,QApplication)
-from PyQt6.QtCore import Qt, QSize, QTimer
+from PyQt6.QtCore import Qt, QSize, QTimer, QEvent, pyqtSignal
 from PyQt6.QtGui import QPixmap, QIcon, QFont, QAction
 from PyQt6.QtCore import QPropertyAnimation, QRect
 # Import our modules
 from ui.message_widget import MessageWidget
+from ui.widget_pool import WidgetPool
 # In main_window.py
 from ui.dialogs import ModelParamsDialog, ConversationSettingsDialog, ConversationHistoryDialog
 from ui.theme import apply_theme
+from ui.latency_overlay import LatencyOverlay
+from ui.autosave import AutoSavePolicy
 from api.ollama_worker import OllamaWorker
+from api.ollama_client import DEFAULT_TIMEOUT, OllamaClient
+from api.model_list_worker import ModelListWorker
+from api.scheduler import configure_scheduler
+from api.history_indexer import HistoryIndexer
+from api.document_ingest import DocumentIngestor, retrieval_context
+from api.document_worker import DocumentIngestWorker
+from api.migration_worker import MigrationWorker
+from api.archive_worker import ArchiveWorker
+from api.maintenance_worker import MaintenanceWorker
+from api.transfer_worker import TransferWorker
 from config import load_config, save_config
+from tracing import configure_tracer
+
+logger = logging.getLogger(__name__)
 
 class OllamaChatUI(QMainWindow):
     """Main window for Ollama Chat UI application"""
-    def __init__(self):
+    # Emitted from the database writer thread; delivered on the GUI thread
+    conversation_saved = pyqtSignal(int)
+    save_failed = pyqtSignal(str)
+    
+    def __init__(self, client=None):
         super().__init__()
         # Load configuration
         config = load_config()
         
         # Initialize state
-        self.conversation = []
+        self.conversation = Conversation()
+        # Index in self.conversation where a regenerated or edited branch starts,
+        # until the save that gives its first message an id
+        self.branch_start = None
         self.current_image = None
         self.model_params = config["model_params"]
         self.conversation_settings = config["conversation_settings"]
         self.ui_settings = config["ui_settings"]
         self.api_settings = config["api_settings"]
+        self.cache_settings = config["cache_settings"]
+        self.search_settings = config["search_settings"]
+        self.rag_settings = config["rag_settings"]
+        self.trace_settings = config["trace_settings"]
         self.current_conversation_id = None
         
-        # Initialize database
-        self.db = DatabaseManager()
+        # Initialize database; writes happen on a background writer thread.
+        # Schema upgrades are applied now, slow data backfills after the UI is up
+        self.db = DatabaseManager(
+            background_migrations=True,
+            compress_threshold=self.conversation_settings.get("compress_threshold", 4096)
+        )
+        self.migration_worker = None
+        self.archive_worker = None
+        self.db_writer = DatabaseWriter(self.db)
+        self.db_writer.start()
+        self.conversation_saved.connect(self.handle_conversation_saved)
+        self.save_failed.connect(self.handle_save_failed)
+        
+        # Streamed tokens are journaled until the reply is committed, so a crash loses nothing
+        self.journal = None
+        if self.conversation_settings.get("stream_journal", True):
+            self.journal = StreamJournal(
+                Path(self.db.db_path).parent / "stream_journal.jsonl",
+                fsync_interval=self.conversation_settings.get("journal_fsync_interval", 1.0)
+            )
+        self.journal_stream = None
+        self.pending_journal_streams = []
+        self.response_cache = ResponseCache(
+            self.db.db_path,
+            max_bytes=self.cache_settings.get("max_size_mb", 64) * 1024 * 1024
+        )
+        self.semantic_cache = SemanticCache(
+            self.db.db_path,
+            threshold=self.cache_settings.get("semantic_threshold", 0.95),
+            approximate=self.cache_settings.get("semantic_approximate", False),
+            max_entries=self.cache_settings.get("semantic_max_entries", 10000)
+        )
         
-        # Setup auto-save timer
+        # Every outbound model request goes through one shared scheduler
+        configure_scheduler(
+            per_model_limit=self.api_settings.get("per_model_parallel", 1),
+            max_total=self.api_settings.get("max_parallel_requests", 4)
+        )
+        # A ReplayClient can be passed in to stream recorded sessions instead
+        self.ollama_client = client or OllamaClient(self.api_settings["base_url"],
+                                                    timeout=self.api_settings.get("timeout", DEFAULT_TIMEOUT))
+        
+        # Embed saved messages in the background for semantic history search
+        self.history_indexer = None
+        if self.search_settings.get("semantic_history", False):
+            self.history_indexer = HistoryIndexer(
+                self.db,
+                MappedVectorIndex(Path(self.db.db_path).parent / "history_index",
+                                  dtype=self.search_settings.get("index_dtype", "float32")),
+                self.ollama_client,
+                self.search_settings.get("embedding_model", "nomic-embed-text")
+            )
+            self.history_indexer.start()
+        
+        # Documents attached to conversations for retrieval
+        self.document_store = DocumentStore(self.db.db_path, Path(self.db.db_path).parent / "document_index")
+        self.document_ingestor = DocumentIngestor(
+            self.document_store,
+            self.ollama_client,
+            self.rag_settings.get("embedding_model", "nomic-embed-text"),
+            chunk_bytes=self.rag_settings.get("chunk_bytes", 2048),
+            overlap_bytes=self.rag_settings.get("overlap_bytes", 256),
+            batch_size=self.rag_settings.get("batch_size", 32),
+            concurrency=self.rag_settings.get("embed_concurrency", 2)
+        )
+        self.ingest_worker = None
+        
+        # Request-path tracing (a no-op until enabled from the Debug menu)
+        self.tracer = configure_tracer(buffer_size=self.trace_settings.get("buffer_size", 100_000))
+        self.tracer.enabled = self.trace_settings.get("tracing", False)
+        self.tracer.profile_dir = Path(self.db.db_path).parent / "profiles"
+        self.trace_id = None
+        
+        # Auto-save only writes when the conversation changed; the check
+        # interval shortens while the session is busy and backs off when idle
+        self.autosave = AutoSavePolicy(
+            min_interval=self.conversation_settings.get("auto_save_min_interval", 10),
+            max_interval=self.conversation_settings.get("auto_save_max_interval", 300)
+        )
         self.auto_save_timer = QTimer(self)
+        self.auto_save_timer.setSingleShot(True)
         self.auto_save_timer.timeout.connect(self.auto_save_conversation)
-        
-        # Start auto-save timer (60000 ms = 1 minute)
-        self.auto_save_interval = 60000  # 1 minute in milliseconds
-        self.auto_save_timer.start(self.auto_save_interval)
+        self.auto_save_timer.start(int(self.autosave.min_interval * 1000))
+        
+        # Database maintenance runs only while nothing is streaming and the
+        # user has been idle; any input interrupts it
+        self.worker = None
+        self.maintenance = DatabaseMaintenance(self.db.db_path, archive=self.db.archive)
+        self.maintenance_worker = None
+        self.transfer_worker = None
+        self.maintenance_idle_seconds = self.conversation_settings.get("maintenance_idle_seconds", 120)
+        self.last_input_time = time.monotonic()
+        self.maintenance_timer = QTimer(self)
+        self.maintenance_timer.timeout.connect(self.maybe_run_maintenance)
+        if self.maintenance_idle_seconds:
+            self.maintenance_timer.start(30 * 1000)
         
         # Initialize UI
         self.init_ui()
+        # Only the widgets the user types and scrolls in are watched for input,
+        # not every event of the application
+        for widget in (self.input_field, self.input_field.viewport(), self.chat_scroll_area.viewport()):
+            widget.installEventFilter(self)
+        self.recover_interrupted_responses()
+        self.start_migrations()
         
     def init_ui(self):
         """Initialize the user interface"""
@@ -100,19 +226,54 @@ class OllamaChatUI(QMainWindow):
         self.add_message("Hello! I'm your Ollama-powered assistant. How can I help you today?", is_user=False)
         
         # Initialize by fetching models
+        self.model_list_worker = None
         self.refresh_models()
         
     # In main_window.py, update the create_menu_bar method
     def auto_save_conversation(self):
-        """Automatically save the current conversation"""
+        """Save the current conversation if it changed since the last save"""
         # Only auto-save if we have messages and auto-save is enabled in settings
         if self.conversation and self.conversation_settings.get("auto_save", True):
-            # Use the existing save method
-            self.save_current_conversation()
-            
-            # Don't show a status message for auto-save to avoid disrupting the user
-            # But we could log it if needed
-            print(f"Auto-saved conversation at {datetime.now().strftime('%H:%M:%S')}")
+            if self.autosave.should_save(self.conversation):
+                self.save_current_conversation()
+                
+                # Don't show a status message for auto-save to avoid disrupting the user
+                logger.info("Auto-saved conversation %s", self.current_conversation_id)
+        
+        dirty = self.autosave.is_dirty(self.conversation)
+        self.auto_save_timer.start(int(self.autosave.next_interval(dirty) * 1000))
+    
+    def eventFilter(self, obj, event):
+        """Track user input so maintenance only runs while the user is away"""
+        if event.type() in (QEvent.Type.KeyPress, QEvent.Type.MouseButtonPress, QEvent.Type.Wheel):
+            self.last_input_time = time.monotonic()
+            self.interrupt_maintenance()
+        return super().eventFilter(obj, event)
+    
+    def interrupt_maintenance(self):
+        """Stop maintenance so it never holds a lock a user action needs"""
+        if self.maintenance_worker and self.maintenance_worker.isRunning():
+            self.maintenance.interrupt()
+    
+    def maybe_run_maintenance(self):
+        """Start database maintenance if the app is idle"""
+        if time.monotonic() - self.last_input_time < self.maintenance_idle_seconds:
+            return
+        busy = [self.worker, self.maintenance_worker, self.ingest_worker,
+                self.migration_worker, self.archive_worker, self.transfer_worker]
+        if any(worker and worker.isRunning() for worker in busy):
+            return
+        
+        self.maintenance_worker = MaintenanceWorker(self.maintenance)
+        self.maintenance_worker.error_occurred.connect(logger.warning)
+        self.maintenance_worker.start()
+    
+    def note_activity(self):
+        """Bring the next auto-save check forward while the user is active"""
+        self.autosave.activity()
+        if self.auto_save_timer.remainingTime() > self.autosave.min_interval * 1000:
+            self.auto_save_timer.start(int(self.autosave.min_interval * 1000))
+    
     def create_menu_bar(self):
         """Create the application menu bar"""
         menu_bar = self.menuBar()
@@ -133,6 +294,10 @@ class OllamaChatUI(QMainWindow):
         history_action.triggered.connect(self.show_conversation_history)
         file_menu.addAction(history_action)
         
+        attach_action = QAction("Attach Document...", self)
+        attach_action.triggered.connect(self.attach_document)
+        file_menu.addAction(attach_action)
+        
         save_chat_action = QAction("Save Chat", self)
         save_chat_action.setShortcut("Ctrl+S")
         save_chat_action.triggered.connect(self.save_current_conversation)
@@ -140,11 +305,50 @@ class OllamaChatUI(QMainWindow):
         
         file_menu.addSeparator()
         
+        export_all_action = QAction("Export All Conversations...", self)
+        export_all_action.triggered.connect(self.export_all_conversations)
+        file_menu.addAction(export_all_action)
+        
+        import_action = QAction("Import Conversations...", self)
+        import_action.triggered.connect(self.import_conversations)
+        file_menu.addAction(import_action)
+        
+        file_menu.addSeparator()
+        
         exit_action = QAction("Exit", self)
         exit_action.setShortcut("Ctrl+Q")
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
         
+        # Debug menu
+        debug_menu = menu_bar.addMenu("&Debug")
+        
+        tracing_action = QAction("Enable Tracing", self)
+        tracing_action.setCheckable(True)
+        tracing_action.setChecked(self.tracer.enabled)
+        tracing_action.toggled.connect(self.toggle_tracing)
+        debug_menu.addAction(tracing_action)
+        
+        overlay_action = QAction("Show Latency Overlay", self)
+        overlay_action.setCheckable(True)
+        overlay_action.setChecked(self.trace_settings.get("latency_overlay", False))
+        overlay_action.toggled.connect(self.toggle_latency_overlay)
+        debug_menu.addAction(overlay_action)
+        
+        profile_action = QAction("Profile Next Request", self)
+        profile_action.triggered.connect(self.profile_next_request)
+        debug_menu.addAction(profile_action)
+        
+        debug_menu.addSeparator()
+        
+        autosave_stats_action = QAction("Auto-save Statistics", self)
+        autosave_stats_action.triggered.connect(self.show_autosave_stats)
+        debug_menu.addAction(autosave_stats_action)
+        
+        export_trace_action = QAction("Export Trace...", self)
+        export_trace_action.triggered.connect(self.export_trace)
+        debug_menu.addAction(export_trace_action)
+        
     # Rest of the method remains the same...
         
     def create_toolbar(self):
@@ -267,9 +471,27 @@ class OllamaChatUI(QMainWindow):
         scroll_area = QScrollArea()
         scroll_area.setWidgetResizable(True)
         scroll_area.setWidget(self.chat_container)
+        self.chat_scroll_area = scroll_area
+        
+        # Message widgets are recycled across chat switches instead of rebuilt
+        self.widget_pool = WidgetPool(self.create_message_widget,
+                                      capacity=self.ui_settings.get("message_widget_pool", 1000))
         
         return scroll_area
     
+    def create_message_widget(self):
+        """A new MessageWidget, connected once for every message it will show"""
+        widget = MessageWidget(parent=self.chat_container)
+        widget.regenerate_btn.clicked.connect(lambda: self.regenerate_message(widget))
+        widget.edit_btn.clicked.connect(lambda: self.edit_message(widget))
+        widget.branch_requested.connect(lambda step: self.switch_branch(widget, step))
+        return widget
+    
+    def remove_message_widget(self, widget):
+        """Take a message widget out of the chat and return it to the pool"""
+        self.chat_layout.removeWidget(widget)
+        self.widget_pool.release(widget)
+    
     def create_input_area(self):
         """Create the text input area with enhanced styling"""
         input_widget = QWidget()
@@ -390,51 +612,150 @@ class OllamaChatUI(QMainWindow):
         
         return input_widget
 
-    def save_current_conversation(self):
+    @property
+    def current_conversation_id(self):
+        """Id of the open conversation; None until its first save is committed"""
+        return self.conversation_handle.id
+    
+    @current_conversation_id.setter
+    def current_conversation_id(self, conversation_id):
+        # A fresh handle, so saves still queued for the previous conversation stay with it
+        self.conversation_handle = ConversationHandle(conversation_id)
     
+    def save_current_conversation(self, wait=False):
+        """
+        Queue the conversation for saving on the database writer thread
+        
+        Repeated saves of the same conversation made before the writer gets
+        to them are merged into one. Pass wait=True to block until committed.
+        
+        Returns:
+            future: Resolves to the conversation id (None if nothing to save)
+        """
         if not self.conversation:
             self.status_message.setText("Nothing to save")
-            return
-        
-        # Check if we have a current conversation ID
-        if hasattr(self, 'current_conversation_id') and self.current_conversation_id:
-            # Update existing conversation
-            success = self.db.update_conversation(
-                conversation_id=self.current_conversation_id,
-                messages=self.conversation
-            )
-            
-            if success:
-                self.status_message.setText(f"Conversation updated (ID: {self.current_conversation_id})")
-                return self.current_conversation_id
-            # If update fails, fall through to creating a new one
+            return None
+        self.interrupt_maintenance()
         
         # Generate a title from the first user message
         title = "New Conversation"
         for msg in self.conversation:
-            if msg["role"] == "user":
+            if msg.role == "user":
                 # Use the first 30 chars of the first user message as title
-                title = msg["content"][:30] + "..." if len(msg["content"]) > 30 else msg["content"]
+                title = msg.text[:30] + "..." if len(msg.text) > 30 else msg.text
                 break
         
         # Get the current model
         model = self.model_selector.currentText()
         
-        # Save as a new conversation
-        conversation_id = self.db.save_conversation(
+        self.autosave.mark_saved(self.conversation)
+        future = self.db_writer.save_conversation(
+            self.conversation_handle,
             title=title,
             model=model,
             messages=self.conversation,
             system_prompt=self.conversation_settings["system_prompt"]
         )
         
-        # Store the ID for future updates
-        self.current_conversation_id = conversation_id
-        
+        trace_id = self.trace_id
+        message_count = len(self.conversation)
+        journal_streams, self.pending_journal_streams = self.pending_journal_streams, []
+        queued_at = time.perf_counter_ns()
+        
+        def committed(future):
+            # Runs on the writer thread
+            if future.exception() is not None:
+                # Still journaled; the next save that commits finishes them
+                self.pending_journal_streams.extend(journal_streams)
+                self.save_failed.emit(str(future.exception()))
+                return
+            self.tracer.complete("db_save", queued_at, trace_id, messages=message_count)
+            self.tracer.mark("db_saved", trace_id)
+            for stream_id in journal_streams:
+                self.journal.finish(stream_id)
+            if self.history_indexer:
+                self.history_indexer.notify()
+            self.conversation_saved.emit(future.result())
+        
+        future.add_done_callback(committed)
+        if wait:
+            future.result()
+        return future
+    
+    def handle_conversation_saved(self, conversation_id):
+        """Report a committed save"""
         self.status_message.setText(f"Conversation saved (ID: {conversation_id})")
-        return conversation_id
+        
+        # A new branch is stored once its first message has an id; show its siblings
+        start = self.branch_start
+        if start is not None and start < len(self.conversation) and self.conversation[start].id is not None:
+            self.branch_start = None
+            message = self.conversation[start]
+            sibling_ids = self.db.get_sibling_ids(message.id)
+            widget = self.message_widget(message)
+            if widget is not None and message.id in sibling_ids:
+                widget.set_branch(sibling_ids.index(message.id), len(sibling_ids))
+    
+    def flush_conversation(self):
+        """Save the open conversation if needed and wait until every queued save is committed"""
+        if self.autosave.is_dirty(self.conversation) and len(self.conversation) > 1:
+            self.save_current_conversation(wait=True)
+        self.db_writer.flush()
+    
+    def handle_save_failed(self, error):
+        """Report a save the writer could not commit"""
+        logger.error("Saving conversation failed: %s", error)
+        self.autosave.mark_unsaved()
+        self.status_message.setText(f"Error saving conversation: {error}")
 
-    def load_conversation(self, conversation_id):
+    def begin_journal_stream(self, model, prompt):
+        """Open a journal entry for the reply about to be streamed"""
+        if self.journal is None:
+            return
+        if self.journal_stream is not None:
+            # The previous reply never completed
+            self.journal.discard(self.journal_stream)
+        self.journal_stream = self.journal.begin(
+            self.current_conversation_id, model, prompt, self.conversation[:-1]
+        )
+    
+    def recover_interrupted_responses(self):
+        """Save replies that were still streaming when the app last exited"""
+        if self.journal is None:
+            return
+        
+        recovered = []
+        for stream in self.journal.recover():
+            reply = Message("assistant", stream["text"] + "\n\n[response interrupted]")
+            prompt = Message("user", stream["prompt"])
+            
+            conversation = None
+            if stream.get("conversation_id") is not None:
+                conversation = self.db.get_conversation(stream["conversation_id"])
+            
+            if conversation:
+                messages = conversation["messages"]
+                # The prompt may or may not have been saved before the crash
+                if not messages or (messages[-1].role, messages[-1].content) != (prompt.role, prompt.content):
+                    messages.append(prompt)
+                self.db.update_conversation(conversation["id"], messages=messages + [reply])
+                recovered.append(conversation["id"])
+            else:
+                text = stream["prompt"]
+                title = text[:30] + "..." if len(text) > 30 else text
+                recovered.append(self.db.save_conversation(
+                    title=title,
+                    model=stream.get("model", ""),
+                    messages=stream.get("messages", []) + [prompt, reply]
+                ))
+        self.journal.compact()
+        
+        if recovered:
+            logger.warning("Recovered %d interrupted responses", len(recovered))
+            self.load_conversation(recovered[-1])
+            self.status_message.setText(f"Recovered {len(recovered)} interrupted response(s)")
+    
+    def load_conversation(self, conversation_id, highlight_message_id=None):
         """Load a conversation from the database"""
         conversation = self.db.get_conversation(conversation_id)
         
@@ -449,36 +770,131 @@ class OllamaChatUI(QMainWindow):
         self.current_conversation_id = conversation_id
         
         # Load the conversation data
-        self.conversation = []  # Reset to make sure we're clean
+        self.conversation = Conversation()  # Reset to make sure we're clean
         
         # Update the UI with messages
+        highlighted_widget = None
         for msg in conversation["messages"]:
-            is_user = msg["role"] == "user"
-            content = msg["content"]
+            logger.debug("Loading %s message %s", msg.role, msg.id)
             
-            # Debug output
-            print(f"Loading message: {is_user}, {content[:30]}...")
+            widget = self.add_stored_message(msg)
             
-            # Skip empty messages
-            if not content:
-                continue
-                
-            # Handle messages with images
-            if isinstance(content, dict) and "image_path" in content:
-                text_content = content.get("text", "")
-                if text_content:  # Only add if there's text
-                    self.add_message(text_content, is_user=is_user)
-                    # Add to conversation properly too
-                    self.conversation.append({"role": msg["role"], "content": content})
-            else:
-                self.add_message(content, is_user=is_user)
-                # Add to conversation
-                self.conversation.append({"role": msg["role"], "content": content})
+            if highlight_message_id is not None and msg.id == highlight_message_id:
+                highlighted_widget = widget
+        
+        # Freshly loaded from the database, so nothing to save yet
+        self.autosave.mark_saved(self.conversation)
+        
+        # Resume indexing documents that were interrupted last time
+        pending_documents = self.document_store.incomplete_documents(conversation_id)
+        if pending_documents:
+            self.start_ingestion([document['id'] for document in pending_documents])
+        
+        # Point out the message a search matched
+        if highlighted_widget is not None:
+            highlighted_widget.set_highlighted(True)
+            QTimer.singleShot(150, lambda: self.scroll_to_widget(highlighted_widget))
         
         # Update status
         self.status_message.setText(f"Loaded conversation: {conversation['title']}")
         return True
 
+    def add_stored_message(self, msg):
+        """Show a Message from the database and append it to the conversation"""
+        if not msg.text:  # Skip empty messages
+            return None
+        widget = self.add_message(msg.text, is_user=msg.role == "user", message=msg)
+        widget.set_branch(msg.sibling_index, msg.sibling_count)
+        self.conversation.append(msg)
+        return widget
+    
+    def message_widgets(self):
+        """The MessageWidgets in the chat, top to bottom"""
+        for i in range(self.chat_layout.count()):
+            widget = self.chat_layout.itemAt(i).widget()
+            if isinstance(widget, MessageWidget):
+                yield widget
+    
+    def message_widget(self, message):
+        """The widget showing a conversation entry, or None"""
+        return next((widget for widget in self.message_widgets() if widget.message is message), None)
+    
+    def conversation_index(self, widget):
+        """Position in self.conversation of the entry a widget shows, or None"""
+        return next((i for i, msg in enumerate(self.conversation) if msg is widget.message), None)
+    
+    def truncate_conversation(self, widget):
+        """
+        Remove a message and everything after it from the chat
+        
+        The stored conversation keeps them: the next save starts a new
+        branch at that point.
+        
+        Returns:
+            index: Position the message had in self.conversation, or None
+                if the widget does not show a conversation entry
+        """
+        index = self.conversation_index(widget)
+        if index is None:
+            return None
+        
+        # Whatever was there is committed first so it survives as the other branch
+        self.flush_conversation()
+        
+        widgets = list(self.message_widgets())
+        for stale in widgets[widgets.index(widget):]:
+            self.remove_message_widget(stale)
+        del self.conversation[index:]
+        self.branch_start = index
+        return index
+    
+    def generation_running(self):
+        """Whether a reply is being generated; the transcript must not change meanwhile"""
+        return self.worker is not None and self.worker.isRunning()
+    
+    def edit_message(self, message_widget):
+        """Put a user message back in the input box; sending it starts a new branch"""
+        if self.generation_running():
+            self.status_message.setText("Wait for the current response to finish")
+            return
+        message = message_widget.message
+        if self.truncate_conversation(message_widget) is None:
+            return
+        
+        self.input_field.setPlainText(message.text)
+        self.input_field.setFocus()
+        self.status_message.setText("Editing message; send it to create a new branch")
+    
+    def switch_branch(self, message_widget, step):
+        """Replace a message and what follows it with its previous or next alternative"""
+        if self.generation_running() or message_widget.message is None:
+            return
+        # Ids are assigned when the conversation is saved
+        self.flush_conversation()
+        conversation_id = self.current_conversation_id
+        message_id = message_widget.message.id
+        if conversation_id is None or message_id is None:
+            return
+        
+        sibling_ids = self.db.get_sibling_ids(message_id)
+        position = sibling_ids.index(message_id) + step if message_id in sibling_ids else -1
+        if not 0 <= position < len(sibling_ids):
+            return
+        branch = self.db.get_branch(conversation_id, sibling_ids[position])
+        start = next((i for i, msg in enumerate(branch) if msg.id == sibling_ids[position]), None)
+        if start is None:
+            return
+        
+        # Only the widgets from the branch point on are rebuilt
+        self.truncate_conversation(message_widget)
+        self.branch_start = None
+        for msg in branch[start:]:
+            self.add_stored_message(msg)
+        self.autosave.mark_saved(self.conversation)
+        self.db_writer.submit(self.db._set_active_leaf, conversation_id, branch[-1].id,
+                              key=("active_leaf", conversation_id))
+        self.status_message.setText(f"Showing branch {position + 1} of {len(sibling_ids)}")
+    
     def show_conversation_history(self):
         """Show dialog with conversation history"""
         # This will need a new dialog - we'll implement it later
@@ -490,9 +906,10 @@ class OllamaChatUI(QMainWindow):
             return
         
         # Create and show the dialog (we'll implement this later)
-        dialog = ConversationHistoryDialog(conversations, self)
+        semantic_search = self.history_indexer.search if self.history_indexer else None
+        dialog = ConversationHistoryDialog(conversations, self, semantic_search=semantic_search)
         if dialog.exec() == QDialog.DialogCode.Accepted and dialog.selected_conversation_id:
-            self.load_conversation(dialog.selected_conversation_id)
+            self.load_conversation(dialog.selected_conversation_id, dialog.selected_message_id)
 
     def create_status_bar(self):
         """Create a styled status bar"""
@@ -532,31 +949,33 @@ class OllamaChatUI(QMainWindow):
         self.status_message = QLabel("Ready")
         status_bar.addWidget(self.status_message)
         
-    def add_message(self, text, is_user=True):
-        """Add a message to the chat"""
+        # Latency breakdown of the last traced request
+        self.latency_overlay = LatencyOverlay()
+        status_bar.addPermanentWidget(self.latency_overlay)
+        self.toggle_latency_overlay(self.trace_settings.get("latency_overlay", False))
+        
+    def add_message(self, text, is_user=True, message=None):
+        """Add a message to the chat; `message` is the conversation entry it shows, if any"""
         if not text:  # Don't add empty messages
-            print("Warning: Attempted to add empty message")
+            logger.debug("Skipped adding an empty message")
             return
             
         timestamp = datetime.now().strftime("%H:%M:%S")
-        message_widget = MessageWidget(is_user, text, timestamp)
+        message_widget = self.widget_pool.acquire()
+        message_widget.bind(is_user, text, timestamp, message)
         
         # Set timestamp visibility based on settings
         message_widget.set_show_timestamp(self.conversation_settings.get("show_timestamps", True))
         
-        # Connect regenerate button if it's an assistant message
-        if not is_user and hasattr(message_widget, 'regenerate_btn'):
-            message_widget.regenerate_btn.clicked.connect(
-                lambda: self.regenerate_message(message_widget)
-            )
-        
         self.chat_layout.addWidget(message_widget)
+        # Pooled widgets were hidden explicitly, which the layout does not undo
+        message_widget.show()
         
-        # Debug output
-        print(f"Added message: {text[:30]}...")
+        logger.debug("Added %s message (%d chars)", "user" if is_user else "assistant", len(text))
     
     # Auto scroll to bottom
         QTimer.singleShot(100, self.scroll_to_bottom)
+        return message_widget
         
     def scroll_to_bottom(self):
    
@@ -567,6 +986,10 @@ class OllamaChatUI(QMainWindow):
                 scroll_area.verticalScrollBar().maximum()
             ))
     
+    def scroll_to_widget(self, widget):
+        """Scroll the chat area so a message widget is visible"""
+        self.chat_scroll_area.ensureWidgetVisible(widget)
+    
     def send_message(self):
         """Send the current message with button animation"""
         message = self.input_field.toPlainText().strip()
@@ -597,8 +1020,11 @@ class OllamaChatUI(QMainWindow):
             animation.setEndValue(pressed_geometry)
             animation.start()
                 
+        self.trace_id = self.tracer.new_request()
+        self.tracer.mark("send_clicked", self.trace_id)
+        
         # Add user message to UI
-        self.add_message(message, is_user=True)
+        message_widget = self.add_message(message, is_user=True)
         
         # Clear input field
         self.input_field.clear()
@@ -606,11 +1032,11 @@ class OllamaChatUI(QMainWindow):
         # Prepare image if any
         image_data = self.get_image_data()
         
-        # Add to conversation history
-        user_message = {"role": "user", "content": message}
-        if image_data:
-            user_message["images"] = [image_data]
+        # Add to conversation history; the image is kept as a path and re-read when resent
+        user_message = Message("user", message, image_path=self.current_image if image_data else None)
+        message_widget.message = user_message
         self.conversation.append(user_message)
+        self.note_activity()
         
         # Get selected model
         model = self.model_selector.currentText()
@@ -619,6 +1045,8 @@ class OllamaChatUI(QMainWindow):
         if self.stream_checkbox.isChecked():
             self.add_message("", is_user=False)
         
+        self.begin_journal_stream(model, message)
+        
         # Send to Ollama in a separate thread
         self.worker = OllamaWorker(
             model, 
@@ -626,7 +1054,14 @@ class OllamaChatUI(QMainWindow):
             self.conversation[:-1], 
             self.model_params,
             image_data, 
-            self.api_settings["base_url"]
+            self.api_settings["base_url"],
+            client=self.ollama_client,
+            response_cache=self.active_response_cache(),
+            retriever=self.document_retriever(),
+            trace_id=self.trace_id,
+            journal=self.journal,
+            journal_stream=self.journal_stream,
+            **self.semantic_cache_options()
         )
         
         # Connect signals
@@ -639,10 +1074,12 @@ class OllamaChatUI(QMainWindow):
                 widget = self.chat_layout.itemAt(i).widget()
                 if isinstance(widget, MessageWidget) and not widget.is_user:
                     if widget.get_text() == "":
-                        widget.deleteLater()
+                        self.remove_message_widget(widget)
                         break
         
         # Connect other signals
+        self.worker.cache_hit.connect(self.handle_cache_hit)
+        self.worker.semantic_match.connect(self.offer_semantic_match)
         self.worker.response_complete.connect(self.handle_response)
         self.worker.error_occurred.connect(self.handle_error)
         self.worker.progress_update.connect(self.update_progress)
@@ -660,12 +1097,28 @@ class OllamaChatUI(QMainWindow):
     
     def handle_response(self, response_text):
         """Handle the completed response"""
+        self.tracer.mark("done", self.trace_id)
+        
         # Add to conversation history
-        self.conversation.append({"role": "assistant", "content": response_text})
+        reply = Message("assistant", response_text)
+        self.conversation.append(reply)
+        
+        # The journal entry can go once this reply is committed with the conversation;
+        # with auto-save off nothing will commit it, so it goes now
+        if self.journal_stream is not None:
+            if self.conversation_settings.get("auto_save", True):
+                self.pending_journal_streams.append(self.journal_stream)
+            else:
+                self.journal.finish(self.journal_stream)
+            self.journal_stream = None
         
         # If we're not streaming, add the complete message now
         if not self.stream_checkbox.isChecked():
-            self.add_message(response_text, is_user=False)
+            self.add_message(response_text, is_user=False, message=reply)
+        else:
+            widgets = list(self.message_widgets())
+            if widgets and not widgets[-1].is_user and widgets[-1].message is None:
+                widgets[-1].message = reply
                 
         # Update status
         self.status_message.setText("Ready")
@@ -675,24 +1128,171 @@ class OllamaChatUI(QMainWindow):
         if self.conversation_settings.get("auto_save", True):
             self.auto_save_conversation()
     
+    def active_response_cache(self):
+        """Return the response cache if it should be used for the next request"""
+        if not self.cache_settings.get("response_cache", False):
+            return None
+        # Only deterministic requests (temperature 0 or a fixed seed) are looked up or stored
+        if not is_deterministic(self.model_params):
+            return None
+        return self.response_cache
+    
+    def document_retriever(self):
+        """Return a callable fetching relevant document excerpts, if any are attached"""
+        conversation_id = self.current_conversation_id
+        if conversation_id is None:
+            return None
+        
+        def retrieve(prompt):
+            try:
+                return retrieval_context(
+                    self.document_store, self.ollama_client,
+                    self.rag_settings.get("embedding_model", "nomic-embed-text"),
+                    conversation_id, prompt, k=self.rag_settings.get("top_k", 4)
+                )
+            except Exception:
+                # Retrieval is best effort - answer without excerpts
+                return None
+        return retrieve
+    
+    def attach_document(self):
+        """Attach a text document to the current conversation for retrieval"""
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "Attach Document", "", "Text Files (*.txt *.md *.rst *.csv *.json *.log *.py);;All Files (*)"
+        )
+        if not file_path:
+            return
+        
+        # Documents hang off a saved conversation
+        if not self.current_conversation_id:
+            self.save_current_conversation(wait=True)
+        if not self.current_conversation_id:
+            return
+        
+        document_id = self.document_store.add_document(self.current_conversation_id, file_path)
+        self.start_ingestion([document_id])
+    
+    def start_ingestion(self, document_ids):
+        """Chunk and embed documents in the background"""
+        if self.ingest_worker and self.ingest_worker.isRunning():
+            if self.ingest_worker.add(document_ids):
+                return
+            # It ran out of documents and is only returning from run()
+            self.ingest_worker.wait()
+        
+        self.ingest_worker = DocumentIngestWorker(self.document_ingestor, document_ids)
+        self.ingest_worker.progress_update.connect(
+            lambda percent: self.status_message.setText(f"Indexing document... {percent}%")
+        )
+        self.ingest_worker.document_ready.connect(
+            lambda document_id: self.status_message.setText(
+                f"Document ready: {self.document_store.get_document(document_id)['name']}"
+            )
+        )
+        self.ingest_worker.error_occurred.connect(self.status_message.setText)
+        self.ingest_worker.start()
+    
+    def start_migrations(self):
+        """Run pending schema backfills in the background, then archiving"""
+        if not self.db.migrator.pending_backfills():
+            self.start_archiving()
+            return
+        
+        self.migration_worker = MigrationWorker(self.db.migrator)
+        self.migration_worker.progress_update.connect(
+            lambda description, percent: self.status_message.setText(
+                f"Upgrading database ({description})... {percent}%"
+            )
+        )
+        self.migration_worker.migrations_finished.connect(
+            lambda: self.status_message.setText("Database upgrade complete")
+        )
+        self.migration_worker.migrations_finished.connect(self.start_archiving)
+        self.migration_worker.error_occurred.connect(self.status_message.setText)
+        self.migration_worker.start()
+    
+    def start_archiving(self):
+        """Move conversations untouched for a while to the cold archive"""
+        days = self.conversation_settings.get("archive_after_days", 30)
+        if not days:
+            return
+        
+        self.archive_worker = ArchiveWorker(self.db, days)
+        self.archive_worker.archived.connect(self.handle_archived)
+        self.archive_worker.error_occurred.connect(self.status_message.setText)
+        self.archive_worker.start()
+    
+    def handle_archived(self, count):
+        logger.info("Archived %d conversations", count)
+        # Archived messages left the messages table; so do their history vectors
+        if count and self.history_indexer:
+            self.history_indexer.request_compact()
+    
+    def semantic_cache_options(self):
+        """Worker arguments enabling the semantic cache, if it is turned on"""
+        if not self.cache_settings.get("semantic_cache", False):
+            return {}
+        return {
+            "semantic_cache": self.semantic_cache,
+            "embedding_model": self.cache_settings.get("embedding_model"),
+            "system_prompt": self.conversation_settings.get("system_prompt")
+        }
+    
+    def handle_cache_hit(self, kind):
+        """Tell the user a response was replayed instead of generated"""
+        self.status_message.setText(
+            f"Replaying response from {kind} cache - use Regenerate for a fresh answer"
+        )
+    
+    def offer_semantic_match(self, response, similarity):
+        """Let the user take the answer to a similar earlier question or get a new one"""
+        # The worker stops right after offering the match
+        self.worker.wait()
+        self.progress_bar.setVisible(False)
+        
+        preview = response if len(response) <= 500 else response[:500] + "..."
+        choice = QMessageBox.question(
+            self, "Similar Question Answered Before",
+            f"A similar question (similarity {similarity:.2f}) was answered before:\n\n"
+            f"{preview}\n\nUse that answer instead of generating a new one?"
+        )
+        if choice != QMessageBox.StandardButton.Yes:
+            self.send_user_message(self.conversation[-1])
+            return
+        
+        if self.stream_checkbox.isChecked():
+            self.render_token(response)
+        self.handle_response(response)
+        self.status_message.setText("Reply from semantic cache - use Regenerate for a fresh answer")
+    
     def handle_token(self, token):
+        with self.tracer.span("render_flush", self.trace_id):
+            self.render_token(token)
+    
+    def render_token(self, token):
     # Find the last message in the chat layout
         for i in reversed(range(self.chat_layout.count())):
             widget = self.chat_layout.itemAt(i).widget()
-            if isinstance(widget, MessageWidget) and not widget.is_user:
-                # Update the existing assistant message
-                current_text = widget.get_text()
-                widget.set_text(current_text + token)
-                
-                # Force scroll after each token update
-                self.scroll_to_bottom()
-                return
+            if isinstance(widget, MessageWidget):
+                # Only the reply being streamed is not bound to a conversation entry yet
+                if not widget.is_user and widget.message is None:
+                    # Update the existing assistant message
+                    current_text = widget.get_text()
+                    widget.set_text(current_text + token)
+                    
+                    # Force scroll after each token update
+                    self.scroll_to_bottom()
+                    return
+                break
         
         # If we get here, we need to create a new message (first token)
         self.add_message(token, is_user=False)
     
     def handle_error(self, error_message):
         """Handle API errors"""
+        if self.journal_stream is not None:
+            self.journal.discard(self.journal_stream)
+            self.journal_stream = None
         self.add_message(f"ERROR: {error_message}", is_user=False)
         self.status_message.setText("Error occurred")
         self.progress_bar.setVisible(False)
@@ -702,28 +1302,32 @@ class OllamaChatUI(QMainWindow):
         self.progress_bar.setValue(progress)
     
     def refresh_models(self):
-        """Refresh the list of available Ollama models"""
-        try:
-            response = requests.get(f"{self.api_settings['base_url']}/api/tags")
-            if response.status_code == 200:
-                current_model = self.model_selector.currentText()
-                
-                models = [model['name'] for model in response.json()['models']]
-                self.model_selector.clear()
-                self.model_selector.addItems(models)
-                
-                # Restore previous selection if possible
-                if current_model and current_model in models:
-                    index = self.model_selector.findText(current_model)
-                    if index >= 0:
-                        self.model_selector.setCurrentIndex(index)
-                
-                self.status_message.setText(f"Found {len(models)} models")
-            else:
-                self.status_message.setText(f"Failed to get models: {response.status_code}")
-        except Exception as e:
-            self.add_message(f"Error connecting to Ollama: {str(e)}", is_user=False)
-            self.status_message.setText("Connection error")
+        """Refresh the list of available Ollama models in the background"""
+        if self.model_list_worker and self.model_list_worker.isRunning():
+            return
+        
+        self.model_list_worker = ModelListWorker(self.ollama_client)
+        self.model_list_worker.models_loaded.connect(self.handle_models_loaded)
+        self.model_list_worker.error_occurred.connect(self.status_message.setText)
+        self.model_list_worker.connection_failed.connect(self.handle_models_unreachable)
+        self.model_list_worker.start()
+    
+    def handle_models_loaded(self, models):
+        current_model = self.model_selector.currentText()
+        self.model_selector.clear()
+        self.model_selector.addItems(models)
+        
+        # Restore previous selection if possible
+        if current_model and current_model in models:
+            index = self.model_selector.findText(current_model)
+            if index >= 0:
+                self.model_selector.setCurrentIndex(index)
+        
+        self.status_message.setText(f"Found {len(models)} models")
+    
+    def handle_models_unreachable(self, error):
+        self.add_message(f"Error connecting to Ollama: {error}", is_user=False)
+        self.status_message.setText("Connection error")
     
     def upload_image(self):
         """Upload an image for multimodal models"""
@@ -765,44 +1369,60 @@ class OllamaChatUI(QMainWindow):
             return None
     
     def regenerate_message(self, message_widget):
-        """Regenerate the last assistant message"""
-        # Remove the last assistant message from conversation
-        if self.conversation and self.conversation[-1]["role"] == "assistant":
-            self.conversation.pop()
-            
-            # Get the last user message
-            if self.conversation and self.conversation[-1]["role"] == "user":
-                user_message = self.conversation[-1]["content"]
-                
-                # Remove the message widget
-                message_widget.deleteLater()
-                
-                # Process the message again
-                if self.stream_checkbox.isChecked():
-                    self.add_message("", is_user=False)
-                
-                # Send to Ollama
-                self.send_user_message(user_message)
+        """Generate a new reply in place of an assistant message"""
+        if self.generation_running():
+            self.status_message.setText("Wait for the current response to finish")
+            return
+        
+        index = self.conversation_index(message_widget)
+        if not index or self.conversation[index - 1].role != "user":
+            return
+        
+        # The old reply and anything after it stay stored as the other branch
+        self.truncate_conversation(message_widget)
+        user_message = self.conversation[-1]
+        
+        # Process the message again
+        if self.stream_checkbox.isChecked():
+            self.add_message("", is_user=False)
+        
+        # Send to Ollama
+        self.send_user_message(user_message)
     
     def send_user_message(self, message):
-        """Send a user message programmatically"""
+        """Send the Message at the end of the conversation again for a fresh, uncached reply"""
         # Get selected model
         model = self.model_selector.currentText()
         
+        self.trace_id = self.tracer.new_request()
+        self.tracer.mark("send_clicked", self.trace_id, regenerate=True)
+        
+        self.begin_journal_stream(model, message.text)
+        
         # Create an Ollama worker
+        images = message.images  # An attached image is read from disk again
         self.worker = OllamaWorker(
             model, 
-            message, 
+            message.text, 
             self.conversation[:-1], 
             self.model_params,
-            None,  # No image data for regeneration
-            self.api_settings["base_url"]
+            images[0] if images else None,
+            self.api_settings["base_url"],
+            client=self.ollama_client,
+            response_cache=self.active_response_cache(),
+            retriever=self.document_retriever(),
+            trace_id=self.trace_id,
+            journal=self.journal,
+            journal_stream=self.journal_stream,
+            refresh_cache=True,
+            **self.semantic_cache_options()
         )
         
         # Connect signals
         if self.stream_checkbox.isChecked():
             self.worker.token_received.connect(self.handle_token)
             
+        self.worker.cache_hit.connect(self.handle_cache_hit)
         self.worker.response_complete.connect(self.handle_response)
         self.worker.error_occurred.connect(self.handle_error)
         self.worker.progress_update.connect(self.update_progress)
@@ -818,32 +1438,28 @@ class OllamaChatUI(QMainWindow):
     def new_chat(self):
         """Start a new chat session"""
         # Clear conversation history
-        self.conversation = []
+        self.conversation = Conversation()
+        self.branch_start = None
         
         # Reset the current conversation ID
         self.current_conversation_id = None
         
-        # Clear chat UI - remove all existing widgets
+        # Clear chat UI; message widgets go back to the pool for the next chat.
+        # They leave the layout right away, so there are no pending deletions
+        # to flush with processEvents before new messages are added
         for i in reversed(range(self.chat_layout.count())):
-            widget = self.chat_layout.itemAt(i).widget()
-            if widget:
+            widget = self.chat_layout.takeAt(i).widget()
+            if isinstance(widget, MessageWidget):
+                self.widget_pool.release(widget)
+            elif widget:
                 widget.deleteLater()
         
-        # Force UI update before adding new content
-        QApplication.processEvents()
-        
-        # Create a welcome message explicitly
-        welcome_widget = MessageWidget(is_user=False, text="Hello! I'm your Ollama-powered assistant. How can I help you today?")
-        self.chat_layout.addWidget(welcome_widget)
-        
-        # Add to conversation history to maintain context
-        self.conversation.append({
-            "role": "assistant", 
-            "content": "Hello! I'm your Ollama-powered assistant. How can I help you today?"
-        })
-        
-        # Force another UI update to ensure the message appears
-        QApplication.processEvents()
+        # Add a welcome message, also to the conversation history to maintain context
+        greeting = Message("assistant", "Hello! I'm your Ollama-powered assistant. How can I help you today?")
+        self.add_message(greeting.text, is_user=False, message=greeting)
+        self.conversation.append(greeting)
+        # A chat with only the greeting is not worth saving
+        self.autosave.mark_saved(self.conversation)
         
         # Update status
         self.status_message.setText("New chat started")
@@ -865,11 +1481,53 @@ class OllamaChatUI(QMainWindow):
         if file_path:
             try:
                 with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(self.conversation, f, indent=2)
+                    json.dump(self.conversation.to_dicts(), f, indent=2)
                 self.status_message.setText(f"Chat saved to {Path(file_path).name}")
             except Exception as e:
                 self.status_message.setText(f"Error saving chat: {str(e)}")
     
+    def export_all_conversations(self):
+        """Stream every conversation to a JSONL file in the background"""
+        file_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Export All Conversations",
+            f"{self.conversation_settings['save_path']}/conversations_{datetime.now().strftime('%Y%m%d')}.jsonl.gz",
+            "Conversation Exports (*.jsonl *.jsonl.gz *.jsonl.zst)"
+        )
+        if file_path:
+            self.start_transfer(file_path, importing=False)
+    
+    def import_conversations(self):
+        """Import conversations from an export or a saved chat file"""
+        file_path, _ = QFileDialog.getOpenFileName(
+            self,
+            "Import Conversations",
+            self.conversation_settings['save_path'],
+            "Conversation Files (*.jsonl *.jsonl.gz *.jsonl.zst *.json)"
+        )
+        if file_path:
+            self.start_transfer(file_path, importing=True)
+    
+    def start_transfer(self, file_path, importing):
+        if self.transfer_worker and self.transfer_worker.isRunning():
+            self.status_message.setText("An export or import is already running")
+            return
+        
+        # Exports should include the open conversation as it is now
+        if not importing and self.conversation and self.autosave.is_dirty(self.conversation):
+            self.save_current_conversation(wait=True)
+        
+        self.transfer_worker = TransferWorker(self.db, file_path, importing)
+        self.transfer_worker.progress_update.connect(self.status_message.setText)
+        self.transfer_worker.transfer_finished.connect(
+            lambda stats: self.status_message.setText(
+                f"{'Imported' if importing else 'Exported'} {stats['conversations']} conversations "
+                f"({stats['messages']} messages){' before it was cancelled' if stats['cancelled'] else ''}"
+            )
+        )
+        self.transfer_worker.error_occurred.connect(self.status_message.setText)
+        self.transfer_worker.start()
+    
     def auto_save_chat(self):
         """Automatically save the chat"""
         if not self.conversation:
@@ -885,7 +1543,7 @@ class OllamaChatUI(QMainWindow):
         
         try:
             with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(self.conversation, f, indent=2)
+                json.dump(self.conversation.to_dicts(), f, indent=2)
             self.status_message.setText(f"Chat auto-saved")
         except Exception as e:
             self.status_message.setText(f"Error auto-saving: {str(e)}")
@@ -901,9 +1559,14 @@ class OllamaChatUI(QMainWindow):
     
     def show_model_params(self):
         """Show dialog to adjust model parameters"""
-        dialog = ModelParamsDialog(self.model_params, self)
+        dialog = ModelParamsDialog(
+            self.model_params, self,
+            cache_settings=self.cache_settings,
+            cache_stats=self.response_cache.stats()
+        )
         if dialog.exec() == QDialog.DialogCode.Accepted:
             self.model_params = dialog.get_params()
+            self.cache_settings = dialog.get_cache_settings()
             self.status_message.setText("Model parameters updated")
     
     def show_conversation_settings(self):
@@ -930,21 +1593,101 @@ class OllamaChatUI(QMainWindow):
             "Version: 1.0.0"
         )
     
+    def toggle_tracing(self, enabled):
+        """Turn request-path tracing on or off"""
+        self.tracer.enabled = enabled
+        self.trace_settings["tracing"] = enabled
+        self.status_message.setText("Tracing enabled" if enabled else "Tracing disabled")
+    
+    def toggle_latency_overlay(self, visible):
+        """Show the last request's latency breakdown in the status bar"""
+        self.trace_settings["latency_overlay"] = visible
+        self.latency_overlay.setVisible(visible)
+        if visible:
+            self.tracer.add_listener(self.latency_overlay.listener)
+            if not self.tracer.enabled:
+                self.latency_overlay.setText("latency: enable Debug > Enable Tracing")
+        else:
+            self.tracer.remove_listener(self.latency_overlay.listener)
+    
+    def profile_next_request(self):
+        """Run the next request's worker thread under cProfile"""
+        self.tracer.profile_next_request()
+        self.status_message.setText(f"Next request will be profiled into {self.tracer.profile_dir}")
+    
+    def show_autosave_stats(self):
+        """Show how many database writes dirty tracking and coalescing avoided"""
+        stats = self.autosave.stats
+        writer = self.db_writer.stats
+        QMessageBox.information(
+            self, "Auto-save Statistics",
+            f"Auto-save checks: {stats['checks']}\n"
+            f"Saves queued: {stats['saves']}\n"
+            f"Writes avoided (unchanged): {stats['writes_avoided']}\n"
+            f"Saves merged by the writer: {writer['coalesced']}\n"
+            f"Transactions committed: {writer['transactions']}\n"
+            f"Next check in: {self.auto_save_timer.remainingTime() // 1000} s"
+        )
+    
+    def export_trace(self):
+        """Save the trace buffer as Chrome trace / Perfetto JSON"""
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "Export Trace", f"trace-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json",
+            "Chrome Trace (*.json)"
+        )
+        if not file_path:
+            return
+        count = self.tracer.export_chrome(file_path)
+        self.status_message.setText(f"Exported {count} trace events to {Path(file_path).name}")
+    
     def closeEvent(self, event):
         """Handle window close event"""
         # Stop the auto-save timer
         self.auto_save_timer.stop()
         
-        # Final save before closing
+        # Stop background indexing, maintenance and any export or import
+        self.maintenance_timer.stop()
+        if self.transfer_worker and self.transfer_worker.isRunning():
+            # An import stops after its current transaction; an export deletes its partial file
+            self.transfer_worker.requestInterruption()
+            if not self.transfer_worker.wait(5000):
+                logger.warning("Closing with an export or import still running")
+        if self.maintenance_worker and self.maintenance_worker.isRunning():
+            self.maintenance.interrupt()
+            self.maintenance_worker.wait(2000)
+        if self.history_indexer:
+            self.history_indexer.stop()
+        if self.ingest_worker and self.ingest_worker.isRunning():
+            self.ingest_worker.requestInterruption()
+            self.ingest_worker.wait(2000)
+        if self.migration_worker and self.migration_worker.isRunning():
+            self.migration_worker.requestInterruption()
+            self.migration_worker.wait(2000)
+        if self.archive_worker and self.archive_worker.isRunning():
+            self.archive_worker.requestInterruption()
+            self.archive_worker.wait(2000)
+        if self.model_list_worker and self.model_list_worker.isRunning():
+            # Bounded by the client timeout
+            self.model_list_worker.wait(2000)
+        
+        # Final save before closing, then give the writer a deadline to commit
         if self.conversation and self.conversation_settings.get("auto_save", True):
-            self.save_current_conversation()
+            if self.autosave.should_save(self.conversation):
+                self.save_current_conversation()
+        if not self.db_writer.stop(timeout=5.0):
+            logger.warning("Closing with database writes still pending")
+        if self.journal:
+            self.journal.close()
+        self.db.archive.close()
         
         # Save config
         config = {
             "model_params": self.model_params,
             "conversation_settings": self.conversation_settings,
             "ui_settings": self.ui_settings,
-            "api_settings": self.api_settings
+            "api_settings": self.api_settings,
+            "cache_settings": self.cache_settings,
+            "trace_settings": self.trace_settings
         }
         save_config(config)
         
@@ -1,53 +1,35 @@
+import logging
 from datetime import datetime
 from PyQt6.QtWidgets import (QFrame, QVBoxLayout, QHBoxLayout, QTextEdit, 
                            QLabel, QSizePolicy, QPushButton, QApplication)
 from PyQt6.QtGui import QFont
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, pyqtSignal
+
+logger = logging.getLogger(__name__)
 
 class MessageWidget(QFrame):
-    """Widget for displaying chat messages"""
+    """
+    Widget for displaying chat messages
+    
+    Styled by the theme stylesheet (ui/theme.py MESSAGE_STYLES) through
+    its object name, #userMessage or #assistantMessage, its children's
+    object names and the `highlighted` property.
+    """
+    # -1 or +1: show the previous or next alternative to this message
+    branch_requested = pyqtSignal(int)
+    
     def __init__(self, is_user=True, text="", timestamp=None, parent=None):
         super().__init__(parent)
-        self.is_user = is_user
-        self.timestamp = timestamp or datetime.now().strftime("%H:%M:%S")
+        self.is_user = None
         self.show_timestamp = True
-        self.text = text
+        self.highlighted = False
         self.init_ui()
-        
-        # Make sure text is set after UI is initialized
-        if text:
-            self.messageText.setPlainText(text)
+        self.bind(is_user, text, timestamp)
         
     def init_ui(self):
         self.setFrameShape(QFrame.Shape.StyledPanel)
         self.setLineWidth(0)  # Remove border line
         
-        # Set object name for styling
-        self.setObjectName("userMessage" if self.is_user else "assistantMessage")
-        
-        # Apply enhanced styling with gradients and shadows
-        if self.is_user:
-            self.setStyleSheet("""
-                #userMessage {
-                    background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #2A2F3B, stop:1 #353B48);
-                    color: white;
-                    border-radius: 12px;
-                    margin: 2px 10px 2px 50px;  /* More space on the left */
-                    padding: 2px;
-                }
-            """)
-        else:
-            self.setStyleSheet("""
-                #assistantMessage {
-                    background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #40454F, stop:1 #4A5568);
-                    color: white;
-                    border-radius: 12px;
-                    margin: 2px 50px 2px 10px;  /* More space on the right */
-                    padding: 2px;
-                    border-left: 3px solid #10a37f;  /* Green accent like Claude */
-                }
-            """)
-            
         # Main layout
         main_layout = QVBoxLayout(self)
         main_layout.setContentsMargins(12, 12, 12, 12)
@@ -57,24 +39,20 @@ class MessageWidget(QFrame):
         header_layout = QHBoxLayout()
         
         # Role icon
-        icon_label = QLabel()
+        self.icon_label = QLabel()
         icon_size = 20
-        if self.is_user:
-            icon_label.setText("👤")  # Replace with proper icon in resources
-        else:
-            icon_label.setText("🤖")  # Replace with proper icon in resources
-        icon_label.setFixedSize(icon_size, icon_size)
-        header_layout.addWidget(icon_label)
+        self.icon_label.setFixedSize(icon_size, icon_size)
+        header_layout.addWidget(self.icon_label)
         
         # Role text
-        role_label = QLabel("You" if self.is_user else "Assistant")
-        role_label.setFont(QFont("Segoe UI", 10, QFont.Weight.Bold))
-        header_layout.addWidget(role_label)
+        self.role_label = QLabel()
+        self.role_label.setFont(QFont("Segoe UI", 10, QFont.Weight.Bold))
+        header_layout.addWidget(self.role_label)
         
         # Timestamp
-        self.time_label = QLabel(self.timestamp)
+        self.time_label = QLabel()
+        self.time_label.setObjectName("messageTime")
         self.time_label.setFont(QFont("Segoe UI", 8))
-        self.time_label.setStyleSheet("color: rgba(255, 255, 255, 0.5);")
         header_layout.addWidget(self.time_label)
         
         # Push everything to the left
@@ -85,19 +63,11 @@ class MessageWidget(QFrame):
         
         # Message content
         self.messageText = QTextEdit()
+        self.messageText.setObjectName("messageText")
         self.messageText.setReadOnly(True)
         self.messageText.setMinimumHeight(40)
         self.messageText.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Minimum)
         
-        # Enhanced text styling
-        self.messageText.setStyleSheet("""
-            background-color: transparent; 
-            border: none;
-            color: white;
-            font-family: 'Segoe UI';
-            padding: 5px;
-        """)
-        
         # Set font
         self.messageText.setFont(QFont("Segoe UI", 10))
         
@@ -107,58 +77,91 @@ class MessageWidget(QFrame):
         action_layout = QHBoxLayout()
         action_layout.setContentsMargins(0, 8, 0, 0)
         
-        # Copy button with enhanced styling
+        # Copy button
         copy_btn = QPushButton("Copy")
         copy_btn.setObjectName("actionButton")
         copy_btn.setFixedSize(70, 28)
-        copy_btn.setStyleSheet("""
-            QPushButton#actionButton {
-                background-color: rgba(255, 255, 255, 0.1);
-                color: rgba(255, 255, 255, 0.8);
-                border-radius: 4px;
-                border: none;
-                padding: 4px 8px;
-                font-size: 9pt;
-            }
-            QPushButton#actionButton:hover {
-                background-color: rgba(255, 255, 255, 0.2);
-            }
-            QPushButton#actionButton:pressed {
-                background-color: rgba(255, 255, 255, 0.15);
-            }
-        """)
         copy_btn.clicked.connect(self.copy_text)
         action_layout.addWidget(copy_btn)
         
-        # Only show regenerate for assistant messages
-        if not self.is_user:
-            regenerate_btn = QPushButton("Regenerate")
-            regenerate_btn.setObjectName("actionButton")
-            regenerate_btn.setFixedSize(90, 28)
-            regenerate_btn.setStyleSheet("""
-                QPushButton#actionButton {
-                    background-color: rgba(255, 255, 255, 0.1);
-                    color: rgba(255, 255, 255, 0.8);
-                    border-radius: 4px;
-                    border: none;
-                    padding: 4px 8px;
-                    font-size: 9pt;
-                }
-                QPushButton#actionButton:hover {
-                    background-color: rgba(255, 255, 255, 0.2);
-                }
-                QPushButton#actionButton:pressed {
-                    background-color: rgba(255, 255, 255, 0.15);
-                }
-            """)
-            self.regenerate_btn = regenerate_btn
-            action_layout.addWidget(regenerate_btn)
+        # Regenerate for assistant messages, Edit for user messages; bind()
+        # shows the one that applies so a widget can be reused for either role
+        regenerate_btn = QPushButton("Regenerate")
+        regenerate_btn.setObjectName("actionButton")
+        regenerate_btn.setFixedSize(90, 28)
+        self.regenerate_btn = regenerate_btn
+        action_layout.addWidget(regenerate_btn)
+        
+        # Editing resends the message as an alternative to the original
+        edit_btn = QPushButton("Edit")
+        edit_btn.setObjectName("actionButton")
+        edit_btn.setFixedSize(70, 28)
+        self.edit_btn = edit_btn
+        action_layout.addWidget(edit_btn)
         
         # Push buttons to the left
         action_layout.addStretch()
         
+        # Branch navigator "< 2/3 >", shown when the message has alternatives
+        self.branch_prev_btn = QPushButton("‹")
+        self.branch_label = QLabel()
+        self.branch_next_btn = QPushButton("›")
+        for button in (self.branch_prev_btn, self.branch_next_btn):
+            button.setObjectName("actionButton")
+            button.setFixedSize(28, 28)
+        self.branch_label.setObjectName("branchLabel")
+        self.branch_prev_btn.clicked.connect(lambda: self.branch_requested.emit(-1))
+        self.branch_next_btn.clicked.connect(lambda: self.branch_requested.emit(1))
+        for widget in (self.branch_prev_btn, self.branch_label, self.branch_next_btn):
+            widget.setVisible(False)
+            action_layout.addWidget(widget)
+        
         main_layout.addLayout(action_layout)
         
+    def bind(self, is_user, text="", timestamp=None, message=None):
+        """
+        Show new content, e.g. when the widget is taken from a WidgetPool
+        
+        Args:
+            is_user: Whether this is a user (or an assistant) message
+            text: Message text
+            timestamp: Shown time; now when None
+            message: The conversation entry (Message) this widget shows, if any
+        """
+        restyle = False
+        if is_user != self.is_user:
+            self.is_user = is_user
+            # Set object name for styling
+            self.setObjectName("userMessage" if is_user else "assistantMessage")
+            self.icon_label.setText("👤" if is_user else "🤖")  # Replace with proper icons in resources
+            self.role_label.setText("You" if is_user else "Assistant")
+            self.regenerate_btn.setVisible(not is_user)
+            self.edit_btn.setVisible(is_user)
+            restyle = True
+        if self.highlighted:
+            self.highlighted = False
+            self.setProperty("highlighted", False)
+            restyle = True
+        if restyle:
+            self.repolish()
+        
+        self.timestamp = timestamp or datetime.now().strftime("%H:%M:%S")
+        self.time_label.setText(self.timestamp)
+        self.text = text
+        self.message = message
+        self.messageText.setMinimumHeight(40)
+        if text:
+            self.messageText.setPlainText(text)
+        else:
+            self.messageText.clear()
+        self.set_branch(0, 1)
+        
+    def unbind(self):
+        """Drop the shown content so a pooled widget does not keep it alive"""
+        self.text = ""
+        self.message = None
+        self.messageText.clear()
+        
     def set_text(self, text):
         """Set the text content of the message"""
         if not text:
@@ -167,8 +170,7 @@ class MessageWidget(QFrame):
         self.text = text
         self.messageText.setPlainText(text)
         
-        # Debug output
-        print(f"Setting text: '{text}'")
+        logger.debug("Set message text (%d chars)", len(text))
         
         # Adjust height based on content
         document_height = self.messageText.document().size().height()
@@ -182,6 +184,32 @@ class MessageWidget(QFrame):
         """Copy the message text to clipboard"""
         QApplication.clipboard().setText(self.messageText.toPlainText())
         
+    def set_highlighted(self, highlighted):
+        """Outline the message, e.g. when it was found by a search"""
+        if highlighted == self.highlighted:
+            return
+        self.highlighted = highlighted
+        self.setProperty("highlighted", highlighted)
+        self.repolish()
+            
+    def repolish(self):
+        """Re-match the stylesheet rules after the object name or the `highlighted` property changed"""
+        # Widgets that were never shown are polished with the current values anyway
+        if self.testAttribute(Qt.WidgetAttribute.WA_WState_Polished):
+            self.style().unpolish(self)
+            self.style().polish(self)
+            self.update()
+            
+    def set_branch(self, index, count):
+        """Show which of `count` alternatives (0-based `index`) this message is"""
+        visible = count > 1
+        for widget in (self.branch_prev_btn, self.branch_label, self.branch_next_btn):
+            widget.setVisible(visible)
+        if visible:
+            self.branch_label.setText(f"{index + 1}/{count}")
+            self.branch_prev_btn.setEnabled(index > 0)
+            self.branch_next_btn.setEnabled(index < count - 1)
+            
     def set_show_timestamp(self, show):
         """Toggle timestamp visibility"""
         self.show_timestamp = show
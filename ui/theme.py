@@ -1,6 +1,68 @@
-from PyQt6.QtWidgets import QApplication
+from PyQt6.QtWidgets import QApplication, QWidget
 from PyQt6.QtGui import QPalette, QColor, QFont
 
+# Chat message styles (ui/message_widget.py), shared by both themes.
+# Message widgets have no stylesheets of their own: they are matched by
+# object name against the application/window stylesheet, so Qt parses
+# these rules once instead of once per widget, and a message only needs
+# repolishing when its `highlighted` property changes.
+MESSAGE_STYLES = """
+/* Chat Messages */
+#userMessage {
+    background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #2A2F3B, stop:1 #353B48);
+    color: white;
+    border-radius: 12px;
+    margin: 2px 10px 2px 50px;  /* More space on the left */
+    padding: 2px;
+}
+
+#assistantMessage {
+    background: qlineargradient(x1:0, y1:0, x2:1, y2:0, stop:0 #40454F, stop:1 #4A5568);
+    color: white;
+    border-radius: 12px;
+    margin: 2px 50px 2px 10px;  /* More space on the right */
+    padding: 2px;
+    border-left: 3px solid #10a37f;  /* Green accent like Claude */
+}
+
+#userMessage[highlighted="true"], #assistantMessage[highlighted="true"] {
+    border: 2px solid #F6AD55;
+}
+
+QTextEdit#messageText {
+    background-color: transparent;
+    border: none;
+    color: white;
+    font-family: 'Segoe UI';
+    padding: 5px;
+}
+
+QLabel#messageTime {
+    color: rgba(255, 255, 255, 0.5);
+}
+
+QLabel#branchLabel {
+    color: rgba(255, 255, 255, 0.6);
+}
+
+QPushButton#actionButton {
+    background-color: rgba(255, 255, 255, 0.1);
+    color: rgba(255, 255, 255, 0.8);
+    border-radius: 4px;
+    border: none;
+    padding: 4px 8px;
+    font-size: 9pt;
+}
+
+QPushButton#actionButton:hover {
+    background-color: rgba(255, 255, 255, 0.2);
+}
+
+QPushButton#actionButton:pressed {
+    background-color: rgba(255, 255, 255, 0.15);
+}
+"""
+
 # Dark theme stylesheet
 DARK_THEME = """
 /* Main Background */
@@ -15,21 +77,6 @@ QStatusBar {
     border-top: 1px solid #444654;
 }
 
-/* Chat Messages */
-#userMessage {
-    background-color: #343541;
-    color: #ECECF1;
-    border-radius: 8px;
-    border: 1px solid #444654;
-}
-
-#assistantMessage {
-    background-color: #444654;
-    color: #ECECF1;
-    border-radius: 8px;
-    border: 1px solid #565869;
-}
-
 /* Input Area */
 QTextEdit#inputField {
     background-color: #40414f;
@@ -219,21 +266,6 @@ QStatusBar {
     border-top: 1px solid #E5E5E5;
 }
 
-/* Chat Messages */
-#userMessage {
-    background-color: #F7F7F8;
-    color: #202123;
-    border-radius: 8px;
-    border: 1px solid #E5E5E5;
-}
-
-#assistantMessage {
-    background-color: #ECECF1;
-    color: #202123;
-    border-radius: 8px;
-    border: 1px solid #D9D9E3;
-}
-
 /* Input Area */
 QTextEdit#inputField {
     background-color: #FFFFFF;
@@ -410,12 +442,40 @@ QToolTip {
 }
 """
 
+# Both stylesheets are assembled once, at import
+DARK_THEME += MESSAGE_STYLES
+LIGHT_THEME += MESSAGE_STYLES
+
+
 def apply_theme(app_or_widget, is_dark_theme=True):
-    """Apply the selected theme to the application or widget"""
-    if is_dark_theme:
-        app_or_widget.setStyleSheet(DARK_THEME)
+    """
+    Apply the selected theme to the application or widget
+
+    Changing a stylesheet re-polishes every widget below it, so nothing is
+    set when the theme is already in effect. A window whose theme is the
+    application's (see apply_default_theme) gets no stylesheet of its own,
+    which would only make Qt match each widget against the same rules twice.
+
+    Returns:
+        changed: Whether any stylesheet was replaced
+    """
+    stylesheet = DARK_THEME if is_dark_theme else LIGHT_THEME
+    app = QApplication.instance()
+    if isinstance(app_or_widget, QWidget) and app is not None and app.styleSheet() == stylesheet:
+        stylesheet = ""
+    if app_or_widget.styleSheet() == stylesheet:
+        return False
+
+    if isinstance(app_or_widget, QWidget):
+        # Paint once, after every widget has been restyled
+        app_or_widget.setUpdatesEnabled(False)
+        try:
+            app_or_widget.setStyleSheet(stylesheet)
+        finally:
+            app_or_widget.setUpdatesEnabled(True)
     else:
-        app_or_widget.setStyleSheet(LIGHT_THEME)
+        app_or_widget.setStyleSheet(stylesheet)
+    return True
 
 def apply_default_theme(app):
     """Apply the default theme (dark)"""
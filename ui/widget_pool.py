@@ -0,0 +1,65 @@
+"""
+Recycling pool for chat message widgets.
+
+Switching chats used to delete every MessageWidget (deleteLater plus
+processEvents to flush the deletions) and construct a new one, with its
+QTextEdit, buttons, labels and stylesheets, for each message of the next
+chat. Widgets are now released into a WidgetPool instead: they are
+hidden, unbound from their message (so the Message and its text can be
+freed) and kept for the next acquire(), which rebinds them to new
+content. Only widgets beyond the pool's capacity are destroyed.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class WidgetPool:
+    """Free list of hidden widgets that can be rebound to new content"""
+
+    def __init__(self, factory, capacity=1000):
+        """
+        Args:
+            factory: Callable returning a new widget; it makes the signal
+                connections once, for every use of the widget
+            capacity: Most released widgets kept; extra ones are deleted
+        """
+        self.factory = factory
+        self.capacity = capacity
+        self._free = []
+        self.created = 0
+        self.reused = 0
+
+    def __len__(self):
+        return len(self._free)
+
+    def acquire(self):
+        """A widget from the pool, or a new one when it is empty"""
+        if self._free:
+            self.reused += 1
+            return self._free.pop()
+        self.created += 1
+        return self.factory()
+
+    def release(self, widget):
+        """
+        Return a widget that was removed from its layout
+
+        The widget keeps its parent, so it is not re-created or re-polished
+        when it is added to the layout again.
+        """
+        widget.hide()
+        widget.unbind()
+        if len(self._free) < self.capacity:
+            self._free.append(widget)
+        else:
+            widget.deleteLater()
+
+    def clear(self):
+        """Delete every pooled widget"""
+        for widget in self._free:
+            widget.deleteLater()
+        self._free.clear()
+
+    def stats(self):
+        return {"pooled": len(self._free), "created": self.created, "reused": self.reused}